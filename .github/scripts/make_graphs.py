@@ -4,132 +4,440 @@ Generate TRT validation graphs from JSON data
 Auto-runs via GitHub Actions every 10 minutes
 """
 
+import hashlib
 import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
-from datetime import datetime
-
-DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
-
-# File mappings: (json_file, png_file, title, color)
-files = [
-    ("control_off.json",    "control_off.png",    "CONTROL: LED OFF",     "#FF0000"),
-    ("control_on.json",     "control_on.png",     "CONTROL: LED 100% ON", "#00FF00"),
-    ("sweep_100hz.json",    "sweep_100hz.png",    "100 Hz Sweep",         "#FFFF00"),
-    ("sweep_1khz.json",     "sweep_1khz.png",     "1 kHz Sweep",          "#00FFFF"),
-    ("sweep_10khz.json",    "sweep_10khz.png",    "10 kHz Sweep",         "#FF00FF"),
-    ("sweep_20khz.json",    "sweep_20khz.png",    "20 kHz Sweep",         "#FFFFFF"),
-    ("live_trt.json",       "live_trt.png",       "TRT LIVE PROOF",       "#00FFFF"),
-]
-
-# Load history file if it exists
-history_file = DATA_DIR / "history.json"
-history_data = {}
-if history_file.exists():
-    with open(history_file) as f:
-        history_data = json.load(f)
-
-for json_file, png_file, title, color in files:
-    path = DATA_DIR / json_file
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from downsample import downsample, points_for_width
+from record_stream import load_records
+from history_store import JSON_NAME, HistoryStore, series_name
+from trt_records import RecordBatch
+from build_graph import DATASETS, Manifest, graph_stamp, step_name
+from trt_metrics import registry, span
+
+DATA_DIR = Path(os.environ.get("TRT_DATA_DIR", "data"))   # A device namespace, e.g. data/devices/rig2
+RENDER_WORKERS = int(os.environ.get("TRT_RENDER_WORKERS", 0)) or os.cpu_count() or 1
+RAW_HOURS = float(os.environ["TRT_HISTORY_RAW_HOURS"]) if os.environ.get("TRT_HISTORY_RAW_HOURS") else None
+DPI = 200
+FIG_WIDTH_IN = 12
+PLOT_POINTS = points_for_width(FIG_WIDTH_IN, DPI)   # Per line, whatever the history length
+MARKER_POINTS = 200         # Beyond this many points markers are thinned out
+RENDER_VERSION = 2          # Bump when the drawing code changes
+RENDER_KEY = "TRT-Render-Key"
+
+# Line styles for the standard Δt keys; any other delta_t_* key gets a colormap colour
+MEAN_STYLES = {
+    "delta_t_100ms": ('o-', '#1f77b4'),
+    "delta_t_10ms":  ('s-', '#ff7f0e'),
+    "delta_t_1ms":   ('d-', '#2ca02c'),
+}
+VARIANCE_STYLES = {
+    "delta_t_100ms": ('o-', '#FFFF00'),
+    "delta_t_10ms":  ('s-', '#00FFFF'),
+}
+
+
+def dt_label(dt_ms):
+    return f'Δt = {dt_ms / 1000:g}s'
+
+
+def series_colors(keys):
+    """Colormap colours for keys without a fixed style"""
+    extras = [key for key, _ in keys if key not in MEAN_STYLES]
+    return {key: plt.cm.plasma(0.15 + 0.7 * i / max(len(extras) - 1, 1))
+            for i, key in enumerate(extras)}
+
+
+def png_text(path):
+    """tEXt metadata of a PNG file as a dict (empty if missing or unreadable)"""
+    text = {}
+    try:
+        with open(path, 'rb') as f:
+            if f.read(8) != b'\x89PNG\r\n\x1a\n':
+                return text
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                length, kind = struct.unpack('>I4s', header)
+                if kind == b'IDAT':
+                    break   # Metadata chunks come before the image data
+                chunk = f.read(length)
+                f.read(4)   # CRC
+                if kind == b'tEXt':
+                    key, _, value = chunk.partition(b'\0')
+                    text[key.decode('latin-1')] = value.decode('latin-1')
+    except OSError:
+        pass
+    return text
+
+
+def series(entries, points=PLOT_POINTS):
+    """Everything render() draws, as plain lists of (x, y) per line
+
+    Long histories are reduced with LTTB for the means and per-column
+    min/max for the variances (so no spike is lost), which keeps the render
+    cost tied to the output width instead of the number of records.
+    """
+    batch = RecordBatch.from_records(entries)
+    keys = batch.plot_keys()
+    times = batch.device_seconds().tolist()   # Index as time if no timestamp
+    return {
+        "keys": keys,
+        "means": {key: downsample(times, batch.means(key).tolist(), points) for key, _ in keys},
+        "variances": {key: downsample(times, batch.variances(key).tolist(), points, method="minmax")
+                      for key, _ in keys},
+        "as_of": batch.as_of(),
+    }
+
+
+def markevery(xs):
+    return max(1, len(xs) // MARKER_POINTS)
+
+
+def render_key(plot, png_file, title):
+    """Hash of the plotted series plus the chart spec
+
+    Stored in the PNG's tEXt metadata; a matching key skips the render. Nothing
+    time-dependent is drawn, so the same data always gives the same bytes.
+    """
+    spec = {"png": png_file, "title": title, "dpi": DPI, "version": RENDER_VERSION,
+            "matplotlib": matplotlib.__version__, "mean_styles": MEAN_STYLES,
+            "variance_styles": VARIANCE_STYLES}
+    blob = json.dumps({"spec": spec, "series": plot}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def update_history(store, json_file, data_dir=DATA_DIR):
+    """Fold the current data file into its history series; returns the entries or None"""
+    path = data_dir / json_file
     if not path.exists():
         print(f"Skipping {json_file} (not found)")
-        continue
+        return None
+
+    # Phase files are {"cycle_0": {...}, "cycle_0": {...}, ...}; every record counts
+    records = load_records(path)
+    if not records:
+        print(f"Error reading {json_file}: no complete record")
+        return None
+    data = records[-1]
 
-    try:
-        with open(path) as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error reading {json_file}: {e}")
-        continue
-
-    # Build accumulated history
-    history_key = json_file.replace('.json', '_history')
-    if history_key not in history_data:
-        history_data[history_key] = []
-
-    # Add current data point to history
     if "history" in data:
         # Already has history, use it
-        history_data[history_key] = data["history"][-200:]
+        return data["history"]
+
+    name = series_name(json_file)
+    if len(records) > 1:
+        # The file is its own history; store whatever is newer than we have
+        store.extend_new(name, records)
     else:
-        # Single data point - append to accumulated history
-        history_data[history_key].append(data)
-        history_data[history_key] = history_data[history_key][-200:]  # Keep last 200
-
-    # Extract data from history
-    times = []
-    mean100 = []
-    var100 = []
-    mean10 = []
-    var10 = []
-    mean1 = []
-
-    entries = history_data[history_key]
-
-    for i, entry in enumerate(entries):
-        # Use index as time if no timestamp
-        t = entry.get("timestamp_ms", i * 1000) / 1000.0  # Convert to seconds
-        times.append(t)
-
-        # Extract mean values
-        mean100.append(entry.get("delta_t_100ms", {}).get("mean", 0))
-        var100.append(entry.get("delta_t_100ms", {}).get("variance", 0))
-        mean10.append(entry.get("delta_t_10ms", {}).get("mean", 0))
-        var10.append(entry.get("delta_t_10ms", {}).get("variance", 0))
-        mean1.append(entry.get("delta_t_1ms", {}).get("mean", 0))
-
-    if len(times) < 1:
-        print(f"No data points for {json_file}")
-        continue
+        # Single data point - append to accumulated history, unless the source
+        # file has not changed since the last run
+        store.append(name, data)
+    # Recent plot: every raw record still in the raw window (older ones live on as rollups)
+    return store.range(name)
+
+
+def open_store(data_dir=DATA_DIR, raw_hours=RAW_HOURS):
+    """The history store (migrates a legacy history.json on first use)"""
+    return HistoryStore(Path(data_dir) / "history.db",
+                        raw_retention_ms=raw_hours * 3600 * 1000 if raw_hours is not None else None)
+
+
+def plan(store, data_dir=DATA_DIR, force=False, manifest=None):
+    """Update every history in file order; returns render jobs for changed graphs
+
+    With a manifest, datasets whose data file (and the drawing code) are
+    unchanged since their last good render are skipped before anything is
+    read; the stamps of the others are staged for confirm() after rendering.
+    """
+    jobs = []
+    for json_file, png_file, title, color in DATASETS:
+        step = step_name("graph", png_file)
+        if manifest is not None and (data_dir / json_file).exists():
+            stamp = graph_stamp(manifest, data_dir, json_file)
+            if not force and not manifest.dirty(step, stamp) and (data_dir / png_file).exists():
+                print(f"• {json_file} unchanged since last build")
+                continue
+            manifest.stage(step, stamp)
+        entries = update_history(store, json_file, data_dir)
+        if entries is None:
+            continue
+        if len(entries) < 1:
+            print(f"No data points for {json_file}")
+            continue
+        plot = series(entries)
+        cache_key = render_key(plot, png_file, title)
+        if not force and png_text(data_dir / png_file).get(RENDER_KEY) == cache_key:
+            print(f"• {png_file} unchanged")
+            if manifest is not None:
+                manifest.confirm(step)
+            continue
+        jobs.append((plot, png_file, title, cache_key))
+    return jobs
+
+
+def drawn_variance_keys(plot):
+    # Single-sample resolutions report variance 0 by construction; nothing to draw
+    return [(key, dt_ms) for key, dt_ms in plot["keys"]
+            if key in VARIANCE_STYLES or any(plot["variances"][key][1])]
+
+
+def layout(plot, title):
+    """What fixes a figure's structure; only the data can change without a rebuild"""
+    return (title, tuple(plot["keys"]), tuple(drawn_variance_keys(plot)), plot["as_of"] is not None)
+
+
+def build_figure(plot, title):
+    """Create the mean/variance figure; returns (fig, artists) for later set_data updates"""
+    keys, means, variances = plot["keys"], plot["means"], plot["variances"]
+    colors = series_colors(keys)
+    artists = {"mean": {}, "variance": {}, "as_of": None}
 
     # Create figure with 2 subplots: Mean and Variance
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(FIG_WIDTH_IN, 8))
     fig.patch.set_facecolor('#1a1a1a')
 
     # Plot 1: Mean values
     ax1.set_facecolor('#2a2a2a')
-    ax1.plot(times, mean100, 'o-', label='Δt = 0.1s', color='#1f77b4', linewidth=2, markersize=4)
-    ax1.plot(times, mean10, 's-', label='Δt = 0.01s', color='#ff7f0e', linewidth=2, markersize=4)
-    ax1.plot(times, mean1, 'd-', label='Δt = 0.001s', color='#2ca02c', linewidth=2, markersize=4)
+    for key, dt_ms in keys:
+        style, color = MEAN_STYLES[key] if key in MEAN_STYLES else ('-', colors[key])
+        xs, ys = means[key]
+        artists["mean"][key], = ax1.plot(xs, ys, style, label=dt_label(dt_ms), color=color,
+                                         linewidth=2, markersize=4, markevery=markevery(xs))
     ax1.axhline(0.5, color='red', linestyle='--', linewidth=2, label='Expected 0.500', alpha=0.7)
     ax1.set_xlabel('Time (seconds)', color='white', fontsize=12)
     ax1.set_ylabel('Mean Intensity', color='white', fontsize=12)
     ax1.set_title(f'{title} - Mean Values', fontsize=16, fontweight='bold', color='white')
-    ax1.legend(facecolor='#2a2a2a', edgecolor='white', labelcolor='white')
+    ax1.legend(facecolor='#2a2a2a', edgecolor='white', labelcolor='white',
+               ncol=1 + len(keys) // 8, fontsize='small' if len(keys) > 4 else None)
     ax1.grid(True, alpha=0.3, color='white')
     ax1.tick_params(colors='white')
     ax1.set_ylim(-0.1, 1.1)
 
     # Plot 2: Variance
     ax2.set_facecolor('#2a2a2a')
-    ax2.plot(times, var100, 'o-', label='Variance (Δt = 0.1s)', color='#FFFF00', linewidth=2, markersize=4)
-    ax2.plot(times, var10, 's-', label='Variance (Δt = 0.01s)', color='#00FFFF', linewidth=2, markersize=4)
+    for key, dt_ms in drawn_variance_keys(plot):
+        style, color = VARIANCE_STYLES[key] if key in VARIANCE_STYLES else ('-', colors.get(key) or MEAN_STYLES[key][1])
+        xs, ys = variances[key]
+        artists["variance"][key], = ax2.plot(xs, ys, style, label=f'Variance ({dt_label(dt_ms)})',
+                                             color=color, linewidth=2, markersize=4, markevery=markevery(xs))
     ax2.set_xlabel('Time (seconds)', color='white', fontsize=12)
     ax2.set_ylabel('Variance', color='white', fontsize=12)
     ax2.set_title('Variance Over Time', fontsize=14, color='white')
-    ax2.legend(facecolor='#2a2a2a', edgecolor='white', labelcolor='white')
+    ax2.legend(facecolor='#2a2a2a', edgecolor='white', labelcolor='white',
+               ncol=1 + len(keys) // 8, fontsize='small' if len(keys) > 4 else None)
     ax2.grid(True, alpha=0.3, color='white')
     ax2.tick_params(colors='white')
     ax2.set_ylim(bottom=0)
 
-    # Add timestamp
-    timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-    fig.text(0.99, 0.01, f'Generated: {timestamp}', ha='right', va='bottom',
-             fontsize=8, color='#888888')
+    # Data time, not render time, so identical data gives identical pixels
+    if plot["as_of"]:
+        artists["as_of"] = fig.text(0.99, 0.01, f'Data as of: {plot["as_of"]}', ha='right', va='bottom',
+                                    fontsize=8, color='#888888')
+    return fig, artists
+
+
+def update_figure(fig, artists, plot):
+    """Swap new data into an existing figure built with the same layout"""
+    ax1, ax2 = fig.axes[:2]
+    for kind in ("mean", "variance"):
+        for key, line in artists[kind].items():
+            xs, ys = plot[kind + "s"][key]
+            line.set_data(xs, ys)
+            line.set_markevery(markevery(xs))
+    ax1.relim()
+    ax1.autoscale_view(scaley=False)
+    ax2.relim()
+    ax2.set_autoscaley_on(True)
+    ax2.autoscale_view()
+    ax2.set_ylim(bottom=0)
+    if artists["as_of"] is not None:
+        artists["as_of"].set_text(f'Data as of: {plot["as_of"]}')
+
+
+def save_figure(fig, png_file, cache_key, data_dir=DATA_DIR):
+    fig.tight_layout()
+    fig.savefig(data_dir / png_file, dpi=DPI, facecolor='#1a1a1a', edgecolor='none',
+                metadata={RENDER_KEY: cache_key, "Software": "make_graphs.py"})
+
+
+def render(plot, png_file, title, cache_key, data_dir=DATA_DIR):
+    """Draw the mean/variance figure for one dataset (runs in a pool worker)"""
+    fig, _ = build_figure(plot, title)
+    save_figure(fig, png_file, cache_key, data_dir)
+    plt.close(fig)
+    return png_file
+
+
+def timed_render(*job):
+    """render() in a pool worker, returning (png_file, seconds) for the parent's metrics"""
+    start = time.perf_counter()
+    return render(*job), time.perf_counter() - start
+
+
+class ResidentRenderer:
+    """Keeps one live figure per dataset across cycles (see auto_update.py)
+
+    Updates the existing Line2D objects with set_data instead of paying for
+    an interpreter, the matplotlib import and every figure build each cycle;
+    compare with `make_graphs.py --bench 5`.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.figures = {}      # png_file → (layout, fig, artists)
+        self.raw_hours = RAW_HOURS
+        self.manifest = Manifest.for_data_dir(self.data_dir)
+        self.cycles = 0
+        self.cold_s = None     # First cycle: every figure built from scratch
+        self.last_s = None
+        self.warm_s = []       # Later cycles (kept short; see summary())
+
+    def render(self, plot, png_file, title, cache_key):
+        shape = layout(plot, title)
+        current = self.figures.get(png_file)
+        if current is not None and current[0] == shape:
+            _, fig, artists = current
+            update_figure(fig, artists, plot)
+        else:
+            if current is not None:
+                plt.close(current[1])
+            fig, artists = build_figure(plot, title)
+            self.figures[png_file] = (shape, fig, artists)
+        save_figure(fig, png_file, cache_key, self.data_dir)
+        return png_file
+
+    def cycle(self, force=False):
+        """Update history and re-render changed graphs; returns per-cycle stats"""
+        start = time.perf_counter()
+        with open_store(self.data_dir, self.raw_hours) as store:
+            with span("plan"):
+                jobs = plan(store, self.data_dir, force, self.manifest)
+            # Published copy of the history; history.db stays on this machine
+            written = [self.data_dir / JSON_NAME] if store.export_json() else []
+        rendered = 0
+        for job in jobs:
+            try:
+                with span("draw", graph=Path(job[1]).stem):
+                    png_file = self.render(*job)
+                print(f"✓ Generated {png_file}")
+                self.manifest.confirm(step_name("graph", png_file))
+                written.append(self.data_dir / png_file)
+                rendered += 1
+            except Exception as e:
+                print(f"Error rendering {job[1]}: {e}")
+        self.manifest.save()
+        self.last_s = time.perf_counter() - start
+        if self.cycles == 0:
+            self.cold_s = self.last_s
+        else:
+            self.warm_s = (self.warm_s + [self.last_s])[-100:]
+        self.cycles += 1
+        return {"rendered": rendered, "skipped": len(DATASETS) - len(jobs), "seconds": self.last_s,
+                "files": written,
+                "warm": self.cycles > 1}
+
+    def summary(self):
+        warm = sorted(self.warm_s)
+        return {
+            "cycles": self.cycles,
+            "cold_ms": round(self.cold_s * 1000, 1) if self.cold_s is not None else None,
+            "warm_p50_ms": round(warm[len(warm) // 2] * 1000, 1) if warm else None,
+            "last_ms": round(self.last_s * 1000, 1) if self.last_s is not None else None,
+        }
+
+    def close(self):
+        for _, fig, _ in self.figures.values():
+            plt.close(fig)
+        self.figures.clear()
+
+
+def bench(cycles):
+    """Cold subprocess runs (what auto_update used to do) vs warm resident cycles"""
+    import subprocess
+    cold = []
+    for _ in range(2):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, __file__, "--force"], capture_output=True, check=True)
+        cold.append(time.perf_counter() - start)
+    renderer = ResidentRenderer()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            for _ in range(cycles + 1):
+                renderer.cycle(force=True)
+        finally:
+            sys.stdout = stdout
+    summary = renderer.summary()
+    print(f"Subprocess per cycle (new interpreter, all graphs): "
+          f"{', '.join(f'{t * 1000:.0f}' for t in cold)} ms")
+    print(f"Resident, first cycle (figures built):  {summary['cold_ms']:.0f} ms")
+    print(f"Resident, warm cycles (set_data), p50:  {summary['warm_p50_ms']:.0f} ms "
+          f"over {len(renderer.warm_s)} cycles")
+    renderer.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--bench" in argv:
+        index = argv.index("--bench")
+        cycles = int(argv[index + 1]) if len(argv) > index + 1 else 5
+        return bench(cycles)
+
+    start = time.perf_counter()
+    metrics = registry("make_graphs")
+    DATA_DIR.mkdir(exist_ok=True)
+
+    # History first, sequentially and in file order (deterministic output)
+    manifest = Manifest.for_data_dir(DATA_DIR)
+    with open_store() as store, span("plan"):
+        jobs = plan(store, force="--force" in argv, manifest=manifest)
+        print(f"✓ History: {store.count()} records in {len(store.series())} datasets")
+        if store.export_json():
+            print(f"✓ Generated {JSON_NAME}")
+
+    # Renders are independent of each other: fan them out over the cores
+    # (TRT_RENDER_WORKERS overrides; 1 renders inline)
+    workers = min(RENDER_WORKERS, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(timed_render, *job) for job in jobs]
+            for future, job in zip(futures, jobs):
+                try:
+                    png_file, seconds = future.result()
+                    metrics.observe("draw", seconds, graph=Path(png_file).stem)
+                    print(f"✓ Generated {png_file}")
+                    manifest.confirm(step_name("graph", job[1]))
+                except Exception as e:
+                    metrics.observe("draw", None, ok=False, graph=Path(job[1]).stem)
+                    print(f"Error rendering {job[1]}: {e}")
+    else:
+        for job in jobs:
+            try:
+                with span("draw", graph=Path(job[1]).stem):
+                    png_file = render(*job)
+                print(f"✓ Generated {png_file}")
+                manifest.confirm(step_name("graph", job[1]))
+            except Exception as e:
+                print(f"Error rendering {job[1]}: {e}")
+    manifest.save()
+    metrics.flush(force=True)
 
-    plt.tight_layout()
-    output_path = DATA_DIR / png_file
-    plt.savefig(output_path, dpi=200, facecolor='#1a1a1a', edgecolor='none')
-    plt.close()
-    print(f"✓ Generated {png_file}")
+    print(f"\n✅ All TRT graphs updated! ({len(jobs)} rendered, {workers or 1} workers, "
+          f"{time.perf_counter() - start:.1f}s)")
 
-# Save accumulated history for next run
-with open(history_file, 'w') as f:
-    json.dump(history_data, f, indent=2)
-print(f"✓ Saved history ({len(history_data)} datasets)")
 
-print("\n✅ All TRT graphs updated!")
+if __name__ == "__main__":
+    main()
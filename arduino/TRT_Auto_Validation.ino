@@ -20,6 +20,14 @@ PwmOut *ledPwm = nullptr;
 #define LED_PIN 9
 #define PHOTO_PIN A0
 
+// Serial sample format: 0 = CSV text "time_s,voltage" (~20 bytes/sample)
+//                       1 = binary frames (9 bytes/sample), decoded by
+//                           scripts/serial_ingest.py which auto-detects either
+// Frame: 0xA5 0x5A | uint32 millis LE | uint16 raw ADC LE | CRC-8 (poly 0x07)
+#ifndef TRT_BINARY_SERIAL
+#define TRT_BINARY_SERIAL 0
+#endif
+
 // Wi-Fi credentials
 const char* ssid = "Girod-House-of-Big-Nuts";
 const char* password = "qwe12345";
@@ -39,6 +47,11 @@ const char* repoPaths[] = {
 
 const char* repoPath; // Will be updated based on current phase
 
+// Blob SHA of each phase file as returned by our last successful PUT.
+// Only the current phase's file changes per post, so a multi-file commit does
+// not apply here; caching the SHA instead saves the GET before every PUT.
+String phaseSHA[7];
+
 WiFiSSLClient wifi;
 HttpClient client = HttpClient(wifi, githubHost, 443);
 
@@ -102,6 +115,34 @@ void addDebugLog(String message) {
   Serial.println(message);
 }
 
+// Binary sample frame: A5 5A, millis (LE32), raw (LE16), CRC-8 of the payload
+#if TRT_BINARY_SERIAL
+uint8_t trtCrc8(const uint8_t* data, size_t len) {
+  uint8_t crc = 0;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+void sendBinarySample(unsigned long ms, int raw) {
+  uint8_t frame[9];
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  frame[2] = ms & 0xFF;
+  frame[3] = (ms >> 8) & 0xFF;
+  frame[4] = (ms >> 16) & 0xFF;
+  frame[5] = (ms >> 24) & 0xFF;
+  frame[6] = raw & 0xFF;
+  frame[7] = (raw >> 8) & 0xFF;
+  frame[8] = trtCrc8(frame + 2, 6);
+  Serial.write(frame, sizeof(frame));
+}
+#endif
+
 // Set PWM frequency using mbed
 void setPWMFrequency(int freqHz) {
   if (ledPwm) {
@@ -212,9 +253,13 @@ void loop() {
   idx++;
 
   // Print to Serial
+#if TRT_BINARY_SERIAL
+  sendBinarySample(ms, raw);
+#else
   Serial.print(ms / 1000.0, 6);
   Serial.print(",");
   Serial.println(v, 6);
+#endif
 
   // AUTO-VALIDATION: Check if we need to advance to next phase
   if (millis() - phaseStartTime >= phaseDuration && currentPhase < 6) {
@@ -588,46 +633,50 @@ void postToGitHub() {
   Serial.println("JSON Data:");
   Serial.println(jsonData);
 
-  // Step 1: GET the file to retrieve its SHA (if it exists)
-  Serial.println("Step 1: Getting current file SHA...");
+  String fileSHA = phaseSHA[currentPhase];
 
-  client.beginRequest();
-  client.get(repoPath);
-  client.sendHeader("Host", githubHost);
-  client.sendHeader("Authorization", String("Bearer ") + githubToken);
-  client.sendHeader("User-Agent", "TRT-GIGA-R1");
-  client.sendHeader("Accept", "application/vnd.github.v3+json");
-  client.endRequest();
+  // Step 1: GET the file to retrieve its SHA (only if we don't know it yet)
+  if (fileSHA.length() == 0) {
+    Serial.println("Step 1: Getting current file SHA...");
 
-  int getStatusCode = client.responseStatusCode();
-  String getResponse = client.responseBody();
+    client.beginRequest();
+    client.get(repoPath);
+    client.sendHeader("Host", githubHost);
+    client.sendHeader("Authorization", String("Bearer ") + githubToken);
+    client.sendHeader("User-Agent", "TRT-GIGA-R1");
+    client.sendHeader("Accept", "application/vnd.github.v3+json");
+    client.endRequest();
 
-  Serial.print("GET Status: ");
-  Serial.println(getStatusCode);
+    int getStatusCode = client.responseStatusCode();
+    String getResponse = client.responseBody();
 
-  String fileSHA = "";
+    Serial.print("GET Status: ");
+    Serial.println(getStatusCode);
 
-  // Extract SHA from response if file exists
-  if (getStatusCode == 200) {
-    // Parse SHA from JSON response
-    int shaIndex = getResponse.indexOf("\"sha\":");
-    if (shaIndex != -1) {
-      int shaStart = getResponse.indexOf("\"", shaIndex + 6) + 1;
-      int shaEnd = getResponse.indexOf("\"", shaStart);
-      fileSHA = getResponse.substring(shaStart, shaEnd);
-      Serial.print("Found SHA: ");
-      Serial.println(fileSHA);
+    // Extract SHA from response if file exists
+    if (getStatusCode == 200) {
+      // Parse SHA from JSON response
+      int shaIndex = getResponse.indexOf("\"sha\":");
+      if (shaIndex != -1) {
+        int shaStart = getResponse.indexOf("\"", shaIndex + 6) + 1;
+        int shaEnd = getResponse.indexOf("\"", shaStart);
+        fileSHA = getResponse.substring(shaStart, shaEnd);
+        Serial.print("Found SHA: ");
+        Serial.println(fileSHA);
+      }
+    } else if (getStatusCode == 404) {
+      Serial.println("File doesn't exist yet, will create it");
+    } else {
+      Serial.print("GET failed with code: ");
+      Serial.println(getStatusCode);
     }
-  } else if (getStatusCode == 404) {
-    Serial.println("File doesn't exist yet, will create it");
+
+    client.stop();
+    delay(100); // Small delay between requests
   } else {
-    Serial.print("GET failed with code: ");
-    Serial.println(getStatusCode);
+    Serial.println("Step 1: Using cached SHA " + fileSHA);
   }
 
-  client.stop();
-  delay(100); // Small delay between requests
-
   // Step 2: PUT/Update the file with SHA (if exists)
   Serial.println("Step 2: Uploading new content...");
 
@@ -677,10 +726,18 @@ void postToGitHub() {
     lastGitHubStatus = "Success";
     lastSuccessfulPost = millis();
     gitHubUploadCount++;  // Increment upload counter
+    // content.sha is the first "sha" in the PUT response
+    int shaIndex = response.indexOf("\"sha\":");
+    if (shaIndex != -1) {
+      int shaStart = response.indexOf("\"", shaIndex + 6) + 1;
+      int shaEnd = response.indexOf("\"", shaStart);
+      phaseSHA[currentPhase] = response.substring(shaStart, shaEnd);
+    }
     addDebugLog("GitHub: OK (" + String(statusCode) + ")");
   } else if (statusCode == 409 || statusCode == 422) {
     Serial.println("GitHub update FAILED - Conflict");
     lastGitHubStatus = "Conflict " + String(statusCode);
+    phaseSHA[currentPhase] = ""; // Stale: GET it again on the next post
     addDebugLog("GitHub: Conflict " + String(statusCode));
   } else if (statusCode == 401 || statusCode == 403) {
     Serial.println("GitHub update FAILED - Authentication error");
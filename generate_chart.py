@@ -1,63 +1,76 @@
 #!/usr/bin/env python3
 """
 Generate TRT Validation Chart from JSON data
+Exits straight away if data/latest.json and the chart code are unchanged
+since the last chart (scripts/build_graph.py); --force redraws anyway.
 """
 
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from build_graph import Manifest, chart_stamp
+
+# Checked before the heavy imports so an unchanged input costs milliseconds
+manifest = Manifest.for_data_dir('data')
+stamp = chart_stamp(manifest, 'data')
+if ('--force' not in sys.argv[1:] and not manifest.dirty('chart', stamp)
+        and os.path.exists('data/trt_validation.png')):
+    print("• data/latest.json unchanged since last chart")
+    sys.exit(0)
+
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
 from datetime import datetime
-import os
+
+from downsample import downsample, points_for_width
+from history_store import HistoryStore
+
+FIG_WIDTH_IN = 12
+DPI = 150
+PLOT_POINTS = points_for_width(FIG_WIDTH_IN, DPI)  # Per line, however long the history
 
 # Read the latest JSON data
 with open('data/latest.json', 'r') as f:
     data = json.load(f)
 
-# Read or create history file
-history_file = 'data/history.json'
-if os.path.exists(history_file):
-    with open(history_file, 'r') as f:
-        history = json.load(f)
-else:
-    history = {
-        'timestamps': [],
-        'var_100ms': [],
-        'var_10ms': [],
-        'var_1ms': []
-    }
-
-# Append current data to history (limit to last 100 points)
-history['timestamps'].append(data['timestamp_iso'])
-history['var_100ms'].append(data['delta_t_100ms']['variance'])
-history['var_10ms'].append(data['delta_t_10ms']['variance'])
-history['var_1ms'].append(data['delta_t_1ms']['variance'])
-
-# Keep only last 100 data points
-max_points = 100
-if len(history['timestamps']) > max_points:
-    history['timestamps'] = history['timestamps'][-max_points:]
-    history['var_100ms'] = history['var_100ms'][-max_points:]
-    history['var_10ms'] = history['var_10ms'][-max_points:]
-    history['var_1ms'] = history['var_1ms'][-max_points:]
+# Append current data to history (series "latest" in data/history.db)
+store = HistoryStore(os.path.join('data', 'history.db'))
+store.append('latest', data)
+store.export_json()
 
-# Save updated history
-with open(history_file, 'w') as f:
-    json.dump(history, f, indent=2)
+# Whole history at the finest resolution that fits the plot: raw records while
+# they fit, then the 1-minute, 1-hour or 1-day rollups
+bucket_ms, records = store.trend('latest', PLOT_POINTS)
+store.close()
+records = [r for r in records if all(k in r for k in ('delta_t_100ms', 'delta_t_10ms', 'delta_t_1ms'))]
+history = {
+    'timestamps': [r.get('timestamp_iso') for r in records],
+    'var_100ms': [r['delta_t_100ms']['variance'] for r in records],
+    'var_10ms': [r['delta_t_10ms']['variance'] for r in records],
+    'var_1ms': [r['delta_t_1ms']['variance'] for r in records],
+}
 
 # Create the chart
-fig, ax = plt.subplots(figsize=(12, 6))
+fig, ax = plt.subplots(figsize=(FIG_WIDTH_IN, 6))
 fig.patch.set_facecolor('#1a1a1a')
 ax.set_facecolor('#2a2a2a')
 
-# Plot the data
-x = range(len(history['timestamps']))
-ax.plot(x, history['var_100ms'], color='#ffff00', linewidth=2, label='Δt = 0.1s', marker='o', markersize=3)
-ax.plot(x, history['var_10ms'], color='#00ffff', linewidth=2, label='Δt = 0.01s', marker='s', markersize=3)
-ax.plot(x, history['var_1ms'], color='#ff00ff', linewidth=2, label='Δt = 0.001s', marker='^', markersize=3)
+# Plot the data (min/max per pixel column so no variance spike is dropped)
+x = list(range(len(history['timestamps'])))
+for key, color, label, marker in (('var_100ms', '#ffff00', 'Δt = 0.1s', 'o'),
+                                  ('var_10ms', '#00ffff', 'Δt = 0.01s', 's'),
+                                  ('var_1ms', '#ff00ff', 'Δt = 0.001s', '^')):
+    xs, ys = downsample(x, history[key], PLOT_POINTS, method='minmax')
+    ax.plot(xs, ys, color=color, linewidth=2, label=label, marker=marker, markersize=3,
+            markevery=max(1, len(xs) // 200))
 
 # Styling
-ax.set_xlabel('Sample Number', color='white', fontsize=12)
+TIER_LABELS = {60000: '1-minute', 3600000: '1-hour', 86400000: '1-day'}
+ax.set_xlabel('Sample Number' if not bucket_ms else f'{TIER_LABELS.get(bucket_ms, bucket_ms)} bucket',
+              color='white', fontsize=12)
 ax.set_ylabel('Variance', color='white', fontsize=12)
 ax.set_title('Time Resolution Theory — Variance Trends', color='white', fontsize=16, fontweight='bold')
 ax.tick_params(colors='white')
@@ -76,5 +89,7 @@ ax.text(0.02, 0.98, textstr, transform=ax.transAxes, fontsize=10,
         verticalalignment='top', bbox=props, color='white')
 
 plt.tight_layout()
-plt.savefig('data/trt_validation.png', dpi=150, facecolor='#1a1a1a')
+plt.savefig('data/trt_validation.png', dpi=DPI, facecolor='#1a1a1a')
 print("Chart generated successfully: data/trt_validation.png")
+manifest.record('chart', stamp)
+manifest.save()
@@ -1,69 +1,64 @@
 #!/usr/bin/env python3
 """
 Accumulate historical data points from JSON files.
-Appends current values to a history array so graphs show trends over time.
+Appends current values to the history store (data/history.db) so graphs show
+trends over time. Files unchanged since the last run (build_graph.py's
+manifest) are skipped without being read; --force appends from every file.
 """
 
-import json
+import sys
 from pathlib import Path
-from datetime import datetime
+from build_graph import DATASETS, Manifest, step_name
+from history_store import HistoryStore, series_name
+from record_stream import latest_record
 
 DATA_DIR = Path("data")
 
 # Files to track
-tracked_files = [
-    "control_off.json",
-    "control_on.json",
-    "sweep_100hz.json",
-    "sweep_1khz.json",
-    "sweep_10khz.json",
-    "sweep_20khz.json",
-    "live_trt.json"
-]
+tracked_files = [json_file for json_file, _, _, _ in DATASETS]
 
-history_file = DATA_DIR / "history.json"
 
-# Load existing history
-history = {}
-if history_file.exists():
-    with open(history_file) as f:
-        history = json.load(f)
+def accumulate(data_dir=DATA_DIR, force=False, manifest=None):
+    """Append each changed file's latest record to its series; returns how many were added"""
+    data_dir = Path(data_dir)
+    manifest = manifest if manifest is not None else Manifest.for_data_dir(data_dir)
+    history_file = data_dir / "history.db"
+    added = 0
 
-# Append current values to history
-for filename in tracked_files:
-    filepath = DATA_DIR / filename
-    if not filepath.exists():
-        continue
+    # Append current values to history (same store and series as make_graphs.py)
+    with HistoryStore(history_file) as history:
+        for filename in tracked_files:
+            filepath = data_dir / filename
+            if not filepath.exists():
+                continue
+            step = step_name("history", filename)
+            stamp = manifest.stamp([filepath])
+            if not force and not manifest.dirty(step, stamp):
+                print(f"• {filename} unchanged since last run")
+                continue
 
-    try:
-        with open(filepath) as f:
-            current_data = json.load(f)
+            try:
+                # Latest record; phase files repeat a "cycle_N" key per record
+                current_data = latest_record(filepath)
+                if current_data is None:
+                    raise ValueError("no complete record")
 
-        # Initialize history for this file if needed
-        if filename not in history:
-            history[filename] = []
+                # The whole record, with every Δt and the ladder; unchanged files add nothing
+                name = series_name(filename)
+                if history.append(name, current_data):
+                    print(f"✓ Added data point to {filename} history ({history.count(name)} points total)")
+                    added += 1
+                else:
+                    print(f"• {filename} unchanged ({history.count(name)} points total)")
+                manifest.record(step, stamp)
 
-        # Append current snapshot with timestamp
-        history[filename].append({
-            'timestamp': datetime.now().isoformat(),
-            'timestamp_ms': current_data.get('timestamp_ms', 0),
-            'delta_t_100ms': current_data.get('delta_t_100ms', {}),
-            'delta_t_10ms': current_data.get('delta_t_10ms', {}),
-            'delta_t_1ms': current_data.get('delta_t_1ms', {}),
-            'sample_count': current_data.get('sample_count', 0)
-        })
+            except Exception as e:
+                print(f"✗ Error processing {filename}: {e}")
 
-        # Keep last 1000 data points per file (limit history size)
-        if len(history[filename]) > 1000:
-            history[filename] = history[filename][-1000:]
+    manifest.save()
+    print(f"\n✅ History store updated: {history_file}")
+    return added
 
-        print(f"✓ Added data point to {filename} history ({len(history[filename])} points total)")
 
-    except Exception as e:
-        print(f"✗ Error processing {filename}: {e}")
-
-# Save updated history
-with open(history_file, 'w') as f:
-    json.dump(history, f, indent=2)
-
-print(f"\n✅ History file updated: {history_file}")
+if __name__ == "__main__":
+    accumulate(force="--force" in sys.argv[1:])
@@ -1,21 +1,37 @@
 #!/usr/bin/env python3
 """
 TRT Auto-Update Script
-Pulls data from Arduino, generates graphs, and pushes to GitHub
+Pulls data from one or more Arduinos, generates graphs, and pushes to GitHub
 """
 
+import asyncio
 import requests
 import json
+import os
 import subprocess
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
+from device_poll import DEFAULT_TIMEOUT, DEVICE_NAME, CircuitBreaker, fetch_json
+from trt_metrics import registry, span
+from trt_pipeline import LatencyStats
+
 # Paths
 REPO_DIR = Path("/home/joshuag/Time-Resolution-Theory-Live-Proof")
 SCRIPTS_DIR = REPO_DIR / "scripts"
 CONFIG_FILE = SCRIPTS_DIR / "config.json"
 ACTIVITY_LOG = SCRIPTS_DIR / "activity.json"
+GRAPH_SCRIPT = REPO_DIR / ".github" / "scripts" / "make_graphs.py"
+
+# Resident renderers (make_graphs.ResidentRenderer) per data directory, created on first use
+_renderers = {}
+
+QUEUE_DEPTH = 1             # Pending items per stage; older ones are superseded
+PUSH_RETRY_S = 60           # Wait after a failed push before trying again
+FINGERPRINT_KEYS = ("samples", "timestamp_ms", "cycle", "phase")
+RESTART_CONFIRMATIONS = 3   # Advancing payloads below the last one before accepting a reboot
 
 def load_config():
     """Load configuration"""
@@ -25,11 +41,15 @@ def load_config():
     except:
         return {
             "arduino_ip": "http://192.168.1.91",
+            "device_timeout": DEFAULT_TIMEOUT,
             "update_interval": 30,
             "repo_dir": str(REPO_DIR),
             "data_dir": "data",
             "github_enabled": True,
-            "max_history_points": 200
+            "history_raw_hours": 48,
+            "push_interval": 300,
+            "push_max_commits": 10,
+            "resident_renderer": True
         }
 
 def load_activity():
@@ -45,17 +65,20 @@ def save_activity(activity):
     with open(ACTIVITY_LOG, 'w') as f:
         json.dump(activity, f, indent=2)
 
-def log_push(files):
+def log_push(files, commits=1, seconds=None):
     """Log a GitHub push"""
     activity = load_activity()
     activity["pushes"].append({
         "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        "files": files
+        "files": files,
+        "commits": commits,
+        "seconds": round(seconds, 2) if seconds is not None else None
     })
     # Keep last 100 pushes
     activity["pushes"] = activity["pushes"][-100:]
     activity["stats"]["total_pushes"] += 1
     activity["stats"]["total_files"] += len(files)
+    activity["stats"]["total_commits"] = activity["stats"].get("total_commits", 0) + commits
     save_activity(activity)
 
 def fetch_arduino_data(arduino_ip):
@@ -71,35 +94,158 @@ def fetch_arduino_data(arduino_ip):
         print(f"❌ Error fetching Arduino data: {e}")
         return None
 
+def device_specs(config):
+    """[(name, url, data_dir, timeout, legacy)] for every configured device"""
+    timeout = config.get('device_timeout', DEFAULT_TIMEOUT)
+    if not config.get('devices'):
+        return [("arduino", config['arduino_ip'], config['data_dir'], timeout, True)]
+    specs, seen = [], set()
+    for entry in config['devices']:
+        name, url = entry.get('name'), entry.get('ip')
+        if not isinstance(name, str) or not DEVICE_NAME.match(name) or name in seen or not url:
+            print(f"⚠️  Ignoring device {entry}: needs a unique name ([A-Za-z0-9_-]) and an ip")
+            continue
+        seen.add(name)
+        specs.append((name, url, entry.get('data_dir', f"{config['data_dir']}/devices/{name}"),
+                      entry.get('timeout', timeout), False))
+    return specs
+
 def save_data(data, filename, data_dir):
-    """Save data to JSON file"""
+    """Save data to JSON file (atomically: readers never see a partial file)
+
+    Returns the path written, or None on failure.
+    """
     filepath = REPO_DIR / data_dir / filename
     try:
-        with open(filepath, 'w') as f:
+        tmp = filepath.with_name(f".{filepath.name}.tmp")
+        with open(tmp, 'w') as f:
             json.dump(data, f, indent=2)
-        return True
+        os.replace(tmp, filepath)
+        return filepath
     except Exception as e:
         print(f"❌ Error saving {filename}: {e}")
-        return False
+        return None
+
+def fingerprint(data):
+    """What identifies a payload's progress"""
+    return tuple(data.get(key) for key in FINGERPRINT_KEYS)
+
+class ChangeDetector:
+    """Classifies each fetched payload against the last processed one
+
+    check() returns "new", "unchanged", "regressed" or "restarted"; only
+    "new" and "restarted" payloads should be processed.
+
+    A restart is confirmed by restart_after regressed payloads that keep
+    advancing from the new baseline. Repeating the same regressed payload
+    (a rebooted board that has not produced anything new yet) neither
+    confirms nor resets the streak: it is skipped and counted as a
+    "regressed" repeat, and the restart is confirmed once the board moves on.
+    """
+
+    def __init__(self, restart_after=RESTART_CONFIRMATIONS):
+        self.restart_after = restart_after
+        self.last = None            # Fingerprint of the last processed payload
+        self.candidate = None       # Newest regressed fingerprint (possible reboot)
+        self.streak = 0             # Advancing regressed payloads (repeats do not count)
+        self.processed = 0
+        self.restarts = 0
+        self.skipped = {"unchanged": 0, "regressed": 0}
+
+    def seed(self, data):
+        """Start from a payload processed before (e.g. the saved live_trt.json)"""
+        if data:
+            self.last = fingerprint(data)
+
+    @staticmethod
+    def _behind(a, b):
+        """True if fingerprint a is behind b on either progress counter"""
+        return any(x is not None and y is not None and x < y
+                   for x, y in ((a[0], b[0]), (a[1], b[1])))
+
+    def check(self, data):
+        current = fingerprint(data)
+        if self.last is None or (current != self.last and not self._behind(current, self.last)):
+            verdict = "new"
+        elif current == self.last:
+            verdict = "unchanged"
+        else:
+            # Behind what we processed: stale replay, or a board that rebooted
+            if current != self.candidate:
+                advancing = self.candidate is not None and not self._behind(current, self.candidate)
+                self.streak = self.streak + 1 if advancing else 1
+                self.candidate = current
+            verdict = "restarted" if self.streak >= self.restart_after else "regressed"
+        if verdict in ("new", "restarted"):
+            self.last, self.candidate, self.streak = current, None, 0
+            self.processed += 1
+            self.restarts += verdict == "restarted"
+        else:
+            self.skipped[verdict] += 1
+        return verdict
+
+    def counts(self):
+        return {"processed": self.processed, "restarted": self.restarts, **self.skipped}
+
+    def summary(self):
+        return f"{self.processed} processed ({self.restarts} after a restart), " \
+               f"{self.skipped['unchanged']} unchanged, {self.skipped['regressed']} regressed skipped"
+
+def get_renderer(data_dir="data"):
+    """Import make_graphs once and keep each directory's figures alive between cycles"""
+    renderer = _renderers.get(data_dir)
+    if renderer is None:
+        start = time.perf_counter()
+        if str(GRAPH_SCRIPT.parent) not in sys.path:
+            sys.path.insert(0, str(GRAPH_SCRIPT.parent))
+        import make_graphs
+        renderer = _renderers[data_dir] = make_graphs.ResidentRenderer(REPO_DIR / data_dir)
+        print(f"   Renderer for {data_dir} loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return renderer
+
+def generate_graphs(resident=True, raw_hours=None, data_dir="data"):
+    """Render one data directory's graphs in-process (warm figures), or via the script as a subprocess
+
+    Returns the paths written (re-rendered PNGs, history.json), or None
+    on failure.
+    """
+    if resident:
+        try:
+            renderer = get_renderer(data_dir)
+            renderer.raw_hours = raw_hours
+            stats = renderer.cycle()
+            summary = renderer.summary()
+            print(f"✓ Graphs generated ({stats['rendered']} rendered, "
+                  f"{stats['seconds'] * 1000:.0f} ms {'warm' if stats['warm'] else 'cold'}; "
+                  f"cold {summary['cold_ms']} ms, warm p50 {summary['warm_p50_ms']} ms)")
+            return stats['files']
+        except Exception as e:
+            print(f"❌ Resident renderer failed ({e}), falling back to subprocess")
 
-def generate_graphs():
-    """Run the graph generation script"""
     try:
+        start = time.perf_counter()
+        env = dict(os.environ, TRT_DATA_DIR=str(data_dir))
+        if raw_hours is not None:
+            env["TRT_HISTORY_RAW_HOURS"] = str(raw_hours)
         result = subprocess.run(
-            ["python3", str(REPO_DIR / ".github" / "scripts" / "make_graphs.py")],
+            ["python3", str(GRAPH_SCRIPT)],
             cwd=REPO_DIR,
+            env=env,
             capture_output=True,
             text=True
         )
         if result.returncode == 0:
-            print("✓ Graphs generated")
-            return True
+            print(f"✓ Graphs generated (subprocess, {(time.perf_counter() - start) * 1000:.0f} ms)")
+            data_dir = REPO_DIR / data_dir
+            return [
+                data_dir / line.split("✓ Generated ", 1)[1].strip()
+                for line in result.stdout.splitlines() if line.startswith("✓ Generated ")]
         else:
             print(f"❌ Graph generation failed: {result.stderr}")
-            return False
+            return None
     except Exception as e:
         print(f"❌ Error generating graphs: {e}")
-        return False
+        return None
 
 def get_changed_files():
     """Get list of changed files"""
@@ -115,71 +261,118 @@ def get_changed_files():
     except:
         return []
 
-def push_to_github():
-    """Push changes to GitHub"""
-    try:
-        # Add all changes
+def commit_changes(paths=None):
+    """Stage and commit local changes; returns the committed files ([] if none)
+
+    paths: the files to stage (what the pipeline wrote). None stages the
+    whole working tree.
+    """
+    if paths is None:
         subprocess.run(["git", "add", "."], cwd=REPO_DIR, check=True)
+    else:
+        paths = sorted(str(p) for p in paths if Path(p).exists())
+        if not paths:
+            return []
+        subprocess.run(["git", "add", "--", *paths], cwd=REPO_DIR, check=True)
+
+    # Check if there are changes to commit
+    result = subprocess.run(
+        ["git", "diff", "--cached", "--quiet"],
+        cwd=REPO_DIR
+    )
+    if result.returncode == 0:
+        return []
 
-        # Check if there are changes to commit
-        result = subprocess.run(
-            ["git", "diff", "--cached", "--quiet"],
-            cwd=REPO_DIR
+    # Get list of files being committed
+    changed_files = get_changed_files()
+
+    # Commit
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
+    commit_msg = f"Auto-update TRT data and graphs - {timestamp}"
+    subprocess.run(
+        ["git", "commit", "-m", commit_msg],
+        cwd=REPO_DIR,
+        check=True
+    )
+    return changed_files
+
+def resolve_conflicts():
+    """Finish a conflicted pull: fresh device data for data files, ours for graphs and history.json
+
+    Raises if a conflicted file is neither, or a device cannot be fetched;
+    the caller aborts the merge.
+    """
+    result = subprocess.run(["git", "diff", "--name-only", "--diff-filter=U"],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    conflicted = [f for f in result.stdout.splitlines() if f]
+    sources = {}                              # data file → device url
+    for name, url, data_dir, _, legacy in device_specs(load_config()):
+        sources[(Path(data_dir) / "live_trt.json").as_posix()] = url
+        if legacy:
+            sources["live_data/trt_live_data.json"] = url
+    for path in conflicted:
+        if path in sources:
+            # Fetch latest data from the Arduino that owns the file
+            data = fetch_arduino_data(sources[path])
+            if not data:
+                raise RuntimeError(f"no fresh data for {path}")
+            with open(REPO_DIR / path, 'w') as f:
+                json.dump(data, f, indent=2)
+        elif path.endswith(".png") or Path(path).name == "history.json":
+            # Graphs and the history export are rewritten from local data every cycle
+            subprocess.run(["git", "checkout", "--ours", "--", path], cwd=REPO_DIR, check=True)
+        else:
+            raise RuntimeError(f"cannot resolve {path}")
+    subprocess.run(["git", "add", "--", *conflicted], cwd=REPO_DIR, check=True)
+    subprocess.run(
+        ["git", "commit", "-m", "Resolve merge conflict with latest Arduino data"],
+        cwd=REPO_DIR,
+        check=True
+    )
+
+def push_commits(changed_files, commits=1):
+    """Pull (resolving conflicts with fresh Arduino data) and push committed changes"""
+    start = time.perf_counter()
+    # Pull before pushing (in case of remote changes)
+    with span("git_pull") as outcome:
+        pull_result = subprocess.run(
+            ["git", "pull", "origin", "main", "--no-rebase"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True
         )
+        outcome.ok = pull_result.returncode == 0
+
+    # Check for merge conflicts
+    if pull_result.returncode != 0 and "CONFLICT" in pull_result.stdout:
+        print("⚠️  Merge conflict detected, resolving...")
+        try:
+            resolve_conflicts()
+        except Exception as e:
+            # Never leave the checkout mid-merge: every later commit would fail
+            subprocess.run(["git", "merge", "--abort"], cwd=REPO_DIR, capture_output=True)
+            raise RuntimeError(f"merge conflict not resolved ({e}); merge aborted")
+        print("✓ Conflict resolved")
+
+    # Push
+    with span("git_push"):
+        subprocess.run(["git", "push", "origin", "main"], cwd=REPO_DIR, check=True)
+    seconds = time.perf_counter() - start
+    print(f"✓ Pushed to GitHub ({commits} commit(s), {len(changed_files)} files, {seconds:.1f}s)")
+
+    # Log the push
+    log_push(changed_files, commits, seconds)
+    return seconds
 
-        if result.returncode != 0:  # There are changes
-            # Get list of files being committed
-            changed_files = get_changed_files()
-
-            # Commit
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
-            commit_msg = f"Auto-update TRT data and graphs - {timestamp}\n\n🤖 Generated with [Claude Code](https://claude.com/claude-code)\n\nCo-Authored-By: Claude <noreply@anthropic.com>"
-            subprocess.run(
-                ["git", "commit", "-m", commit_msg],
-                cwd=REPO_DIR,
-                check=True
-            )
-
-            # Pull before pushing (in case of remote changes)
-            pull_result = subprocess.run(
-                ["git", "pull", "origin", "main", "--no-rebase"],
-                cwd=REPO_DIR,
-                capture_output=True,
-                text=True
-            )
-
-            # Check for merge conflicts
-            if pull_result.returncode != 0 and "CONFLICT" in pull_result.stdout:
-                print("⚠️  Merge conflict detected, resolving...")
-
-                # Fetch latest data from Arduino to resolve conflict
-                config = load_config()
-                data = fetch_arduino_data(config['arduino_ip'])
-                if data:
-                    # Write latest data to resolve conflict
-                    conflict_file = REPO_DIR / "live_data" / "trt_live_data.json"
-                    with open(conflict_file, 'w') as f:
-                        json.dump(data, f, indent=2)
-
-                    # Add resolved file and commit
-                    subprocess.run(["git", "add", str(conflict_file)], cwd=REPO_DIR, check=True)
-                    subprocess.run(
-                        ["git", "commit", "-m", f"Resolve merge conflict with latest Arduino data\n\n🤖 Generated with [Claude Code](https://claude.com/claude-code)\n\nCo-Authored-By: Claude <noreply@anthropic.com>"],
-                        cwd=REPO_DIR,
-                        check=True
-                    )
-                    print("✓ Conflict resolved")
-
-            # Push
-            subprocess.run(["git", "push", "origin", "main"], cwd=REPO_DIR, check=True)
-            print(f"✓ Pushed to GitHub ({len(changed_files)} files)")
-
-            # Log the push
-            log_push(changed_files)
-            return True
-        else:
+def push_to_github():
+    """Push changes to GitHub"""
+    try:
+        changed_files = commit_changes()
+        if not changed_files:
             print("• No changes to push")
             return True
+        push_commits(changed_files)
+        return True
     except subprocess.CalledProcessError as e:
         print(f"❌ Git operation failed: {e}")
         return False
@@ -187,65 +380,283 @@ def push_to_github():
         print(f"❌ Error pushing to GitHub: {e}")
         return False
 
-def main():
-    """Main loop"""
-    config = load_config()
-
-    print("=" * 60)
-    print("TRT AUTO-UPDATE SCRIPT")
-    print("=" * 60)
-    print(f"Arduino: {config['arduino_ip']}")
-    print(f"Update interval: {config['update_interval']} seconds")
-    print(f"Data directory: {config['data_dir']}")
-    print(f"GitHub pushing: {'Enabled' if config['github_enabled'] else 'Disabled'}")
-    print("=" * 60)
-    print()
-
-    iteration = 0
-
-    while True:
+def offer(queue, item):
+    """Put without blocking; a full queue drops its oldest item. True if one was dropped"""
+    dropped = False
+    if queue.full():
+        queue.get_nowait()
+        queue.task_done()
+        dropped = True
+    queue.put_nowait(item)
+    return dropped
+
+class Device:
+    """One polled board: where its data goes, plus its change and failure state"""
+
+    def __init__(self, name, url, data_dir, timeout, legacy=False):
+        self.name = name
+        self.url = url
+        self.data_dir = data_dir              # Relative to REPO_DIR
+        self.timeout = timeout
+        self.legacy = legacy                  # The single arduino_ip device (also live_data/)
+        self.breaker = CircuitBreaker()
+        self.changes = ChangeDetector()
+        (REPO_DIR / data_dir).mkdir(parents=True, exist_ok=True)
+        try:
+            with open(REPO_DIR / data_dir / "live_trt.json") as f:
+                self.changes.seed(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+class Pipeline:
+    """Fetch → render → publish, overlapping, on a fixed-rate fetch schedule
+
+    Fetches run at start + k * update_interval and skip (and log) missed
+    ticks rather than bursting. The stages are joined by queues of
+    QUEUE_DEPTH where the newest item replaces the oldest, so a slow render
+    or push never delays a fetch. Every cycle is committed, staging only the
+    files written; pushes go out every push_interval or push_max_commits.
+    """
+
+    def __init__(self):
+        self.config = load_config()
+        self.files_lock = asyncio.Lock()      # Graph/history writes vs. git add/commit
+        self.render_queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+        self.publish_queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+        self.iteration = 0
+        self.missed = 0                       # Fetch deadlines that passed unserved
+        self.superseded = {"render": 0, "publish": 0}
+        self.devices = {}                     # name → Device
+        self.device_key = None                # Device config last synced
+        self.sync_devices(self.config)
+        self.pending = set()                  # Devices with data saved but not yet rendered
+        self.queued = None                    # Iteration whose render is queued
+        self.written = set()                  # Paths written since the last commit
+        self.unpushed_commits = 0
+        self.unpushed_files = set()
+        self.oldest_unpushed = None           # loop.time() of the first unpushed commit
+        self.retry_at = 0.0
+        self.pushes = 0
+        self.commits_pushed = 0
+        self.push_latency = LatencyStats()
+        self.metrics = registry("auto_update")  # Stage spans, read by the dashboard's /metrics
+
+    async def run(self):
+        await asyncio.gather(self.schedule(), self.render_stage(), self.publish_stage())
+
+    async def schedule(self):
+        """Run fetch() at start + k * update_interval, never sleeping the work time"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            with span("tick"):
+                await self.fetch()
+            self.metrics.flush()
+            interval = self.config['update_interval']
+            deadline += interval
+            now = loop.time()
+            if now > deadline:
+                late = now - deadline
+                skipped = int(late // interval) + 1
+                self.missed += skipped
+                print(f"⚠️  Missed {skipped} fetch deadline(s): cycle overran by {late:.1f}s "
+                      f"({self.missed} missed in total)")
+                deadline += skipped * interval
+            print(f"\n⏳ Next update in {deadline - now:.1f} seconds...")
+            await asyncio.sleep(deadline - now)
+
+    def sync_devices(self, config):
+        """Match self.devices to the config, keeping the state of devices that stay"""
+        key = json.dumps([config.get(k) for k in ('devices', 'arduino_ip', 'data_dir', 'device_timeout')],
+                         sort_keys=True)
+        if key == self.device_key:
+            return
+        self.device_key = key
+        devices = {}
+        for name, url, data_dir, timeout, legacy in device_specs(config):
+            device = self.devices.get(name)
+            if device is None or device.data_dir != data_dir:
+                device = Device(name, url, data_dir, timeout, legacy)
+            device.url, device.timeout, device.legacy = url, timeout, legacy
+            devices[name] = device
+        self.devices = devices
+
+    async def fetch(self):
         # Reload config each iteration (allows live updates)
-        config = load_config()
-
-        iteration += 1
+        self.config = config = load_config()
+        self.sync_devices(config)
+        self.iteration += 1
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"\n[{timestamp}] Iteration #{iteration}")
+        print(f"\n[{timestamp}] Iteration #{self.iteration}")
         print("-" * 60)
 
-        # Step 1: Fetch data from Arduino
-        print("1. Fetching data from Arduino...")
-        data = fetch_arduino_data(config['arduino_ip'])
-
-        if data:
-            print(f"   ✓ Received data: {data.get('samples', '?')} samples, phase {data.get('phase', '?')}")
-
-            # Step 2: Save data locally
-            print("2. Saving data locally...")
-            save_data(data, "live_trt.json", config['data_dir'])
-
-            # Also save to live_data directory for compatibility
-            live_data_dir = "live_data"
-            (REPO_DIR / live_data_dir).mkdir(exist_ok=True)
-            save_data(data, "trt_live_data.json", live_data_dir)
-
+        # Step 1: Fetch data from every device at once
+        print(f"1. Fetching data from {len(self.devices)} device(s)...")
+        await asyncio.gather(*(self.poll(device, self.iteration) for device in self.devices.values()))
+
+    async def poll(self, device, iteration):
+        """Fetch, check and save one device; queue a render as soon as its data is in"""
+        breaker = device.breaker
+        if not breaker.allow():
+            print(f"   • {device.name}: circuit open after {breaker.failures} failures; "
+                  f"next probe in {breaker.retry_in():.0f}s")
+            return
+        try:
+            with span("fetch", device=device.name):
+                data = await fetch_json(f"{device.url}/data", device.timeout)
+        except Exception as e:
+            breaker.failure()
+            state = f"; circuit {breaker.state}, next probe in {breaker.retry_in():.0f}s" \
+                if breaker.state != "closed" else ""
+            print(f"   ❌ {device.name}: {e} ({breaker.failures} failure(s) in a row{state})")
+            return
+        breaker.success()
+        print(f"   ✓ {device.name}: {data.get('samples', '?')} samples, phase {data.get('phase', '?')}")
+        verdict = device.changes.check(data)
+        for outcome, count in device.changes.counts().items():
+            self.metrics.set_counter("payloads", count, device=device.name, verdict=outcome)
+        if verdict in ("unchanged", "regressed"):
+            print(f"   • {device.name}: payload {verdict} since the last one processed; skipping "
+                  f"save, render and push ({device.changes.summary()})")
+            return
+        if verdict == "restarted":
+            print(f"   ⚠️  {device.name}: counters went backwards {device.changes.restart_after} times "
+                  f"in a row and kept advancing: treating it as a board restart")
+
+        # Step 2: Save data locally
+        with span("save", device=device.name) as outcome:
+            saved = [save_data(data, "live_trt.json", device.data_dir)]
+            if device.legacy:
+                # Also save to live_data directory for compatibility
+                live_data_dir = "live_data"
+                (REPO_DIR / live_data_dir).mkdir(exist_ok=True)
+                saved.append(save_data(data, "trt_live_data.json", live_data_dir))
+            outcome.ok = all(saved)
+        self.written.update(path for path in saved if path)
+        print(f"2. {device.name}: saved to {device.data_dir}")
+
+        self.pending.add(device.name)
+        if self.queued == iteration and self.render_queue.full():
+            return                            # This iteration's render is already queued
+        self.queued = iteration
+        if offer(self.render_queue, iteration):
+            self.superseded["render"] += 1
+            print(f"   • Render still busy; pending render superseded ({self.superseded['render']} so far)")
+
+    async def render_stage(self):
+        while True:
+            iteration = await self.render_queue.get()
+            config = self.config
+            names, self.pending = sorted(self.pending), set()
             # Step 3: Generate graphs
-            print("3. Generating graphs...")
-            generate_graphs()
+            print(f"3. Generating graphs (iteration #{iteration}: {', '.join(names)})...")
+            for name in names:
+                device = self.devices.get(name)
+                if device is None:
+                    continue
+                async with self.files_lock:
+                    with span("render", device=name) as outcome:
+                        written = await asyncio.to_thread(generate_graphs, config.get('resident_renderer', True),
+                                                          config.get('history_raw_hours'), device.data_dir)
+                        outcome.ok = written is not None
+                    self.written.update(written or [])
+            self.render_queue.task_done()
+            self.metrics.flush()
 
             # Step 4: Push to GitHub (if enabled)
             if config['github_enabled']:
-                print("4. Pushing to GitHub...")
-                push_to_github()
+                if offer(self.publish_queue, iteration):
+                    self.superseded["publish"] += 1
+                    print(f"   • Publish still busy; changes will go out with the next commit "
+                          f"({self.superseded['publish']} so far)")
             else:
                 print("4. GitHub pushing disabled (skipping)")
+                print(f"✅ Cycle #{iteration} complete")
 
-            print(f"✅ Cycle complete")
-        else:
-            print("⚠️  Skipping this cycle (no data)")
+    def push_wait(self):
+        """Seconds until a push is due (0 = now), or None with nothing to push"""
+        if not self.unpushed_commits:
+            return None
+        now = asyncio.get_running_loop().time()
+        if self.unpushed_commits >= self.config.get('push_max_commits', 10):
+            return max(0.0, self.retry_at - now)
+        due = self.oldest_unpushed + self.config.get('push_interval', 300)
+        return max(0.0, due - now, self.retry_at - now)
+
+    async def publish_stage(self):
+        while True:
+            try:
+                iteration = await asyncio.wait_for(self.publish_queue.get(), self.push_wait())
+            except asyncio.TimeoutError:
+                iteration = None
+            if iteration is not None:
+                try:
+                    await self.commit(iteration)
+                finally:
+                    self.publish_queue.task_done()
+            if self.push_wait() == 0:
+                await self.push()
+
+    async def commit(self, iteration):
+        """Commit what the pipeline wrote since the last commit (local only)"""
+        print(f"4. Committing changes (iteration #{iteration})...")
+        try:
+            async with self.files_lock:
+                paths, self.written = self.written, set()
+                try:
+                    with span("git_commit"):
+                        changed_files = await asyncio.to_thread(commit_changes, paths)
+                except BaseException:
+                    self.written |= paths         # Not committed: retry them with the next commit
+                    raise
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Git operation failed: {e}")
+            return
+        if not changed_files:
+            print("• No changes to commit")
+            return
+        if not self.unpushed_commits:
+            self.oldest_unpushed = asyncio.get_running_loop().time()
+        self.unpushed_commits += 1
+        self.unpushed_files.update(changed_files)
+        print(f"✓ Committed {len(changed_files)} files ({self.unpushed_commits} commit(s) awaiting push)")
+
+    async def push(self):
+        """Push every unpushed commit in one go and record commits/push and latency"""
+        commits, files = self.unpushed_commits, sorted(self.unpushed_files)
+        print(f"5. Pushing {commits} commit(s) to GitHub...")
+        try:
+            seconds = await asyncio.to_thread(push_commits, files, commits)
+        except Exception as e:
+            self.retry_at = asyncio.get_running_loop().time() + PUSH_RETRY_S
+            print(f"❌ Push failed ({e}); {commits} commit(s) kept, retrying in {PUSH_RETRY_S}s")
+            self.metrics.flush()
+            return
+        self.unpushed_commits, self.unpushed_files, self.oldest_unpushed = 0, set(), None
+        self.pushes += 1
+        self.commits_pushed += commits
+        self.push_latency.add(seconds)
+        latency = self.push_latency.summary()
+        print(f"✅ Push #{self.pushes}: {self.commits_pushed / self.pushes:.1f} commits/push on average, "
+              f"latency p50 {latency['p50_ms']} ms, p99 {latency['p99_ms']} ms")
+        self.metrics.flush()
+
+def main():
+    """Main loop"""
+    config = load_config()
+
+    print("=" * 60)
+    print("TRT AUTO-UPDATE SCRIPT")
+    print("=" * 60)
+    for name, url, data_dir, timeout, _ in device_specs(config):
+        print(f"Device {name}: {url} → {data_dir} (timeout {timeout}s)")
+    print(f"Update interval: {config['update_interval']} seconds (fixed rate)")
+    print(f"Data directory: {config['data_dir']}")
+    print(f"GitHub pushing: {'Enabled' if config['github_enabled'] else 'Disabled'}")
+    print("=" * 60)
+    print()
 
-        # Wait for next iteration
-        print(f"\n⏳ Waiting {config['update_interval']} seconds until next update...")
-        time.sleep(config['update_interval'])
+    asyncio.run(Pipeline().run())
 
 if __name__ == "__main__":
     try:
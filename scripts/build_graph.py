@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Dependency bookkeeping for incremental rebuilds.
+
+Every dataset is a small chain of steps:
+
+    data/<name>.json ──► history:<name>   (its series in data/history.db)
+                     └─► graph:<name>     (history + render → data/<name>.png) ──► publish
+
+A step's stamp is a hash over its inputs: the data file and, for graphs,
+the code that draws them (GRAPH_CODE). The manifest (data/.build/manifest.json,
+machine-local and git-ignored) remembers the stamp of each step's last
+successful run, plus each input's mtime, size and SHA-256, so a file is
+only re-hashed when its mtime or size moved. A step whose stamp matches is
+skipped; only the steps downstream of a changed input run, and publishing
+stages only what they wrote. With nothing changed, a run is a handful of
+stat() calls.
+
+Stamps are taken when a step starts and confirmed only when it succeeds,
+so an input that changes while its step is running is picked up next time.
+A dataset whose data file does not exist has nothing to rebuild.
+
+The whole chain, plus the summary chart (data/latest.json →
+trt_validation.png), is one command:
+
+    python3 scripts/build_graph.py            # only what changed
+    python3 scripts/build_graph.py --force    # everything
+
+The outdated steps are worked out from the manifest alone, before
+matplotlib, NumPy or the history store are imported, so a run with nothing
+to do costs milliseconds.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_DIR / "scripts"
+MANIFEST_NAME = Path(".build") / "manifest.json"
+
+# (data file, graph, title, line colour) for every tracked dataset
+DATASETS = [
+    ("control_off.json",    "control_off.png",    "CONTROL: LED OFF",     "#FF0000"),
+    ("control_on.json",     "control_on.png",     "CONTROL: LED 100% ON", "#00FF00"),
+    ("sweep_100hz.json",    "sweep_100hz.png",    "100 Hz Sweep",         "#FFFF00"),
+    ("sweep_1khz.json",     "sweep_1khz.png",     "1 kHz Sweep",          "#00FFFF"),
+    ("sweep_10khz.json",    "sweep_10khz.png",    "10 kHz Sweep",         "#FF00FF"),
+    ("sweep_20khz.json",    "sweep_20khz.png",    "20 kHz Sweep",         "#FFFFFF"),
+    ("live_trt.json",       "live_trt.png",       "TRT LIVE PROOF",       "#00FFFF"),
+]
+
+# Changing any of these invalidates every graph
+GRAPH_CODE = [
+    REPO_DIR / ".github" / "scripts" / "make_graphs.py",
+    SCRIPTS_DIR / "downsample.py",
+    SCRIPTS_DIR / "trt_records.py",
+    SCRIPTS_DIR / "history_store.py",
+]
+
+# Summary chart: generate_chart.py draws data/latest.json's history
+CHART_SCRIPT = REPO_DIR / "generate_chart.py"
+CHART_INPUT = Path("latest.json")
+CHART_OUTPUT = Path("trt_validation.png")
+CHART_CODE = [CHART_SCRIPT, SCRIPTS_DIR / "downsample.py", SCRIPTS_DIR / "history_store.py"]
+
+
+def step_name(kind, filename):
+    """'graph', 'control_off.json' → 'graph:control_off'"""
+    return f"{kind}:{Path(filename).stem}"
+
+
+class Manifest:
+    """Input digests and last-good step stamps (see module docstring)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}       # path → [mtime_ns, size, sha256]
+        self.steps = {}       # step → stamp
+        self.staged = {}      # step → stamp taken at start, awaiting confirm()
+        self.modified = False
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.files, self.steps = saved.get("files", {}), saved.get("steps", {})
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def for_data_dir(cls, data_dir):
+        return cls(Path(data_dir) / MANIFEST_NAME)
+
+    def digest(self, path):
+        """SHA-256 of a file, re-read only if its mtime or size changed (None if missing)"""
+        key = str(Path(path).resolve())
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        cached = self.files.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(key, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.files[key] = [st.st_mtime_ns, st.st_size, h.hexdigest()]
+        self.modified = True
+        return self.files[key][2]
+
+    def stamp(self, inputs):
+        h = hashlib.sha256()
+        for path in inputs:
+            h.update(f"{Path(path).name}={self.digest(path)};".encode())
+        return h.hexdigest()
+
+    def dirty(self, step, stamp):
+        return self.steps.get(step) != stamp
+
+    def stage(self, step, stamp):
+        """Remember the stamp a step is being run for"""
+        self.staged[step] = stamp
+
+    def confirm(self, step):
+        """The staged run of `step` succeeded"""
+        if step in self.staged:
+            self.steps[step] = self.staged.pop(step)
+            self.modified = True
+
+    def record(self, step, stamp):
+        self.steps[step] = stamp
+        self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"files": self.files, "steps": self.steps}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.modified = False
+
+
+def graph_stamp(manifest, data_dir, json_file):
+    return manifest.stamp([Path(data_dir) / json_file, *GRAPH_CODE])
+
+
+def chart_stamp(manifest, data_dir):
+    return manifest.stamp([Path(data_dir) / CHART_INPUT, *CHART_CODE])
+
+
+def outdated(manifest, data_dir, force=False):
+    """Steps downstream of a changed input: {"history": [json], "graph": [json], "chart": bool}"""
+    data_dir = Path(data_dir)
+    steps = {"history": [], "graph": [], "chart": False}
+    for json_file, png_file, _, _ in DATASETS:
+        if not (data_dir / json_file).exists():
+            continue
+        if force or manifest.dirty(step_name("history", json_file),
+                                   manifest.stamp([data_dir / json_file])):
+            steps["history"].append(json_file)
+        if (force or not (data_dir / png_file).exists()
+                or manifest.dirty(step_name("graph", json_file),
+                                  graph_stamp(manifest, data_dir, json_file))):
+            steps["graph"].append(json_file)
+    if (data_dir / CHART_INPUT).exists():
+        steps["chart"] = (force or not (data_dir / CHART_OUTPUT).exists()
+                          or manifest.dirty("chart", chart_stamp(manifest, data_dir)))
+    return steps
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    force = "--force" in argv
+    start = time.perf_counter()
+    os.chdir(REPO_DIR)
+    data_dir = Path("data")
+    manifest = Manifest.for_data_dir(data_dir)
+    steps = outdated(manifest, data_dir, force)
+    manifest.save()
+
+    if steps["history"]:
+        from accumulate_history import accumulate
+        accumulate(data_dir, force)
+    if steps["graph"]:
+        sys.path.insert(0, str(REPO_DIR / ".github" / "scripts"))
+        import make_graphs
+        make_graphs.main(["--force"] if force else [])
+    if steps["chart"]:
+        subprocess.run([sys.executable, str(CHART_SCRIPT)] + (["--force"] if force else []),
+                       check=False)
+
+    ran = [f"{kind} ({len(names)})" for kind, names in steps.items()
+           if kind != "chart" and names] + (["chart"] if steps["chart"] else [])
+    print(f"✅ Build {'rebuilt ' + ', '.join(ran) if ran else 'up to date'} "
+          f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
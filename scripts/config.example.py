@@ -2,6 +2,12 @@
 # Copy this file to config.py and fill in your values
 
 ARDUINO_IP = "http://192.168.1.91"
+# Several rigs side by side (optional; replaces ARDUINO_IP): name → address
+# ARDUINO_DEVICES = {"red_led": "http://192.168.1.91", "ir_led": "http://192.168.1.92"}
 GITHUB_TOKEN = "your_github_token_here"
 GITHUB_REPO = "your-username/your-repo-name"
 GITHUB_FILE = "live_data/trt_live_data.json"
+# ADC of the sampling sketch, for raw .trtr archives: TRT_Auto_Validation.ino
+# (GIGA R1, 12-bit) is 3.3 / 4095; led_pulse.ino (10-bit) is 5.0 / 1023
+ADC_VREF = 3.3
+ADC_MAX = 4095
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Live dashboard feed: one producer, any number of Server-Sent Events clients.
+
+    DashboardFeed (one thread) ──► Broadcaster ──► subscriber queue ──► /api/stream
+                                              ├──► subscriber queue ──► /api/stream
+                                              └──► ...
+
+The producer polls its sources once per POLL_INTERVAL, and only while
+someone is subscribed. Each source is a stat() call until it actually
+changes; then only what changed is read (the log from its last offset,
+a data file's newest record through record_stream's incremental index)
+and published as an event:
+
+    activity      push counters and the last RECENT_PUSHES pushes
+    config        the settings shown outside the config form
+    measurement   one data file's newest decoded record (one event per file)
+    metrics       stage latency snapshots (trt_metrics.py)
+    log           new complete log lines, each tagged with its end offset
+
+Events other than log describe current state, so the broadcaster keeps
+the latest of each and replays them to a new subscriber; log lines are
+replayed from a short tail, and the page drops lines it already has by
+offset. A subscriber that falls behind loses its oldest queued events
+(state events are superseded by newer ones anyway) rather than slowing
+the producer or the other clients.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from record_stream import open_records
+from trt_metrics import METRICS_DIR, load_snapshots
+from trt_records import RecordBatch
+
+POLL_INTERVAL = 1.0          # Seconds between source checks while clients are connected
+HEARTBEAT_S = 15.0           # Comment line keeping idle connections (and proxies) open
+SUBSCRIBER_QUEUE = 256       # Events buffered per client before the oldest are dropped
+LOG_TAIL_BYTES = 16 * 1024   # Log read on start, so new clients get recent lines
+LOG_REPLAY_LINES = 100
+RECENT_PUSHES = 10
+
+
+def measurement(path):
+    """Newest record of one data file as shown on the dashboard, or None"""
+    reader = open_records(path)
+    if not len(reader):
+        return None
+    latest = RecordBatch.from_records([reader.latest()]).latest()
+    if not latest or not latest['stats']:
+        return None
+    return {'file': Path(path).name, 'records': len(reader), **latest}
+
+
+def format_event(event, data, event_id=None):
+    """One SSE frame"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines += [f"data: {line}" for line in json.dumps(data).splitlines()]
+    return "\n".join(lines) + "\n\n"
+
+
+class Broadcaster:
+    """Fan-out from one producer to bounded per-subscriber queues"""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.state = {}              # (event, key) → latest data, replayed on subscribe
+        self.log_tail = deque(maxlen=LOG_REPLAY_LINES)
+        self.next_id = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self.lock:
+            for (event, _), data in self.state.items():
+                self._put(q, (None, event, data))
+            if self.log_tail:
+                self._put(q, (None, "log", {"lines": list(self.log_tail)}))
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event, data, key=None):
+        """Send to every subscriber; state events (all but log) are kept for replay"""
+        with self.lock:
+            if event == "log":
+                self.log_tail.extend(data["lines"])
+            else:
+                self.state[(event, key)] = data
+            self.next_id += 1
+            item = (self.next_id, event, data)
+            for q in self.subscribers:
+                self._put(q, item)
+
+    def _put(self, q, item):
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stream(self):
+        """SSE frames for one client until it disconnects (a generator for the response)"""
+        q = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event_id, event, data = q.get(timeout=HEARTBEAT_S)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event, data, event_id)
+        finally:
+            self.unsubscribe(q)
+
+
+class DashboardFeed(threading.Thread):
+    """The single producer: watches the dashboard's sources and publishes changes"""
+
+    def __init__(self, broadcaster, activity_log, config_file, log_file, data_dir,
+                 metrics_dir=METRICS_DIR, interval=POLL_INTERVAL):
+        super().__init__(name="dashboard-feed", daemon=True)
+        self.broadcaster = broadcaster
+        self.activity_log = Path(activity_log)
+        self.config_file = Path(config_file)
+        self.log_file = Path(log_file)
+        self.data_dir = Path(data_dir)
+        self.metrics_dir = Path(metrics_dir)
+        self.interval = interval
+        self.seen = {}               # path → (mtime_ns, size) when last read
+        self.sent = {}               # (event, key) → last data published
+        self.log_offset = None
+        self.polls = 0
+
+    def run(self):
+        while True:
+            if len(self.broadcaster):
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Dashboard feed error: {e}")
+            time.sleep(self.interval)
+
+    def poll(self):
+        self.polls += 1
+        self._activity()
+        self._config()
+        self._measurements()
+        self._metrics()
+        self._log()
+
+    # -- helpers -------------------------------------------------------
+
+    def _changed(self, path):
+        """True (and remembered) if path's mtime or size moved since the last read"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return self.seen.pop(str(path), None) is not None
+        signature = (st.st_mtime_ns, st.st_size)
+        if self.seen.get(str(path)) == signature:
+            return False
+        self.seen[str(path)] = signature
+        return True
+
+    def _publish(self, event, data, key=None):
+        """Publish only if different from what was last sent under (event, key)"""
+        if self.sent.get((event, key)) == data:
+            return
+        self.sent[(event, key)] = data
+        self.broadcaster.publish(event, data, key)
+
+    # -- sources -------------------------------------------------------
+
+    def _activity(self):
+        if not self._changed(self.activity_log):
+            return
+        try:
+            with open(self.activity_log) as f:
+                activity = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._publish("activity", {"stats": activity.get("stats", {}),
+                                   "recent": activity.get("pushes", [])[-RECENT_PUSHES:][::-1]})
+
+    def _config(self):
+        if not self._changed(self.config_file):
+            return
+        try:
+            with open(self.config_file) as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._publish("config", {"update_interval": config.get("update_interval")})
+
+    def _measurements(self):
+        for path in sorted(self.data_dir.glob("*.json")):
+            if self._changed(path):
+                try:
+                    data = measurement(path)
+                except Exception as e:
+                    print(f"Dashboard feed: could not read {path.name}: {e}")
+                    continue
+                if data:
+                    self._publish("measurement", data, key=path.name)
+
+    def _metrics(self):
+        if any([self._changed(path) for path in self.metrics_dir.glob("*.json")]):
+            snapshots = load_snapshots(self.metrics_dir)
+            for snapshot in snapshots:
+                snapshot.pop("age_s", None)      # Changes every read; not a real change
+                snapshot.pop("updated", None)
+            self._publish("metrics", snapshots)
+
+    def _log(self):
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            return
+        truncated = self.log_offset is not None and size < self.log_offset
+        if self.log_offset is None or truncated:
+            self.log_offset = max(0, size - LOG_TAIL_BYTES) if self.log_offset is None else 0
+        if size == self.log_offset:
+            return
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.log_offset)
+            chunk = f.read(size - self.log_offset)
+        if self.log_offset and not truncated and not self.sent.get(("log", None)):
+            # First read starts mid-file: skip the partial first line
+            cut = chunk.find(b"\n") + 1
+            self.log_offset += cut
+            chunk = chunk[cut:]
+        end = chunk.rfind(b"\n") + 1         # Complete lines only; the rest waits
+        if not end:
+            return
+        lines, offset = [], self.log_offset
+        for raw in chunk[:end].splitlines(keepends=True):
+            offset += len(raw)
+            lines.append([offset, raw.decode("utf-8", "replace").rstrip("\r\n")])
+        self.log_offset += end
+        self.sent[("log", None)] = True
+        self.broadcaster.publish("log", {"lines": lines, "truncated": truncated})
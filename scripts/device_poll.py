@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Concurrent polling of several Arduino rigs from one asyncio loop.
+
+fetch_json() is a minimal async HTTP/1.0 GET on asyncio streams (no
+extra dependency): the firmware's web server answers one request per
+connection, so Connection: close and read-to-EOF is all that is needed.
+Unlike requests in a worker thread it is truly cancellable, so the
+per-device timeout (asyncio.wait_for) really frees the slot instead of
+leaving a blocked thread behind.
+
+Each device has a CircuitBreaker: after `threshold` consecutive failures
+it opens and the device is not contacted at all until its cooldown has
+passed; then one probe is let through (half-open). Success closes it;
+another failure re-opens it with the cooldown doubled, up to
+max_cooldown. A dead board therefore costs at most one timeout per
+cooldown, and never holds up the boards that answer.
+"""
+
+import asyncio
+import json
+import re
+import ssl
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = 5.0          # Seconds per request, connect included
+MAX_BODY_BYTES = 1024 * 1024
+BREAKER_THRESHOLD = 3          # Consecutive failures before the circuit opens
+BREAKER_COOLDOWN = 60.0        # Seconds before the first probe
+BREAKER_MAX_COOLDOWN = 900.0
+
+DEVICE_NAME = re.compile(r'[A-Za-z0-9_-]+$')   # Also a directory name
+
+
+class DeviceError(Exception):
+    """A device answered, but not with a usable response"""
+
+
+async def _get(url):
+    parts = urlsplit(url if "://" in url else f"http://{url}")
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+    try:
+        writer.write(f"GET {target} HTTP/1.0\r\nHost: {parts.netloc}\r\n"
+                     f"Accept: application/json\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise DeviceError(f"bad status line {status_line!r}")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get("content-length")
+        if length is not None and length.isdigit():
+            body = await reader.readexactly(min(int(length), MAX_BODY_BYTES))
+        else:
+            body = await reader.read(MAX_BODY_BYTES)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    if status != 200:
+        raise DeviceError(f"HTTP {status}")
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise DeviceError(f"invalid JSON: {e}")
+
+
+async def fetch_json(url, timeout=DEFAULT_TIMEOUT):
+    """GET url and decode its JSON body; raises on timeout, network or HTTP error"""
+    try:
+        return await asyncio.wait_for(_get(url), timeout)
+    except asyncio.TimeoutError:
+        raise DeviceError(f"no answer within {timeout:g}s")
+    except asyncio.IncompleteReadError:
+        raise DeviceError("connection closed mid-response")
+
+
+class CircuitBreaker:
+    """closed → open after repeated failures → half-open probe (see module docstring)"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN,
+                 max_cooldown=BREAKER_MAX_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.failures = 0             # Consecutive
+        self.cooldown = cooldown
+        self.opened_at = None         # clock() when the circuit last opened
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "open" if self.clock() < self.opened_at + self.cooldown else "half-open"
+
+    def retry_in(self):
+        """Seconds until the next probe (0 unless open)"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+    def allow(self):
+        return self.state != "open"
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.cooldown = self.base_cooldown
+
+    def failure(self):
+        self.failures += 1
+        if self.opened_at is not None:
+            # Failed probe: stay open, back off further
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_at = self.clock()
+        elif self.failures >= self.threshold:
+            self.opened_at = self.clock()
+            self.trips += 1
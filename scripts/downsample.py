@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Downsampling for plots, so render cost follows the output width rather than
+the number of stored records.
+
+lttb()    Largest-Triangle-Three-Buckets: keeps the first and last points and,
+          from each bucket in between, the point forming the largest
+          triangle with the previous pick and the next bucket's mean. Shape
+          and spikes survive with one point per ~2 pixel columns.
+minmax()  The minimum and maximum of each pixel-column bucket, in time
+          order. Guarantees every extreme is drawn (good for variance).
+
+Both return indices into the input, so x and y stay paired and several
+series can be reduced independently. Inputs shorter than the target are
+returned unchanged.
+"""
+
+import numpy as np
+
+POINTS_PER_PIXEL = 0.5      # LTTB target: one point per two pixel columns
+
+
+def points_for_width(width_in, dpi, per_pixel=POINTS_PER_PIXEL):
+    """Target point count for a line drawn across a figure width_in inches wide"""
+    return max(3, int(width_in * dpi * per_pixel))
+
+
+def lttb(x, y, threshold):
+    """Indices of the LTTB selection of (x, y) with at most threshold points"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Buckets for the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            nxt_start, nxt_stop = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            nxt_start, nxt_stop = n - 1, n
+        avg_x = x[nxt_start:nxt_stop].mean()
+        avg_y = y[nxt_start:nxt_stop].mean()
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[prev] - avg_x) * (y[start:stop] - y[prev])
+                      - (x[prev] - x[start:stop]) * (avg_y - y[prev]))
+        prev = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[i + 1] = prev
+    return selected
+
+
+def minmax(x, y, buckets):
+    """Indices of the min and max of each of `buckets` equal-count buckets"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * buckets >= n or buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    picks = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        segment = y[start:stop]
+        if np.isnan(segment).all():
+            picks.append(start)
+            continue
+        lo, hi = start + int(np.nanargmin(segment)), start + int(np.nanargmax(segment))
+        picks.extend((lo, hi))
+    # Keep the end points too, without dropping the extremes they would replace
+    return np.unique(np.r_[0, picks, n - 1]).astype(np.int64)
+
+
+def downsample(x, y, points, method="lttb"):
+    """(x, y) reduced to about `points` points as Python lists"""
+    if method == "minmax":
+        idx = minmax(x, y, max(1, points // 2))
+    else:
+        idx = lttb(x, y, points)
+    if len(idx) == len(x):
+        return list(x), list(y)
+    return np.asarray(x)[idx].tolist(), np.asarray(y)[idx].tolist()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the GitHub REST API the TRT scripts use.
+
+    contents  GET/PUT/DELETE /repos/<owner>/<repo>/contents/<path>
+    git data  GET   /repos/<owner>/<repo>/git/ref/heads/<branch>
+              PATCH /repos/<owner>/<repo>/git/refs/heads/<branch>
+              GET   /repos/<owner>/<repo>/git/commits/<sha>
+              POST  /repos/<owner>/<repo>/git/commits
+              POST  /repos/<owner>/<repo>/git/blobs
+              POST  /repos/<owner>/<repo>/git/trees
+
+Everything lives in memory. Blob SHAs are real git blob SHAs, so the sha
+semantics match GitHub (a PUT with a stale sha is a 409, a PUT over an
+existing file without one is a 422). Trees are stored flat (path → blob sha)
+and every contents write is a commit on the branch, as on GitHub.
+
+Faults can be injected to see how the uploaders behave on a bad day:
+
+    latency_s / jitter_s  delay before every response
+    conflict_rate         fraction of writes answered 409 (contents) or
+                          422 non-fast-forward (ref updates)
+    error_rate            fraction of requests answered 502
+    rate_limit            requests per rate_window_s; every response carries
+                          X-RateLimit-* headers and an exhausted window is a
+                          403 with X-RateLimit-Remaining: 0
+
+Run it and point the scripts at it:
+
+    python3 scripts/fake_github.py --port 8765 --latency-ms 80 --conflict-rate 0.05
+    GITHUB_API_URL=http://127.0.0.1:8765 python3 scripts/post_to_github.py
+
+upload_benchmark.py starts one in-process and drives the uploaders against it.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BRANCH = "main"
+
+
+def blob_sha(content):
+    """Git blob object id of content"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _object_sha(kind, obj):
+    return hashlib.sha1(kind.encode() + json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+class FakeRepo:
+    """Blobs, flat trees, commits and branch refs of one repository"""
+
+    def __init__(self, branch=DEFAULT_BRANCH):
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        root = self.make_tree({})
+        self.refs[branch] = self.make_commit("Initial commit", root, [])
+
+    def make_blob(self, content):
+        sha = blob_sha(content)
+        self.blobs[sha] = content
+        return sha
+
+    def make_tree(self, entries):
+        sha = _object_sha("tree", entries)
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def make_commit(self, message, tree, parents):
+        commit = {"message": message, "tree": tree, "parents": list(parents)}
+        sha = _object_sha("commit", [commit, len(self.commits)])
+        self.commits[sha] = commit
+        return sha
+
+    def head(self, branch):
+        commit = self.refs.get(branch)
+        if commit is None:
+            return None, None
+        return commit, self.commits[commit]["tree"]
+
+    def files(self, branch=DEFAULT_BRANCH):
+        """path → content at the tip of branch"""
+        _, tree = self.head(branch)
+        return {path: self.blobs[sha] for path, sha in self.trees.get(tree, {}).items()}
+
+    def commit_change(self, branch, message, path, content=None):
+        """Contents-API style single-file commit; content None deletes"""
+        head, tree = self.head(branch)
+        entries = dict(self.trees[tree])
+        if content is None:
+            entries.pop(path, None)
+            sha = None
+        else:
+            sha = self.make_blob(content)
+            entries[path] = sha
+        commit = self.make_commit(message, self.make_tree(entries), [head])
+        self.refs[branch] = commit
+        return sha, commit
+
+
+class FakeGitHub:
+    """Threaded HTTP server holding FakeRepo instances keyed owner/repo"""
+
+    def __init__(self, host="127.0.0.1", port=0, branch=DEFAULT_BRANCH, latency_s=0.0,
+                 jitter_s=0.0, conflict_rate=0.0, error_rate=0.0, rate_limit=None,
+                 rate_window_s=3600, seed=None):
+        self.branch = branch
+        self.repos = {}
+        self.lock = threading.Lock()
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.conflict_rate = conflict_rate
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window_s = rate_window_s
+        self.random = random.Random(seed)
+        self._window_start = time.time()
+        self._window_used = 0
+        self.calls = Counter()          # (method, route) → count
+        self.statuses = Counter()       # status code → count
+        self.bytes_in = 0
+        self.bytes_out = 0
+        handler = type("Handler", (_Handler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        if self.latency_s or self.jitter_s:
+            time.sleep(self.latency_s + self.random.uniform(0, self.jitter_s))
+
+    def inject(self, rate):
+        return rate > 0 and self.random.random() < rate
+
+    def rate_headers(self):
+        """Account one request against the window; (exhausted, headers)"""
+        if self.rate_limit is None:
+            return False, {}
+        now = time.time()
+        if now - self._window_start >= self.rate_window_s:
+            self._window_start = now
+            self._window_used = 0
+        exhausted = self._window_used >= self.rate_limit
+        if not exhausted:
+            self._window_used += 1
+        reset = self._window_start + self.rate_window_s
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.rate_limit - self._window_used),
+            "X-RateLimit-Used": str(self._window_used),
+            "X-RateLimit-Reset": str(int(reset + 0.999)),
+        }
+        if exhausted:
+            headers["Retry-After"] = str(max(1, int(reset - now + 0.999)))
+        return exhausted, headers
+
+    def repo(self, name):
+        if name not in self.repos:
+            self.repos[name] = FakeRepo(self.branch)
+        return self.repos[name]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-github",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+ROUTES = [
+    ("GET", re.compile(r"/repos/([^/]+/[^/]+)/contents/(.+)$"), "get_contents"),
+    ("PUT", re.compile(r"/repos/([^/]+/[^/]+)/contents/(.+)$"), "put_contents"),
+    ("DELETE", re.compile(r"/repos/([^/]+/[^/]+)/contents/(.+)$"), "delete_contents"),
+    ("GET", re.compile(r"/repos/([^/]+/[^/]+)/git/ref/heads/(.+)$"), "get_ref"),
+    ("PATCH", re.compile(r"/repos/([^/]+/[^/]+)/git/refs/heads/(.+)$"), "update_ref"),
+    ("GET", re.compile(r"/repos/([^/]+/[^/]+)/git/commits/(\w+)$"), "get_commit"),
+    ("POST", re.compile(r"/repos/([^/]+/[^/]+)/git/commits$"), "create_commit"),
+    ("POST", re.compile(r"/repos/([^/]+/[^/]+)/git/blobs$"), "create_blob"),
+    ("POST", re.compile(r"/repos/([^/]+/[^/]+)/git/trees$"), "create_tree"),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_state = None
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # Keep-alive + small writes otherwise stall ~40 ms
+
+    def log_message(self, *args):
+        pass
+
+    # -- plumbing ------------------------------------------------------
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.server_state.statuses[status] += 1
+        self.server_state.bytes_out += len(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        self.server_state.bytes_in += len(raw)
+        return json.loads(raw) if raw else {}
+
+    def _dispatch(self, method):
+        path, _, query = self.path.partition("?")
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        state = self.server_state
+        body = self._body() if method in ("PUT", "POST", "PATCH", "DELETE") else {}
+        state.delay()
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path) if route_method == method else None
+            if match:
+                with state.lock:
+                    state.calls[(method, name)] += 1
+                    exhausted, limit_headers = state.rate_headers()
+                    if exhausted:
+                        return self._send(403, {"message": "API rate limit exceeded"}, limit_headers)
+                    if state.inject(state.error_rate):
+                        return self._send(502, {"message": "Server Error"}, limit_headers)
+                    status, payload, headers = getattr(self, name)(
+                        state.repo(match.group(1)), *match.groups()[1:], params=params, body=body)
+                return self._send(status, payload, {**limit_headers, **(headers or {})})
+        self._send(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _branch(self, params, body):
+        return body.get("branch") or params.get("ref") or self.server_state.branch
+
+    # -- contents API --------------------------------------------------
+
+    def get_contents(self, repo, path, params, body):
+        _, tree = repo.head(self._branch(params, body))
+        sha = repo.trees.get(tree, {}).get(path)
+        if sha is None:
+            return 404, {"message": "Not Found"}, None
+        etag = f'"{sha}"'
+        if self.headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        content = base64.b64encode(repo.blobs[sha]).decode()
+        return 200, {"path": path, "sha": sha, "size": len(repo.blobs[sha]),
+                     "encoding": "base64", "content": content}, {"ETag": etag}
+
+    def put_contents(self, repo, path, params, body):
+        branch = self._branch(params, body)
+        _, tree = repo.head(branch)
+        current = repo.trees[tree].get(path)
+        if current is not None and self.server_state.inject(self.server_state.conflict_rate):
+            return 409, {"message": f"{path} does not match {body.get('sha')}"}, None
+        if current is not None and body.get("sha") is None:
+            return 422, {"message": '"sha" wasn\'t supplied.'}, None
+        if body.get("sha") not in (None, current):
+            return 409, {"message": f"{path} does not match {body['sha']}"}, None
+        content = base64.b64decode(body.get("content", ""))
+        sha, commit = repo.commit_change(branch, body.get("message", ""), path, content)
+        return (201 if current is None else 200), {
+            "content": {"path": path, "sha": sha, "size": len(content)},
+            "commit": {"sha": commit}}, None
+
+    def delete_contents(self, repo, path, params, body):
+        branch = self._branch(params, body)
+        _, tree = repo.head(branch)
+        current = repo.trees[tree].get(path)
+        if current is None:
+            return 404, {"message": "Not Found"}, None
+        if body.get("sha") != current or self.server_state.inject(self.server_state.conflict_rate):
+            return 409, {"message": f"{path} does not match {body.get('sha')}"}, None
+        _, commit = repo.commit_change(branch, body.get("message", ""), path)
+        return 200, {"content": None, "commit": {"sha": commit}}, None
+
+    # -- git data API --------------------------------------------------
+
+    def get_ref(self, repo, branch, params, body):
+        commit, _ = repo.head(branch)
+        if commit is None:
+            return 404, {"message": "Not Found"}, None
+        return 200, {"ref": f"refs/heads/{branch}",
+                     "object": {"type": "commit", "sha": commit}}, None
+
+    def update_ref(self, repo, branch, params, body):
+        head, _ = repo.head(branch)
+        target = body.get("sha")
+        if target not in repo.commits:
+            return 422, {"message": "Object does not exist"}, None
+        moved = head is not None and head not in repo.commits[target]["parents"]
+        if not body.get("force") and (moved or self.server_state.inject(self.server_state.conflict_rate)):
+            return 422, {"message": "Update is not a fast forward"}, None
+        repo.refs[branch] = target
+        return 200, {"ref": f"refs/heads/{branch}",
+                     "object": {"type": "commit", "sha": target}}, None
+
+    def get_commit(self, repo, sha, params, body):
+        commit = repo.commits.get(sha)
+        if commit is None:
+            return 404, {"message": "Not Found"}, None
+        return 200, {"sha": sha, "message": commit["message"], "tree": {"sha": commit["tree"]},
+                     "parents": [{"sha": p} for p in commit["parents"]]}, None
+
+    def create_commit(self, repo, params, body):
+        if body.get("tree") not in repo.trees:
+            return 422, {"message": "Tree does not exist"}, None
+        parents = body.get("parents", [])
+        if any(p not in repo.commits for p in parents):
+            return 422, {"message": "Parent does not exist"}, None
+        sha = repo.make_commit(body.get("message", ""), body["tree"], parents)
+        return 201, {"sha": sha, "tree": {"sha": body["tree"]},
+                     "parents": [{"sha": p} for p in parents]}, None
+
+    def create_blob(self, repo, params, body):
+        content = body.get("content", "")
+        if body.get("encoding") == "base64":
+            content = base64.b64decode(content)
+        else:
+            content = content.encode()
+        return 201, {"sha": repo.make_blob(content)}, None
+
+    def create_tree(self, repo, params, body):
+        base = body.get("base_tree")
+        if base is not None and base not in repo.trees:
+            return 422, {"message": "base_tree does not exist"}, None
+        entries = dict(repo.trees[base]) if base else {}
+        for item in body.get("tree", []):
+            path = item["path"]
+            if "content" in item:
+                entries[path] = repo.make_blob(item["content"].encode())
+            elif item.get("sha") is None:
+                entries.pop(path, None)
+            elif item["sha"] in repo.blobs:
+                entries[path] = item["sha"]
+            else:
+                return 422, {"message": f"blob {item['sha']} does not exist"}, None
+        return 201, {"sha": repo.make_tree(entries)}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--conflict-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per window")
+    parser.add_argument("--rate-window", type=float, default=3600, help="seconds")
+    args = parser.parse_args()
+    server = FakeGitHub(args.host, args.port, latency_s=args.latency_ms / 1000,
+                        jitter_s=args.jitter_ms / 1000, conflict_rate=args.conflict_rate,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit,
+                        rate_window_s=args.rate_window)
+    print(f"Fake GitHub API on {server.url} (GITHUB_API_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+        print(f"Calls: {dict(server.calls)}")
+        print(f"Statuses: {dict(server.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Publish every file changed in a cycle as one commit (Git Data API).
+
+The contents API makes one commit per file. BatchPublisher instead stages
+writes and deletes, then publishes them together:
+
+    POST git/blobs   (binary files only; text goes inline in the tree)
+    POST git/trees   one tree on top of the current head tree
+    POST git/commits one commit
+    PATCH git/refs   fast-forward the branch
+
+Files whose git blob SHA matches the one we last saw are dropped before
+anything is sent, and the head commit/tree are remembered between
+publishes, so an unchanged cycle costs nothing and a changed one costs
+three requests however many text files it touches. If someone else moved
+the branch, the ref update is rejected as non-fast-forward and the tree is
+rebuilt on the new head. Whenever the head is (re)read, on the first
+publish and after such a rejection, the files the cache called unchanged
+are checked against the branch (one GET each), as another writer may have
+changed them since.
+
+Rebuilding on the new head silently overwrites a file the other writer
+changed. Callers that read-modify-write a shared file (RawStore's
+manifests) therefore call expect(path, sha) with the sha their content was
+based on. publish() checks those files first (one GET each) and
+raises ConflictError, leaving everything staged, so the caller can unstage,
+re-read, merge and publish again.
+
+A BatchPublisher has the same get/put/delete interface as GitHubClient, so
+it can be used as a RawStore backend; call publish() to make the commit.
+"""
+
+import base64
+import hashlib
+import json
+
+from github_client import GitHubError, MAX_RETRIES
+
+DEFAULT_BRANCH = "main"
+FILE_MODE = "100644"
+
+
+def blob_sha(content):
+    """Git blob object id, the same value the contents API reports as sha"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _as_text(content):
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+class ConflictError(GitHubError):
+    """A file changed on the branch since the sha a staged write was based on"""
+
+    def __init__(self, path, expected, actual):
+        IOError.__init__(self, f"{path} changed on the branch (expected sha {expected}, found {actual})")
+        self.status_code = 409
+        self.path = path
+
+
+class BatchPublisher:
+    """Stage file writes/deletes and publish them as a single commit"""
+
+    def __init__(self, client, branch=None):
+        self.client = client
+        self.branch = branch or client.branch or DEFAULT_BRANCH
+        self.pending = {}        # path → bytes, or None to delete
+        self.delete_shas = {}    # path → sha given with a staged delete
+        self.expected = {}       # path → sha it must still have on the branch (None: absent)
+        self.messages = []
+        self.head_commit = None
+        self.head_tree = None
+        self.commits_made = 0
+        self.files_published = 0
+        self.files_unchanged = 0
+
+    def git_url(self, endpoint):
+        return f"{self.client.api_url}/repos/{self.client.repo}/git/{endpoint}"
+
+    def _call(self, method, endpoint, expect=(200, 201), **kwargs):
+        response = self.client.request(method, self.git_url(endpoint), **kwargs)
+        if response.status_code not in expect:
+            raise GitHubError(method, endpoint, response)
+        return response.json()
+
+    # -- staging (GitHubClient-compatible) -----------------------------
+
+    def get(self, path):
+        if path in self.pending:
+            content = self.pending[path]
+            return (content, blob_sha(content)) if content is not None else (None, None)
+        return self.client.get(path)
+
+    def put(self, path, content, message, sha=None):
+        """Stage a write; returns the blob sha the file will have"""
+        if isinstance(content, str):
+            content = content.encode()
+        self.pending[path] = content
+        if message and message not in self.messages:
+            self.messages.append(message)
+        return blob_sha(content)
+
+    def put_json(self, path, data, message, indent=2):
+        return self.put(path, json.dumps(data, indent=indent).encode(), message)
+
+    def delete(self, path, message, sha=None):
+        self.pending[path] = None
+        if sha:
+            self.delete_shas[path] = sha
+        if message and message not in self.messages:
+            self.messages.append(message)
+        return True
+
+    def expect(self, path, sha):
+        """Make publish() fail with ConflictError unless path still has sha"""
+        self.expected[path] = sha
+
+    def unstage(self, path):
+        self.pending.pop(path, None)
+        self.delete_shas.pop(path, None)
+        self.expected.pop(path, None)
+
+    def discard(self):
+        self.pending.clear()
+        self.delete_shas.clear()
+        self.expected.clear()
+        self.messages.clear()
+
+    # -- publishing ----------------------------------------------------
+
+    def refresh_head(self):
+        ref = self._call("GET", f"ref/heads/{self.branch}", expect=(200,))
+        self.head_commit = ref["object"]["sha"]
+        commit = self._call("GET", f"commits/{self.head_commit}", expect=(200,))
+        self.head_tree = commit["tree"]["sha"]
+
+    def _check_expected(self):
+        for path, sha in self.expected.items():
+            actual = self.client.get_sha(path, refresh=True)
+            if actual != sha:
+                raise ConflictError(path, sha, actual)
+
+    def _changed(self, verify=False):
+        """Pending entries that differ from the branch
+
+        The branch is taken to be what the sha cache says; with verify, an
+        entry the cache calls unchanged is looked up on the branch first.
+        """
+        changed = {}
+        for path, content in self.pending.items():
+            target = None if content is None else blob_sha(content)
+            known = self.client.cached_sha(path) or self.delete_shas.get(path)
+            if verify and known == target:
+                known = self.client.get_sha(path, refresh=True)
+            # Only delete what is known to exist (pass its sha or look it up
+            # with client.get_sha first); a missing path fails the tree
+            if known != target and (content is not None or known):
+                changed[path] = content
+        return changed
+
+    def _tree_entries(self, changed):
+        entries = []
+        for path, content in changed.items():
+            entry = {"path": path, "mode": FILE_MODE, "type": "blob"}
+            if content is None:
+                entry["sha"] = None
+            else:
+                text = _as_text(content)
+                if text is not None:
+                    entry["content"] = text
+                else:
+                    blob = self._call("POST", "blobs", json={
+                        "content": base64.b64encode(content).decode(), "encoding": "base64"})
+                    entry["sha"] = blob["sha"]
+            entries.append(entry)
+        return entries
+
+    def publish(self, message=None):
+        """Commit everything staged; returns the new commit sha, or None if nothing changed"""
+        fresh = self.head_commit is None
+        if fresh and self.pending:
+            self.refresh_head()
+        changed = self._changed(verify=fresh)
+        if not changed:
+            self.files_unchanged += len(self.pending)
+            self.discard()
+            return None
+        if message is None:
+            message = self.messages[0] if len(self.messages) == 1 else \
+                f"Update {len(changed)} files\n\n" + "\n".join(self.messages)
+        entries = self._tree_entries(changed)
+        for attempt in range(MAX_RETRIES + 1):
+            self._check_expected()
+            tree = self._call("POST", "trees", json={"base_tree": self.head_tree, "tree": entries})
+            commit = self._call("POST", "commits", json={
+                "message": message, "tree": tree["sha"], "parents": [self.head_commit]})
+            response = self.client.request("PATCH", self.git_url(f"refs/heads/{self.branch}"),
+                                           json={"sha": commit["sha"]})
+            if response.status_code == 200:
+                break
+            if response.status_code == 422 and attempt < MAX_RETRIES:
+                # Branch moved under us (or our cached head is stale); files
+                # skipped as unchanged may differ on the new head
+                self.refresh_head()
+                extra = {path: content for path, content in self._changed(verify=True).items()
+                         if path not in changed}
+                changed.update(extra)
+                entries += self._tree_entries(extra)
+                continue
+            raise GitHubError("PATCH", f"refs/heads/{self.branch}", response)
+        self.head_commit = commit["sha"]
+        self.head_tree = tree["sha"]
+        for path, content in changed.items():
+            # Keep the contents-API sha cache in step with the branch
+            self.client.remember(path, blob_sha(content) if content is not None else None)
+        self.commits_made += 1
+        self.files_published += len(changed)
+        self.files_unchanged += len(self.pending) - len(changed)
+        self.discard()
+        return commit["sha"]
+
+
+_publishers = {}
+
+
+def get_publisher(client, branch=None):
+    """One publisher per client/branch so the head commit stays cached"""
+    key = (id(client), branch)
+    if key not in _publishers:
+        _publishers[key] = BatchPublisher(client, branch)
+    return _publishers[key]
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Shared GitHub contents-API client for the TRT scripts.
+
+Every uploader used to open a fresh connection, GET a file only to learn
+its blob SHA, then PUT it. This client instead:
+
+  * keeps one pooled requests.Session (TLS connection reuse),
+  * remembers path → sha (and ETag) in memory and in a small on-disk cache,
+    refreshed from every PUT/GET response, so a steady-state update is a
+    single PUT,
+  * makes GETs conditional (If-None-Match) so unchanged files come back as
+    a cheap 304,
+  * retries 409 (stale cached sha: refetch and retry) and 5xx/rate limits
+    with exponential backoff. A sha passed explicitly is a concurrency
+    check, so a conflict on it is raised instead (the caller merges).
+
+Set GITHUB_API_URL to point the client at another server (GitHub Enterprise
+or a local stand-in such as fake_github.py), and GITHUB_SHA_CACHE to move the
+on-disk cache (empty disables it).
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from trt_pipeline import LatencyStats
+
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+CACHE_FILE = os.environ.get("GITHUB_SHA_CACHE",
+                            str(Path.home() / ".cache" / "trt" / "github_shas.json")) or None
+MAX_RETRIES = 4
+BACKOFF_S = 0.5
+RETRY_STATUSES = {500, 502, 503, 504}
+POOL_SIZE = 8
+TIMEOUT = 30
+
+
+class GitHubError(IOError):
+    def __init__(self, method, path, response):
+        self.status_code = response.status_code if response is not None else None
+        text = response.text[:200] if response is not None else "no response"
+        super().__init__(f"{method} {path} failed: {self.status_code} {text}")
+
+
+class GitHubClient:
+    """Contents API with a pooled session and cached blob SHAs"""
+
+    def __init__(self, repo, token, api_url=None, cache_file=CACHE_FILE,
+                 branch=None, timeout=TIMEOUT):
+        self.repo = repo
+        self.api_url = (api_url or API_URL).rstrip("/")
+        self.branch = branch
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github.v3+json",
+        })
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+        self.requests_made = 0
+        self.gets_skipped = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyStats()
+
+    # -- cache ---------------------------------------------------------
+
+    def _cache_key(self, path):
+        return f"{self.api_url}/{self.repo}:{self.branch or ''}:{path}"
+
+    def _load_cache(self):
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    def cached_sha(self, path):
+        return self._cache.get(self._cache_key(path), {}).get("sha")
+
+    def remember(self, path, sha, etag=None):
+        with self._lock:
+            key = self._cache_key(path)
+            if sha is None:
+                self._cache.pop(key, None)
+            else:
+                entry = {"sha": sha}
+                if etag:
+                    entry["etag"] = etag
+                self._cache[key] = entry
+            self._save_cache()
+
+    # -- HTTP ----------------------------------------------------------
+
+    def url(self, path):
+        return f"{self.api_url}/repos/{self.repo}/contents/{path}"
+
+    def request(self, method, url, **kwargs):
+        """Send with backoff on 5xx and rate limiting; returns the last response"""
+        kwargs.setdefault("timeout", self.timeout)
+        response = None
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self.requests_made += 1
+                start = time.monotonic()
+                response = self.session.request(method, url, **kwargs)
+                self.latency.add(time.monotonic() - start)
+                self.bytes_sent += len(response.request.body or b"")
+                self.bytes_received += len(response.content)
+            except requests.RequestException:
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(BACKOFF_S * 2 ** attempt)
+                continue
+            limited = (response.status_code in (403, 429)
+                       and response.headers.get("X-RateLimit-Remaining") == "0")
+            if response.status_code not in RETRY_STATUSES and not limited:
+                return response
+            if attempt == MAX_RETRIES:
+                break
+            delay = BACKOFF_S * 2 ** attempt
+            if limited:
+                reset = response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Reset")
+                if reset and reset.isdigit():
+                    value = int(reset)
+                    delay = value if value < 1e9 else max(0, value - time.time())
+            time.sleep(min(delay, 60))
+        return response
+
+    # -- contents API --------------------------------------------------
+
+    def get(self, path):
+        """(content bytes, sha), or (None, None) if the file does not exist"""
+        params = {"ref": self.branch} if self.branch else None
+        response = self.request("GET", self.url(path), params=params)
+        if response.status_code == 404:
+            self.remember(path, None)
+            return None, None
+        if response.status_code != 200:
+            raise GitHubError("GET", path, response)
+        info = response.json()
+        self.remember(path, info.get("sha"), response.headers.get("ETag"))
+        return base64.b64decode(info.get("content", "")), info.get("sha")
+
+    def get_sha(self, path, refresh=False):
+        """Blob SHA of path; a cached value avoids the request entirely"""
+        sha = None if refresh else self.cached_sha(path)
+        if sha:
+            self.gets_skipped += 1
+            return sha
+        entry = self._cache.get(self._cache_key(path), {})
+        headers = {"If-None-Match": entry["etag"]} if refresh and entry.get("etag") else {}
+        params = {"ref": self.branch} if self.branch else None
+        response = self.request("GET", self.url(path), params=params, headers=headers)
+        if response.status_code == 304:
+            return entry.get("sha")
+        if response.status_code == 404:
+            self.remember(path, None)
+            return None
+        if response.status_code != 200:
+            raise GitHubError("GET", path, response)
+        sha = response.json().get("sha")
+        self.remember(path, sha, response.headers.get("ETag"))
+        return sha
+
+    def put(self, path, content, message, sha=None):
+        """Create or update path; returns the new blob sha
+
+        Uses the cached sha when none is given; then a 409/422 means the
+        cache is stale or missing, so the sha is refetched and the PUT
+        retried. An explicit sha is the version the caller based its content
+        on: a 409/422 raises GitHubError so the caller can re-read and merge
+        instead of overwriting someone else's change.
+        """
+        if isinstance(content, str):
+            content = content.encode()
+        payload = {"message": message, "content": base64.b64encode(content).decode()}
+        if self.branch:
+            payload["branch"] = self.branch
+        expected = sha
+        sha = sha or self.cached_sha(path)
+        if sha:
+            self.gets_skipped += 1
+        for attempt in range(MAX_RETRIES + 1):
+            if sha:
+                payload["sha"] = sha
+            else:
+                payload.pop("sha", None)
+            response = self.request("PUT", self.url(path), json=payload)
+            if response.status_code in (200, 201):
+                new_sha = response.json().get("content", {}).get("sha")
+                self.remember(path, new_sha)
+                return new_sha
+            if response.status_code in (409, 422) and not expected and attempt < MAX_RETRIES:
+                sha = self.get_sha(path, refresh=True)
+                time.sleep(BACKOFF_S * attempt)
+                continue
+            raise GitHubError("PUT", path, response)
+
+    def put_json(self, path, data, message, indent=2):
+        return self.put(path, json.dumps(data, indent=indent).encode(), message)
+
+    def delete(self, path, message, sha=None):
+        """Delete path; True if it is gone afterwards (including never existed)"""
+        sha = sha or self.get_sha(path)
+        if sha is None:
+            return True
+        for attempt in range(MAX_RETRIES + 1):
+            payload = {"message": message, "sha": sha}
+            if self.branch:
+                payload["branch"] = self.branch
+            response = self.request("DELETE", self.url(path), json=payload)
+            if response.status_code in (200, 204, 404):
+                self.remember(path, None)
+                return True
+            if response.status_code in (409, 422) and attempt < MAX_RETRIES:
+                sha = self.get_sha(path, refresh=True)
+                if sha is None:
+                    return True
+                continue
+            return False
+        return False
+
+
+_clients = {}
+
+
+def get_client(repo, token, **kwargs):
+    """Process-wide client per (repo, token) so all callers share one pool"""
+    key = (repo, token, kwargs.get("api_url"), kwargs.get("branch"))
+    if key not in _clients:
+        _clients[key] = GitHubClient(repo, token, **kwargs)
+    return _clients[key]
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Local time-series store for the accumulated history (data/history.db).
+
+Replaces data/history.json, which every run loaded whole, appended to and
+rewrote whole, and which held two incompatible layouts side by side
+(accumulate_history.py's "<file>.json" lists and make_graphs.py's
+"<file>_history" lists). Here both scripts read and write one SQLite table
+in WAL mode:
+
+    points(id, series, t_ms, record)     index on (series, t_ms)
+
+`series` is the data file's stem ("control_off"), `t_ms` the record's own
+wall-clock time in epoch milliseconds (timestamp_iso / timestamp, falling
+back to the time of the append) and `record` the record as JSON. Appends
+are single-row inserts; reads are indexed range or tail queries.
+
+When a new, empty database is opened next to a history.json, that file is
+imported (either layout, plus generate_chart.py's timestamps/var_*
+layout). Records with no measurements in them are dropped on the way, and
+{"cycle_N": {...}} wrappers left by the old duplicate-key parsing are
+unwrapped.
+
+Retention is tiered rather than a hard cut at N points. Raw records are
+kept for RAW_RETENTION_MS behind the newest record of their series; every
+record is also folded, as it is written, into 1-minute, 1-hour and 1-day
+rollups holding per Δt the count, the sum and sum of squares of the means
+and the sum of the reported variances. Each tier has its own retention
+(the daily one is kept forever), so old data gets coarser instead of
+disappearing. Recent plots read raw records (range()); long-range plots
+ask trend() for the finest tier that fits their point budget.
+
+The WAL is checkpointed into the main file on close(), so a closed store is
+a single self-contained file that can be copied or backed up. It is
+machine-local (git-ignored), so there is no binary file for concurrent
+writers to conflict on. What gets committed is export_json(): history.json
+rewritten from the database with the newest EXPORT_POINTS records of each
+series (the old file's "<file>.json" layout and cap), which is also what a
+fresh checkout's database starts from.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from trt_ladder import resolution_keys
+from trt_records import CYCLE_KEY, RecordBatch, normalize
+
+DEFAULT_PATH = Path("data") / "history.db"
+JSON_NAME = "history.json"
+EXPORT_POINTS = 200         # Per series in history.json
+SCHEMA_VERSION = 2          # 2: rollups table
+
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+RAW_RETENTION_MS = 2 * DAY_MS
+TIERS = [                    # (bucket_ms, retention_ms or None for forever)
+    (MINUTE_MS, 30 * DAY_MS),
+    (HOUR_MS, 400 * DAY_MS),
+    (DAY_MS, None),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    id     INTEGER PRIMARY KEY,
+    series TEXT    NOT NULL,
+    t_ms   INTEGER NOT NULL,
+    record TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS points_series_t ON points (series, t_ms);
+CREATE TABLE IF NOT EXISTS rollups (
+    series     TEXT    NOT NULL,
+    bucket_ms  INTEGER NOT NULL,
+    start_ms   INTEGER NOT NULL,
+    key        TEXT    NOT NULL,
+    n          INTEGER NOT NULL,
+    sum_mean   REAL    NOT NULL,
+    sumsq_mean REAL    NOT NULL,
+    sum_var    REAL    NOT NULL,
+    PRIMARY KEY (series, bucket_ms, start_ms, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS first_seen (
+    series   TEXT PRIMARY KEY,
+    first_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def series_name(filename):
+    """History series for a data file: 'control_off.json' → 'control_off'"""
+    return Path(filename).stem
+
+
+def record_time_ms(record, default=None):
+    """Wall-clock time of a record in epoch ms (default: now)"""
+    time_ms = normalize(record).time_ms
+    if time_ms is not None:
+        return time_ms
+    return int(time.time() * 1000) if default is None else default
+
+
+def unwrap(record):
+    """{"cycle_N": {...}} (a phase file read with json.load) → the inner record"""
+    if len(record) == 1:
+        (key, value), = record.items()
+        if CYCLE_KEY.match(key) and isinstance(value, dict):
+            return value
+    return record
+
+
+def has_measurements(record):
+    """True if some Δt entry has a mean or a variance (generate_chart.py stored only variances)"""
+    if normalize(record).stats:
+        return True
+    record = unwrap(record)
+    nested = record.get("statistics") if isinstance(record.get("statistics"), dict) else record
+    return any(isinstance(nested[key], dict) and nested[key].get("variance") is not None
+               for _, key in resolution_keys(nested))
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(',', ':'))
+
+
+class HistoryStore:
+    """Append-only per-series history in SQLite (see module docstring)"""
+
+    def __init__(self, path=DEFAULT_PATH, migrate=True, raw_retention_ms=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', ?)",
+                            (str(SCHEMA_VERSION),))
+        if raw_retention_ms is not None:
+            self.set_meta("raw_retention_ms", int(raw_retention_ms))
+        stored = self.meta("raw_retention_ms")
+        self.raw_retention_ms = int(stored) if stored is not None else RAW_RETENTION_MS
+        if int(self.meta("schema_version")) < SCHEMA_VERSION:
+            self._backfill_rollups()
+        legacy = self.path.with_name(JSON_NAME)
+        if migrate and legacy.exists() and self.meta("migrated_from") is None and not self.count():
+            self.migrate_json(legacy)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.db is not None:
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.db.close()
+            self.db = None
+
+    def meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    # -- writes --------------------------------------------------------
+
+    def _insert(self, series, rows):
+        """Store (t_ms, text, record) rows, fold them into every tier, then prune"""
+        self.db.executemany("INSERT INTO points (series, t_ms, record) VALUES (?, ?, ?)",
+                            [(series, t_ms, text) for t_ms, text, _ in rows])
+        self.db.executemany(
+            "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (series, bucket_ms, start_ms, key) DO UPDATE SET "
+            "n = n + excluded.n, sum_mean = sum_mean + excluded.sum_mean, "
+            "sumsq_mean = sumsq_mean + excluded.sumsq_mean, sum_var = sum_var + excluded.sum_var",
+            self._rollup_rows(series, rows))
+        if rows:
+            self.db.execute("INSERT INTO first_seen VALUES (?, ?) ON CONFLICT (series) DO UPDATE "
+                            "SET first_ms = MIN(first_ms, excluded.first_ms)",
+                            (series, min(t_ms for t_ms, _, _ in rows)))
+            self._prune(series)
+
+    @staticmethod
+    def _rollup_rows(series, rows):
+        """Per-bucket (n, Σmean, Σmean², Σvariance) of rows for every tier and Δt key"""
+        batch = RecordBatch.from_records([record for _, _, record in rows])
+        times = np.array([t_ms for t_ms, _, _ in rows], dtype=np.int64)
+        out = []
+        for bucket_ms, _ in TIERS:
+            starts, bucket = np.unique(times // bucket_ms * bucket_ms, return_inverse=True)
+            for j, (key, _) in enumerate(batch.keys):
+                mean = batch.mean[:, j]
+                present = ~np.isnan(mean)
+                if not present.any():
+                    continue
+                idx, mean = bucket[present], mean[present]
+                variance = np.nan_to_num(batch.variance[present, j])
+                size = len(starts)
+                n = np.bincount(idx, minlength=size)
+                sums = (np.bincount(idx, mean, size), np.bincount(idx, mean * mean, size),
+                        np.bincount(idx, variance, size))
+                for b in np.flatnonzero(n):
+                    out.append((series, bucket_ms, int(starts[b]), key, int(n[b]),
+                                float(sums[0][b]), float(sums[1][b]), float(sums[2][b])))
+        return out
+
+    def _prune(self, series):
+        """Drop raw records and rollups older than their tier keeps"""
+        newest = self.latest_time(series)
+        self.db.execute("DELETE FROM points WHERE series = ? AND t_ms < ?",
+                        (series, newest - self.raw_retention_ms))
+        for bucket_ms, keep_ms in TIERS:
+            if keep_ms is not None:
+                self.db.execute("DELETE FROM rollups WHERE series = ? AND bucket_ms = ? AND start_ms < ?",
+                                (series, bucket_ms, newest - keep_ms))
+
+    def _backfill_rollups(self):
+        """Schema 1 → 2: build the rollups from the raw records already stored"""
+        with self.db:
+            self.db.execute("DELETE FROM rollups")
+            self.db.execute("DELETE FROM first_seen")
+            for series in self.series():
+                rows = [(t_ms, text, json.loads(text)) for t_ms, text in self.db.execute(
+                    "SELECT t_ms, record FROM points WHERE series = ? ORDER BY t_ms, id", (series,))]
+                self.db.execute("DELETE FROM points WHERE series = ?", (series,))
+                self._insert(series, rows)
+            self.db.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", (str(SCHEMA_VERSION),))
+
+    def append(self, series, record, t_ms=None, dedupe=True):
+        """Add one record; with dedupe, skipped (→ False) if already stored at its time"""
+        text = _dumps(record)
+        t_ms = record_time_ms(record) if t_ms is None else t_ms
+        if dedupe and self.db.execute("SELECT 1 FROM points WHERE series = ? AND t_ms = ? AND record = ?",
+                                      (series, t_ms, text)).fetchone():
+            return False
+        with self.db:
+            self._insert(series, [(t_ms, text, record)])
+        return True
+
+    def extend(self, series, records):
+        """Add many records in one transaction; returns how many"""
+        rows = [(record_time_ms(r), _dumps(r), r) for r in records]
+        with self.db:
+            self._insert(series, rows)
+        return len(rows)
+
+    def extend_new(self, series, records):
+        """Add the records not stored yet (e.g. a re-read file); returns how many"""
+        rows = [(record_time_ms(r), _dumps(r), r) for r in records]
+        if not rows:
+            return 0
+        times = [t_ms for t_ms, _, _ in rows]
+        stored = set(self.db.execute("SELECT t_ms, record FROM points WHERE series = ? "
+                                     "AND t_ms BETWEEN ? AND ?", (series, min(times), max(times))))
+        # Older than the raw window: already pruned (and rolled up), not new
+        horizon = (self.latest_time(series) or 0) - self.raw_retention_ms
+        fresh = []
+        for row in rows:
+            if row[:2] not in stored and row[0] >= horizon:
+                stored.add(row[:2])
+                fresh.append(row)
+        with self.db:
+            self._insert(series, fresh)
+        return len(fresh)
+
+    # -- reads ---------------------------------------------------------
+
+    def latest_time(self, series):
+        row = self.db.execute("SELECT MAX(t_ms) FROM points WHERE series = ?", (series,)).fetchone()
+        return row[0]
+
+    def last(self, series, n=1):
+        """The newest n records of a series, oldest first"""
+        rows = self.db.execute("SELECT record FROM points WHERE series = ? "
+                               "ORDER BY t_ms DESC, id DESC LIMIT ?", (series, n)).fetchall()
+        return [json.loads(text) for text, in reversed(rows)]
+
+    def range(self, series, start_ms=None, end_ms=None):
+        """Records with start_ms <= t_ms < end_ms (open ends allowed), oldest first"""
+        query = "SELECT record FROM points WHERE series = ?"
+        args = [series]
+        if start_ms is not None:
+            query += " AND t_ms >= ?"
+            args.append(start_ms)
+        if end_ms is not None:
+            query += " AND t_ms < ?"
+            args.append(end_ms)
+        rows = self.db.execute(query + " ORDER BY t_ms, id", args).fetchall()
+        return [json.loads(text) for text, in rows]
+
+    def rollup(self, series, bucket_ms, start_ms=None, end_ms=None):
+        """One record-shaped dict per bucket of a tier, oldest first
+
+        Each Δt key holds the bucket's count, the mean of the means, the mean
+        of the reported variances and the variance of the means across the
+        bucket ("spread"), so plotting code can treat it like a raw record.
+        """
+        query = ("SELECT start_ms, key, n, sum_mean, sumsq_mean, sum_var FROM rollups "
+                 "WHERE series = ? AND bucket_ms = ?")
+        args = [series, bucket_ms]
+        if start_ms is not None:
+            query += " AND start_ms >= ?"
+            args.append(start_ms)
+        if end_ms is not None:
+            query += " AND start_ms < ?"
+            args.append(end_ms)
+        buckets = {}
+        for start, key, n, sum_mean, sumsq_mean, sum_var in self.db.execute(query + " ORDER BY start_ms", args):
+            record = buckets.get(start)
+            if record is None:
+                stamp = datetime.fromtimestamp(start / 1000, timezone.utc)
+                record = buckets[start] = {"timestamp_iso": stamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                           "bucket_ms": bucket_ms}
+            mean = sum_mean / n
+            record[key] = {"count": n, "mean": mean, "variance": sum_var / n,
+                           "spread": max(0.0, sumsq_mean / n - mean * mean)}
+        return list(buckets.values())
+
+    def trend(self, series, max_points, start_ms=None):
+        """(bucket_ms, records) from the finest tier that still covers the range
+        and has at most max_points points (bucket_ms 0 means raw records)
+
+        The daily tier is never pruned, so it is the answer when nothing finer
+        fits.
+        """
+        newest = self.latest_time(series)
+        if newest is None:
+            return 0, []
+        first = self.db.execute("SELECT first_ms FROM first_seen WHERE series = ?", (series,)).fetchone()[0]
+        start = first if start_ms is None else max(first, start_ms)
+        for bucket_ms, keep_ms in [(0, self.raw_retention_ms)] + TIERS:
+            if keep_ms is not None and start < newest - keep_ms:
+                continue                 # Part of the range has aged out of this tier
+            if bucket_ms == 0:
+                n = self.db.execute("SELECT COUNT(*) FROM points WHERE series = ? AND t_ms >= ?",
+                                    (series, start)).fetchone()[0]
+            else:
+                n = self.db.execute("SELECT COUNT(DISTINCT start_ms) FROM rollups WHERE series = ? "
+                                    "AND bucket_ms = ? AND start_ms >= ?",
+                                    (series, bucket_ms, start // bucket_ms * bucket_ms)).fetchone()[0]
+            if n <= max_points or keep_ms is None:
+                if bucket_ms == 0:
+                    return 0, self.range(series, start)
+                return bucket_ms, self.rollup(series, bucket_ms, start // bucket_ms * bucket_ms)
+        return 0, []
+
+    def count(self, series=None):
+        if series is None:
+            return self.db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM points WHERE series = ?", (series,)).fetchone()[0]
+
+    def series(self):
+        return [name for name, in self.db.execute("SELECT DISTINCT series FROM points ORDER BY series")]
+
+    # -- history.json --------------------------------------------------
+
+    def migrate_json(self, legacy):
+        """Import a history.json (any layout this repo wrote)"""
+        legacy = Path(legacy)
+        with open(legacy) as f:
+            history = json.load(f)
+
+        by_series = {}
+        if isinstance(history.get("timestamps"), list):
+            # generate_chart.py: parallel lists of timestamps and var_* values
+            for i, stamp in enumerate(history["timestamps"]):
+                record = {"timestamp_iso": stamp}
+                for key, values in history.items():
+                    if key.startswith("var_") and i < len(values):
+                        record[f"delta_t_{key[4:]}"] = {"variance": values[i]}
+                by_series.setdefault("latest", []).append(record)
+        else:
+            for key, entries in history.items():
+                if not isinstance(entries, list):
+                    continue
+                name = key[:-len("_history")] if key.endswith("_history") else series_name(key)
+                by_series.setdefault(name, []).extend(
+                    unwrap(e) for e in entries if isinstance(e, dict))
+
+        imported = dropped = 0
+        with self.db:
+            for name, records in by_series.items():
+                kept, previous = [], None
+                for record in records:
+                    if not has_measurements(record) or record == previous:
+                        dropped += 1
+                        continue
+                    kept.append(record)
+                    previous = record
+                kept.sort(key=lambda r: record_time_ms(r, 0))
+                self._insert(name, [(record_time_ms(r, 0), _dumps(r), r) for r in kept])
+                imported += len(kept)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_from', ?)", (legacy.name,))
+        print(f"✓ Migrated {legacy} → {self.path} ({imported} records, {dropped} empty or repeated)")
+        return imported
+
+    def export_json(self, path=None, points=EXPORT_POINTS):
+        """Write the newest records of every series to history.json; True if it changed"""
+        path = self.path.with_name(JSON_NAME) if path is None else Path(path)
+        text = json.dumps({f"{name}.json": self.last(name, points) for name in self.series()},
+                          indent=2) + "\n"
+        try:
+            if path.read_text() == text:
+                return False
+        except OSError:
+            pass
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+        return True
@@ -5,50 +5,59 @@ Collects 500 samples and immediately uploads.
 """
 
 import serial
-import json
-import base64
-import requests
 import time
+import numpy as np
 from config import GITHUB_TOKEN
+try:
+    from config import ADC_VREF, ADC_MAX
+except ImportError:
+    from raw_archive import ADC_VREF, ADC_MAX
+from serial_ingest import SerialIngest, MISSING
+from raw_store import RawStore
+from github_client import get_client
+from github_batch import BatchPublisher
+from trt_metrics import registry, span
 
 SERIAL_PORT = '/dev/ttyACM1'
 BAUD_RATE = 115200
 GITHUB_USER = 'nentrapper-g-rod'
 GITHUB_REPO = 'Time-Resolution-Theory-Live-Proof'
 SAMPLES_TO_COLLECT = 500
+MANUAL_CYCLE = MISSING  # Cycle is unknown for manual captures
+RAW_FORMAT = 'trtr'     # 'trtr' compact binary archive, or 'json'
 
+metrics = registry("manual_raw_upload")
 print("Collecting 500 samples from Arduino...")
 
 ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
 time.sleep(2)
 
-samples = []
-while len(samples) < SAMPLES_TO_COLLECT:
-    try:
-        line = ser.readline().decode('utf-8', errors='ignore').strip()
-        if ',' in line:
-            parts = line.split(',')
-            if len(parts) == 2:
-                try:
-                    timestamp_s = float(parts[0])
-                    voltage = float(parts[1])
-                    timestamp_ms = int(timestamp_s * 1000)
-                    samples.append({'t_ms': timestamp_ms, 'v': voltage})
+ingest = SerialIngest(ser)
 
-                    if len(samples) % 100 == 0:
-                        print(f"Collected {len(samples)}/{SAMPLES_TO_COLLECT} samples...")
-                except:
-                    pass
+chunks = []
+collected = 0
+while collected < SAMPLES_TO_COLLECT:
+    try:
+        with span("serial_read"):
+            batch = ingest.read()
+        take = min(len(batch), SAMPLES_TO_COLLECT - collected)
+        if take:
+            chunks.append((batch.t_ms[:take], batch.voltage[:take]))
+            if collected // 100 != (collected + take) // 100:
+                print(f"Collected {collected + take}/{SAMPLES_TO_COLLECT} samples...")
+            collected += take
     except:
         pass
 
 ser.close()
 
-print(f"✓ Collected {len(samples)} samples")
+t_ms = np.concatenate([c[0] for c in chunks]) if chunks else np.empty(0, np.int64)
+voltage = np.concatenate([c[1] for c in chunks]) if chunks else np.empty(0)
+print(f"✓ Collected {len(t_ms)} samples")
 
 # Determine phase based on timestamp
-if len(samples) > 0:
-    timestamp_ms = samples[-1]['t_ms']
+if len(t_ms) > 0:
+    timestamp_ms = int(t_ms[-1])
     if timestamp_ms < 300000:
         phase = 0
         phase_name = 'control_off'
@@ -76,48 +85,16 @@ else:
 
 print(f"Phase detected: {phase} ({phase_name})")
 
-# Build JSON
-json_data = {
-    'timestamp_ms': int(time.time() * 1000),
-    'total_samples_collected': len(samples),
-    'sample_count': len(samples),
-    'sampling_rate_hz': 1000,
-    'phase': phase,
-    'phase_name': phase_name,
-    'raw_samples': samples
-}
-
-json_str = json.dumps(json_data, indent=2)
-print(f"JSON size: {len(json_str)} bytes")
-
-# Upload to GitHub
-file_path = f'data/raw_{phase_name}.json'
-api_url = f'https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{file_path}'
-headers = {
-    'Authorization': f'Bearer {GITHUB_TOKEN}',
-    'Accept': 'application/vnd.github.v3+json'
-}
-
-# Get existing file SHA
-print(f"Uploading to {file_path}...")
-sha = None
-response = requests.get(api_url, headers=headers)
-if response.status_code == 200:
-    sha = response.json().get('sha')
-    print(f"Found existing file SHA: {sha[:8]}...")
-
-# Upload
-content_b64 = base64.b64encode(json_str.encode()).decode()
-payload = {
-    'message': f'Manual upload of raw {phase_name} data',
-    'content': content_b64
-}
-if sha:
-    payload['sha'] = sha
-
-response = requests.put(api_url, headers=headers, json=payload)
-if response.status_code in [200, 201]:
-    print(f"✅ Successfully uploaded {len(samples)} samples to {file_path}")
-else:
-    print(f"❌ Upload failed: {response.status_code}")
-    print(response.text)
+# Upload as a new append-only segment (never overwrites earlier uploads)
+store = RawStore(BatchPublisher(get_client(f'{GITHUB_USER}/{GITHUB_REPO}', GITHUB_TOKEN)),
+                 fmt=RAW_FORMAT, vref=ADC_VREF, adc_max=ADC_MAX)
+print(f"Uploading {len(t_ms)} samples to {store.manifest_path(phase)}...")
+try:
+    with span("archive"):
+        path = store.append(MANUAL_CYCLE, phase, t_ms, voltage)
+    with span("publish"):
+        store.publish(f'Manual raw upload for {phase_name}')
+    print(f"✅ Successfully uploaded {len(t_ms)} samples to {path}")
+except IOError as e:
+    print(f"❌ Upload failed: {e}")
+metrics.flush(force=True)
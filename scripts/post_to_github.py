@@ -2,20 +2,30 @@
 """
 TRT Arduino to GitHub Poster
 Fetches data from Arduino web server and posts to GitHub
+
+With ARDUINO_DEVICES = {"name": "http://ip", ...} in config.py every rig
+is fetched concurrently (each with its own timeout) and published under
+its own name, live_data/<name>/ and data/devices/<name>/, in the same
+single commit; a board that does not answer is reported and left out.
 """
 
 import requests
-import json
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
 import sys
 from config import ARDUINO_IP, GITHUB_TOKEN, GITHUB_REPO, GITHUB_FILE
-
-def fetch_arduino_data():
+try:
+    from config import ARDUINO_DEVICES
+except ImportError:
+    ARDUINO_DEVICES = {}
+from github_client import get_client, GitHubError
+from github_batch import BatchPublisher
+
+def fetch_arduino_data(arduino_ip=ARDUINO_IP):
     """Fetch current data from Arduino"""
     try:
-        response = requests.get(f"{ARDUINO_IP}/", timeout=5)
+        response = requests.get(f"{arduino_ip}/", timeout=5)
         html = response.text
 
         # Extract data from HTML (simple regex parsing)
@@ -39,55 +49,28 @@ def fetch_arduino_data():
         print(f"Error fetching Arduino data: {e}")
         return None
 
-def post_to_github(data):
-    """Post data to GitHub"""
+def post_to_github(data, publisher=None, path=GITHUB_FILE):
+    """Post data to GitHub (or stage it on a BatchPublisher)"""
     if not data:
         return False
 
-    # Get current file
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_FILE}"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            file_data = response.json()
-            sha = file_data['sha']
-        else:
-            sha = None  # File doesn't exist yet
-
-        # Prepare new content
-        content = json.dumps(data, indent=2)
-        encoded_content = base64.b64encode(content.encode()).decode()
-
-        # Update file
-        payload = {
-            "message": f"TRT data update - {data.get('samples', 0)} samples",
-            "content": encoded_content
-        }
-        if sha:
-            payload['sha'] = sha
-
-        response = requests.put(url, headers=headers, json=payload)
-
-        if response.status_code in [200, 201]:
-            print(f"✓ Posted to GitHub: {data.get('samples', 0)} samples")
-            return True
-        else:
-            print(f"✗ GitHub error: {response.status_code}")
-            return False
+        target = publisher or get_client(GITHUB_REPO, GITHUB_TOKEN)
+        target.put_json(path, data, f"TRT data update - {data.get('samples', 0)} samples")
+        print(f"✓ {'Staged' if publisher else 'Posted to GitHub'}: {data.get('samples', 0)} samples")
+        return True
 
+    except GitHubError as e:
+        print(f"✗ GitHub error: {e.status_code}")
+        return False
     except Exception as e:
         print(f"Error posting to GitHub: {e}")
         return False
 
-def fetch_boot_log():
+def fetch_boot_log(arduino_ip=ARDUINO_IP):
     """Fetch boot log from Arduino"""
     try:
-        response = requests.get(f"{ARDUINO_IP}/bootlog", timeout=5)
+        response = requests.get(f"{arduino_ip}/bootlog", timeout=5)
         if response.status_code == 200:
             return response.json()
         else:
@@ -97,60 +80,62 @@ def fetch_boot_log():
         print(f"Error fetching boot log: {e}")
         return None
 
-def post_boot_log_to_github(boot_data):
-    """Post boot log to GitHub"""
+def post_boot_log_to_github(boot_data, publisher=None, path="data/boot_log.json"):
+    """Post boot log to GitHub (or stage it on a BatchPublisher)"""
     if not boot_data:
         return False
 
-    file_path = "data/boot_log.json"
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{file_path}"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            file_data = response.json()
-            sha = file_data['sha']
-        else:
-            sha = None  # File doesn't exist yet
-
-        # Prepare new content
-        content = json.dumps(boot_data, indent=2)
-        encoded_content = base64.b64encode(content.encode()).decode()
-
-        # Update file
-        payload = {
-            "message": f"Boot log update - {boot_data.get('boot_timestamp', 'unknown')}",
-            "content": encoded_content
-        }
-        if sha:
-            payload['sha'] = sha
-
-        response = requests.put(url, headers=headers, json=payload)
-
-        if response.status_code in [200, 201]:
-            print(f"✓ Posted boot log to GitHub")
-            return True
-        else:
-            print(f"✗ Boot log GitHub error: {response.status_code}")
-            return False
-
+        target = publisher or get_client(GITHUB_REPO, GITHUB_TOKEN)
+        target.put_json(path, boot_data,
+                        f"Boot log update - {boot_data.get('boot_timestamp', 'unknown')}")
+        print(f"✓ {'Staged' if publisher else 'Posted'} boot log")
+        return True
+
+    except GitHubError as e:
+        print(f"✗ Boot log GitHub error: {e.status_code}")
+        return False
     except Exception as e:
         print(f"Error posting boot log to GitHub: {e}")
         return False
 
+def fetch_device(arduino_ip):
+    """(data, boot log) from one device"""
+    return fetch_arduino_data(arduino_ip), fetch_boot_log(arduino_ip)
+
 if __name__ == "__main__":
-    # Post live data
-    data = fetch_arduino_data()
-    if data:
-        post_to_github(data)
+    # Live data and boot log go out as one commit
+    publisher = BatchPublisher(get_client(GITHUB_REPO, GITHUB_TOKEN))
+
+    if ARDUINO_DEVICES:
+        # Every rig at once; a dead one only costs its own timeouts
+        with ThreadPoolExecutor(max_workers=len(ARDUINO_DEVICES)) as pool:
+            results = dict(zip(ARDUINO_DEVICES, pool.map(fetch_device, ARDUINO_DEVICES.values())))
+        for name, (data, boot_data) in results.items():
+            if not data:
+                print(f"✗ {name}: no data")
+                continue
+            post_to_github(data, publisher, f"live_data/{name}/trt_live_data.json")
+            if boot_data:
+                post_boot_log_to_github(boot_data, publisher, f"data/devices/{name}/boot_log.json")
+        if not any(data for data, _ in results.values()):
+            sys.exit(1)
     else:
-        sys.exit(1)
+        data = fetch_arduino_data()
+        if data:
+            post_to_github(data, publisher)
+        else:
+            sys.exit(1)
 
-    # Post boot log (once per run)
-    boot_data = fetch_boot_log()
-    if boot_data:
-        post_boot_log_to_github(boot_data)
+        # Boot log (once per run)
+        boot_data = fetch_boot_log()
+        if boot_data:
+            post_boot_log_to_github(boot_data, publisher)
+
+    try:
+        commit = publisher.publish()
+    except GitHubError as e:
+        print(f"✗ GitHub error: {e.status_code}")
+        sys.exit(1)
+    print(f"✓ Published {publisher.files_published} files in one commit" if commit
+          else "• No changes to publish")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Compact binary archive format for raw TRT samples (.trtr).
+
+    header  <4sBBHIIiiffI  (40 bytes)
+            magic "TRTR", version, flags, reserved, count, t0_ms,
+            cycle, phase, adc_vref, adc_max, crc32(payload)
+    payload uint32[count]  timestamp deltas (first is 0, t = t0 + cumsum)
+            int16[count]   12-bit ADC codes
+            zlib-compressed as a whole when FLAG_ZLIB is set
+
+That is 6 bytes per sample before compression (the JSON list of
+{'t_ms', 'v'} dicts is ~40), and at a steady 1 kHz the constant deltas make
+zlib very effective. read_archive() returns NumPy arrays directly.
+Voltages are stored as the codes of the ADC that produced them (vref and
+adc_max in the header); encode_archive() raises QuantizationError when
+they do not round-trip within half an LSB, e.g. a 5 V / 10-bit sketch
+archived with the 3.3 V / 12-bit defaults.
+
+Convert the legacy data/raw_<phase>.json files into segments with:
+
+    python3 scripts/raw_archive.py convert data/raw_*.json
+"""
+
+import json
+import re
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"TRTR"
+VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER = struct.Struct("<4sBBHIIiiffI")
+ADC_VREF = 3.3
+ADC_MAX = 4095.0
+EXTENSION = ".trtr"
+
+
+class QuantizationError(ValueError):
+    """Voltages that are not raw * vref / adc_max for the given ADC"""
+
+
+def voltage_to_code(voltage, vref=ADC_VREF, adc_max=ADC_MAX):
+    """Recover ADC codes from voltages printed as raw * vref / adc_max"""
+    codes = np.rint(np.nan_to_num(np.asarray(voltage, dtype=np.float64)) * (adc_max / vref))
+    return np.clip(codes, 0, adc_max).astype(np.int16)
+
+
+def code_to_voltage(codes, vref=ADC_VREF, adc_max=ADC_MAX):
+    return np.asarray(codes, dtype=np.float64) * (vref / adc_max)
+
+
+def encode_archive(t_ms, voltage=None, codes=None, cycle=-1, phase=-1,
+                   compress=True, vref=ADC_VREF, adc_max=ADC_MAX):
+    """Pack samples into .trtr bytes; pass ADC codes directly when known"""
+    t_ms = np.asarray(t_ms, dtype=np.int64)
+    if codes is None:
+        codes = voltage_to_code(voltage, vref, adc_max)
+        error = np.abs(code_to_voltage(codes, vref, adc_max) - np.asarray(voltage, dtype=np.float64))
+        if not np.all(error <= 0.5 * vref / adc_max):
+            raise QuantizationError(f"voltages do not fit a {vref:g} V / {adc_max:g} ADC "
+                                    f"(max error {error.max():.4g} V)")
+    codes = np.asarray(codes, dtype="<i2")
+    count = len(t_ms)
+    t0 = int(t_ms[0]) if count else 0
+    deltas = np.diff(t_ms, prepend=t0)
+    if count and (deltas.min() < 0 or deltas.max() > 0xFFFFFFFF):
+        raise ValueError("timestamps must be non-decreasing within an archive")
+    payload = deltas.astype("<u4").tobytes() + codes.tobytes()
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    header = HEADER.pack(MAGIC, VERSION, flags, 0, count, t0 & 0xFFFFFFFF,
+                         int(cycle), int(phase), vref, adc_max, zlib.crc32(payload))
+    return header + payload
+
+
+def read_archive(data, with_codes=False):
+    """Decode .trtr bytes → (t_ms int64, voltage float64[, codes int16], meta)"""
+    (magic, version, flags, _, count, t0, cycle, phase,
+     vref, adc_max, crc) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a TRTR archive")
+    if version != VERSION:
+        raise ValueError(f"unsupported TRTR version {version}")
+    payload = bytes(data[HEADER.size:])
+    if zlib.crc32(payload) != crc:
+        raise ValueError("TRTR payload CRC mismatch")
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    deltas = np.frombuffer(payload, dtype="<u4", count=count)
+    codes = np.frombuffer(payload, dtype="<i2", count=count, offset=4 * count)
+    t_ms = t0 + np.cumsum(deltas, dtype=np.int64)
+    voltage = code_to_voltage(codes, vref, adc_max)
+    meta = {"count": count, "cycle": cycle, "phase": phase, "vref": vref, "adc_max": adc_max}
+    if with_codes:
+        return t_ms, voltage, codes.astype(np.int16), meta
+    return t_ms, voltage, meta
+
+
+def _legacy_samples(items):
+    t_ms = np.fromiter((s['t_ms'] for s in items), dtype=np.int64, count=len(items))
+    voltage = np.fromiter((s['v'] for s in items), dtype=np.float64, count=len(items))
+    return t_ms, voltage
+
+
+def iter_legacy_json(path):
+    """Yield (cycle, phase_name, t_ms, voltage) from an old raw_<phase>.json"""
+    path = Path(path)
+    with open(path) as f:
+        data = json.load(f)
+    match = re.match(r"raw_(.+)\.json$", path.name)
+    name = data.get('phase_name') or (match.group(1) if match else 'unknown')
+    if 'raw_samples' in data:
+        # manual_raw_upload.py layout: one capture, cycle unknown
+        yield -1, name, *_legacy_samples(data['raw_samples'])
+        return
+    for key, items in data.items():
+        cycle_match = re.match(r"cycle_(-?\d+)$", key)
+        if cycle_match and isinstance(items, list) and items:
+            yield int(cycle_match.group(1)), name, *_legacy_samples(items)
+
+
+def convert_legacy(paths, store):
+    """Append every cycle of the given legacy files to a RawStore as .trtr segments"""
+    written = []
+    for path in paths:
+        for cycle, name, t_ms, voltage in iter_legacy_json(path):
+            # Timestamps restart on reboot; split so each archive stays monotonic
+            breaks = np.flatnonzero(np.diff(t_ms) < 0) + 1
+            for t_part, v_part in zip(np.split(t_ms, breaks), np.split(voltage, breaks)):
+                written.append(store.append(cycle, name, t_part, v_part))
+    return written
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] != "convert":
+        print("usage: raw_archive.py convert data/raw_<phase>.json [...]")
+        return 1
+    from raw_store import RawStore, LocalBackend
+    store = RawStore(LocalBackend("."), fmt="trtr")
+    for path in argv[1:]:
+        before = Path(path).stat().st_size
+        segments = convert_legacy([path], store)
+        after = sum(Path(p).stat().st_size for p in segments)
+        print(f"✓ {path}: {len(segments)} segments, {before} → {after} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
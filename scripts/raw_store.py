@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Append-only raw sample storage.
+
+Instead of one ever-growing data/raw_<phase>.json that is downloaded,
+extended and re-uploaded on every upload, each upload writes one new
+segment file and appends it to a bounded manifest part:
+
+    data/raw/<phase_name>/manifest.json                 index of parts
+    data/raw/<phase_name>/parts/c<cycle>_<k>.json       up to SEGMENTS_PER_PART segments
+    data/raw/<phase_name>/c<cycle>_<t_start_ms>_<seq>.trtr   (or .json)
+
+A segment holds only the samples of one (cycle, phase, upload window), so
+each upload costs the size of the new data. A part lists the segments of
+one cycle with their time range, sample count and blob SHA; it rolls over
+when the cycle changes or it is full, and only then is the index rewritten.
+So an upload rewrites one file of at most SEGMENTS_PER_PART entries however
+long the experiment runs. Readers reassemble any cycle or phase from the
+parts, and reset_experiment.py deletes segments without a GET per file.
+Version 1 manifests (every segment inline) are still read; their segments
+stay in the index and new ones go to parts. The uploader keeps the index
+and parts (and their SHAs) in memory after the first read, so steady-state
+uploads are PUTs only.
+
+Writers share the index and the parts (the running uploader, and
+manual_raw_upload.py writing cycle -1 into the same phase). Every index or
+part write names the sha it was based on; when that is no longer current,
+the file is re-read and the entries this writer added since it last synced
+are merged in by path before retrying, so neither writer's segments are
+lost. Two different entries for the same path cannot be merged and raise
+ManifestConflict. Segments are written as compact .trtr archives (see
+raw_archive.py) by default; fmt="json" keeps human-readable column JSON.
+vref/adc_max must describe the ADC of the sketch that printed the
+voltages; a segment that does not fit them is written as JSON instead.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from raw_archive import (ADC_MAX, ADC_VREF, EXTENSION as ARCHIVE_EXTENSION, QuantizationError,
+                         code_to_voltage, encode_archive, read_archive)
+
+RAW_ROOT = "data/raw"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+PARTS_DIR = "parts"
+SEGMENTS_PER_PART = 64
+MERGE_ATTEMPTS = 3
+DEFAULT_FORMAT = "trtr"
+
+PHASE_NAMES = {
+    0: 'control_off',
+    1: 'control_on',
+    2: 'sweep_100hz',
+    3: 'sweep_1khz',
+    4: 'sweep_10khz',
+    5: 'sweep_20khz',
+    6: 'live_trt'
+}
+
+
+def phase_name(phase):
+    return PHASE_NAMES.get(phase, phase if isinstance(phase, str) else 'unknown')
+
+
+def phase_id(phase):
+    if isinstance(phase, int):
+        return phase
+    return next((k for k, v in PHASE_NAMES.items() if v == phase), -1)
+
+
+class LocalBackend:
+    """Stores files under a local directory (a checkout, or for offline runs)
+
+    The remote backends are github_client.GitHubClient (one commit per file)
+    and github_batch.BatchPublisher (staged, one commit per publish()), which
+    have the same get/put/delete interface.
+    """
+
+    def __init__(self, root="."):
+        self.root = Path(root)
+
+    def get(self, path):
+        file = self.root / path
+        if not file.exists():
+            return None, None
+        return file.read_bytes(), None
+
+    def put(self, path, content, message, sha=None):
+        file = self.root / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(content)
+        return None
+
+    def delete(self, path, message, sha=None):
+        file = self.root / path
+        if file.exists():
+            file.unlink()
+        return True
+
+
+class ManifestConflict(IOError):
+    """A concurrent manifest update that cannot be merged without losing data"""
+
+
+def _is_conflict(error):
+    return getattr(error, 'status_code', None) in (409, 422)
+
+
+class RawStore:
+    """Segment writer/reader on top of a backend"""
+
+    def __init__(self, backend, root=RAW_ROOT, fmt=DEFAULT_FORMAT,
+                 segments_per_part=SEGMENTS_PER_PART, vref=ADC_VREF, adc_max=ADC_MAX):
+        self.backend = backend
+        self.root = root.rstrip('/')
+        self.fmt = fmt
+        self.vref = vref
+        self.adc_max = adc_max
+        self.segments_per_part = segments_per_part
+        self._docs = {}        # index/part path → (dict, sha)
+        self._added = {}       # index/part path → (message, key, entries added since last sync)
+
+    def manifest_path(self, phase):
+        return f'{self.root}/{phase_name(phase)}/{MANIFEST_NAME}'
+
+    def part_path(self, phase, cycle, k):
+        return f'{self.root}/{phase_name(phase)}/{PARTS_DIR}/c{cycle}_{k}.json'
+
+    def _doc(self, path, empty, refresh=False):
+        if refresh or path not in self._docs:
+            content, sha = self.backend.get(path)
+            self._docs[path] = (json.loads(content) if content else empty, sha)
+        return self._docs[path][0]
+
+    def manifest(self, phase, refresh=False):
+        """The phase's index: its parts, plus any version 1 inline segments"""
+        name = phase_name(phase)
+        index = self._doc(self.manifest_path(name),
+                          {'version': MANIFEST_VERSION, 'phase': name, 'parts': [], 'segments': []},
+                          refresh)
+        index.setdefault('parts', [])
+        index.setdefault('segments', [])
+        return index
+
+    def _part(self, path, refresh=False):
+        return self._doc(path, {'version': MANIFEST_VERSION, 'segments': []}, refresh)
+
+    def _open_part(self, name, cycle):
+        """(path, part, k) of the part the next segment of cycle goes to"""
+        index = self.manifest(name)
+        parts = [p['path'] for p in index['parts'] if p['cycle'] == cycle]
+        if parts:
+            part = self._part(parts[-1])
+            if len(part['segments']) < self.segments_per_part:
+                return parts[-1], part, len(parts) - 1
+        k = len(parts)
+        path = self.part_path(name, cycle, k)
+        self._docs[path] = ({'version': MANIFEST_VERSION, 'phase': name, 'cycle': cycle,
+                             'segments': []}, None)
+        index['version'] = MANIFEST_VERSION
+        self._add(self.manifest_path(name), 'parts', {'path': path, 'cycle': cycle},
+                  f'Index raw cycle {cycle} part {k} for {name}')
+        return path, self._docs[path][0], k
+
+    def append(self, cycle, phase, t_ms, voltage=None, codes=None):
+        """Write one segment with only the new samples, then add it to its part"""
+        t_ms = np.asarray(t_ms, dtype=np.int64)
+        if len(t_ms) == 0:
+            return None
+        name = phase_name(phase)
+        part_path, part, k = self._open_part(name, cycle)
+        seq = k * self.segments_per_part + len(part['segments'])
+        fmt = self.fmt
+        if fmt == "trtr":
+            seg_path = f'{self.root}/{name}/c{cycle}_{int(t_ms[0])}_{seq}{ARCHIVE_EXTENSION}'
+            try:
+                content = encode_archive(t_ms, voltage, codes, cycle=cycle, phase=phase_id(phase),
+                                         vref=self.vref, adc_max=self.adc_max)
+            except QuantizationError as e:
+                print(f"⚠️  {e}; writing segment {seq} for {name} as JSON")
+                fmt = "json"
+        if fmt != "trtr":
+            seg_path = f'{self.root}/{name}/c{cycle}_{int(t_ms[0])}_{seq}.json'
+            if voltage is None:
+                voltage = code_to_voltage(codes, self.vref, self.adc_max)
+            content = json.dumps({
+                'cycle': cycle,
+                'phase': name,
+                't_ms': t_ms.tolist(),
+                'v': [round(v, 6) for v in np.asarray(voltage, dtype=np.float64).tolist()],
+            }, separators=(',', ':')).encode()
+        segment = {
+            'cycle': cycle,
+            't_start_ms': int(t_ms[0]),
+            't_end_ms': int(t_ms[-1]),
+            'count': len(t_ms),
+        }
+        seg_sha = self.backend.put(seg_path, content, f'Cycle {cycle} raw segment {seq} for {name}')
+        entry = dict(segment)
+        entry['format'] = fmt
+        entry['bytes'] = len(content)
+        entry['path'] = seg_path
+        entry['sha'] = seg_sha
+        self._add(part_path, 'segments', entry, f'Index raw segment {seq} for {name}')
+        return seg_path
+
+    def _add(self, path, key, entry, message):
+        """Append entry to doc[key] and write the doc, remembering it for merges"""
+        self._docs[path][0][key].append(entry)
+        added = self._added.setdefault(path, (message, key, []))
+        added[2].append(entry)
+        self._write(path)
+
+    def _write(self, path):
+        for attempt in range(MERGE_ATTEMPTS):
+            doc, sha = self._docs[path]
+            expect = getattr(self.backend, 'expect', None)
+            if expect:
+                expect(path, sha)
+            try:
+                new_sha = self.backend.put(path, json.dumps(doc, indent=1).encode(),
+                                           self._added[path][0], sha)
+                break
+            except IOError as e:
+                if not _is_conflict(e) or attempt == MERGE_ATTEMPTS - 1:
+                    raise
+                self._merge(path)
+        self._docs[path] = (doc, new_sha)
+        if not hasattr(self.backend, 'publish'):
+            del self._added[path]          # Written straight to the branch: in sync
+
+    def _merge(self, path):
+        """Re-read path and re-apply the entries we added since we last synced"""
+        unstage = getattr(self.backend, 'unstage', None)
+        if unstage:
+            unstage(path)
+        content, sha = self.backend.get(path)
+        ours, _ = self._docs[path]
+        _, key, entries = self._added[path]
+        if content:
+            theirs = json.loads(content)
+            theirs.setdefault(key, [])
+        else:
+            # Deleted meanwhile (a reset): keep only what we added since
+            theirs = {k: v for k, v in ours.items() if not isinstance(v, list)}
+            theirs[key] = []
+        known = {e['path']: e for e in theirs[key]}
+        for entry in entries:
+            other = known.get(entry['path'])
+            if other is None:
+                theirs[key].append(entry)
+            elif other != entry:
+                raise ManifestConflict(f"{path}: {entry['path']} was written by two uploaders")
+        self._docs[path] = (theirs, sha)
+
+    def publish(self, message=None):
+        """Commit staged files when the backend batches them (BatchPublisher)"""
+        publish = getattr(self.backend, 'publish', None)
+        if not publish:
+            return None
+        for attempt in range(MERGE_ATTEMPTS):
+            try:
+                result = publish(message)
+                break
+            except IOError as e:
+                if not _is_conflict(e) or attempt == MERGE_ATTEMPTS - 1:
+                    raise
+                for path in list(self._added):
+                    self._merge(path)
+                    self._write(path)
+        self._added.clear()
+        return result
+
+    def segments(self, phase, cycle=None):
+        index = self.manifest(phase, refresh=True)
+        segs = list(index['segments'])
+        for entry in index['parts']:
+            if cycle is None or entry['cycle'] == cycle:
+                segs.extend(self._part(entry['path'], refresh=True)['segments'])
+        if cycle is not None:
+            segs = [s for s in segs if s['cycle'] == cycle]
+        return sorted(segs, key=lambda s: (s['cycle'], s['t_start_ms']))
+
+    def read_segment(self, path):
+        content, _ = self.backend.get(path)
+        if content is None:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+        if path.endswith(ARCHIVE_EXTENSION):
+            t_ms, voltage, _ = read_archive(content)
+            return t_ms, voltage
+        segment = json.loads(content)
+        return np.asarray(segment['t_ms'], np.int64), np.asarray(segment['v'], np.float64)
+
+    def read(self, phase, cycle=None):
+        """Reassemble (t_ms, voltage) arrays for a phase, optionally one cycle"""
+        parts = [self.read_segment(s['path']) for s in self.segments(phase, cycle)]
+        if not parts:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def cycles(self, phase):
+        """Cycles with data, from the index alone"""
+        index = self.manifest(phase, refresh=True)
+        return sorted({p['cycle'] for p in index['parts']} | {s['cycle'] for s in index['segments']})
+
+    def delete_phase(self, phase, message='Reset experiment'):
+        """Delete every segment of a phase plus its parts and index"""
+        name = phase_name(phase)
+        ok = True
+        for seg in self.segments(name):
+            ok = self.backend.delete(seg['path'], f'{message}: delete {seg["path"]}', seg.get('sha')) and ok
+        index_path = self.manifest_path(name)
+        for entry in self.manifest(name)['parts']:
+            _, sha = self._docs.pop(entry['path'], (None, None))
+            self._added.pop(entry['path'], None)
+            ok = self.backend.delete(entry['path'], f'{message}: delete {entry["path"]}', sha) and ok
+        _, sha = self._docs.pop(index_path, (None, None))
+        self._added.pop(index_path, None)
+        ok = self.backend.delete(index_path, f'{message}: delete {name} manifest', sha) and ok
+        return ok
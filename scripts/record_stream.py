@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Record-by-record reader for the firmware's concatenated JSON files.
+
+Several data files are not one JSON document:
+
+    control_off.json    {"cycle_0": {...}, "cycle_0": {...}, ...}
+                        (the same key repeated; json.load keeps only the last)
+    cycle_history.json  [{...}\\n,\\n{...}\\n,\\n ...]  appended as a stream,
+                        often without the closing bracket while being written
+
+RecordFile walks such a file one top-level record at a time through a
+bounded read buffer, keeps every record (duplicate keys included, with the
+key alongside), and remembers the byte offset where each record starts and
+where parsing stopped. refresh() then only reads and parses what was
+appended since. If the file was rewritten (it shrank, or the bytes before
+the resume point changed) the index is rebuilt from scratch.
+
+A malformed record is skipped by resynchronising on the next line that
+starts a record, and counted in `errors`; an incomplete record at the end
+of the file is left for the next refresh(). Plain JSON files (one object,
+or an array) come back as one record or one record per element.
+"""
+
+import codecs
+import json
+import os
+import re
+
+CHUNK_SIZE = 64 * 1024
+MAX_RECORD_BYTES = 4 * 1024 * 1024   # A "record" bigger than this is treated as corrupt
+CHECK_BYTES = 64                      # Bytes fingerprinted to detect a rewritten file
+
+KEYED_OPEN = re.compile(r'\s*\{\s*"cycle_-?\d+"\s*:\s*\{')   # Firmware's per-cycle records
+KEY_PREFIX = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*')
+RESYNC_KEYED = re.compile(r'\n\s*"')
+RESYNC_VALUE = re.compile(r'\n\s*[{\[]')
+SEPARATORS = ' \t\r\n,'
+
+_decoder = json.JSONDecoder()
+
+
+def _nbytes(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogateescape'))
+
+
+def _incomplete(error, text):
+    """True if a decode error just means the record has not been fully read yet"""
+    return error.msg.startswith("Unterminated string") or error.pos >= len(text.rstrip()) - 1
+
+
+class RecordFile:
+    """Incremental, duplicate-preserving reader with a byte-offset index"""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, max_record=MAX_RECORD_BYTES, keep=True):
+        self.path = str(path)
+        self.chunk_size = chunk_size
+        self.max_record = max_record
+        self.keep = keep
+        self._reset()
+
+    def _reset(self):
+        self.mode = None      # 'keyed', 'array' or 'stream'
+        self.offsets = []     # Byte offset of each record's value
+        self.keys = []        # Object key per record (keyed mode), else None
+        self.records = []     # Decoded values (when keep=True)
+        self.resume = 0       # Byte offset where the next parse starts
+        self.size = 0
+        self.mtime_ns = 0
+        self.errors = 0
+        self._head = b''
+        self._check = b''
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # -- change detection ----------------------------------------------
+
+    def _fingerprint(self, f, end):
+        f.seek(max(0, end - CHECK_BYTES))
+        return f.read(min(end, CHECK_BYTES))
+
+    def _rewritten(self, f, size):
+        # Appended files only grow; a modified file that did not is a rewrite
+        if size <= self.size:
+            return True
+        f.seek(0)
+        if f.read(len(self._head)) != self._head:
+            return True
+        return self._fingerprint(f, self.resume) != self._check
+
+    # -- parsing -------------------------------------------------------
+
+    def refresh(self):
+        """Parse whatever was appended since the last call; returns the new records"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._reset()
+            return []
+        if self.mode is not None and (st.st_size, st.st_mtime_ns) == (self.size, self.mtime_ns):
+            return []
+        with open(self.path, 'rb') as f:
+            if self.mode is not None and self._rewritten(f, st.st_size):
+                self._reset()
+            new = list(self._parse(f))
+            self.size, self.mtime_ns = st.st_size, st.st_mtime_ns
+            self._head = self._head or self._fingerprint(f, min(st.st_size, CHECK_BYTES))
+            self._check = self._fingerprint(f, self.resume)
+        if self.keep:
+            self.records.extend(value for _, _, value in new)
+        return [value for _, _, value in new]
+
+    def _detect(self, text):
+        """Length of the top-level opener, and how records are laid out"""
+        stripped = text.lstrip()
+        skipped = len(text) - len(stripped)
+        if stripped[:1] == '[':
+            return 'array', skipped + 1
+        if KEYED_OPEN.match(stripped):
+            return 'keyed', skipped + 1
+        return 'stream', 0
+
+    def _parse(self, f):
+        """Yield (offset, key, value) from self.resume on, advancing self.resume"""
+        f.seek(self.resume)
+        decoder = codecs.getincrementaldecoder('utf-8')('surrogateescape')
+        text = ''
+        pos = 0                       # Characters of text already consumed
+        eof = False
+        while True:
+            if not eof and len(text) - pos < self.chunk_size:
+                chunk = f.read(self.chunk_size)
+                eof = len(chunk) < self.chunk_size
+                # Drop the consumed prefix so the buffer stays bounded
+                text = text[pos:] + decoder.decode(chunk, final=eof)
+                pos = 0
+            if self.mode is None:
+                if not text.strip() and not eof:
+                    continue
+                self.mode, pos = self._detect(text)
+                self.resume += _nbytes(text[:pos])
+            record, end, stop = self._next(text, pos, eof)
+            if stop:
+                return
+            if record is None and end == pos:
+                if eof or len(text) - pos >= self.max_record:
+                    return
+                # Need more bytes for this record
+                chunk = f.read(self.chunk_size)
+                eof = len(chunk) < self.chunk_size
+                text += decoder.decode(chunk, final=eof)
+                continue
+            if record is not None:
+                start, key, value = record
+                offset = self.resume + _nbytes(text[pos:start])
+                self.offsets.append(offset)
+                self.keys.append(key)
+                yield offset, key, value
+            self.resume += _nbytes(text[pos:end])
+            pos = end
+
+    def _next(self, text, pos, eof):
+        """Decode the record at text[pos:] → ((start, key, value) | None, end, stop)"""
+        length = len(text)
+        while pos < length and text[pos] in SEPARATORS:
+            pos += 1
+        if pos == length:
+            return None, pos, eof
+        if text[pos] in ']}' and self.mode in ('array', 'keyed'):
+            return None, pos, True       # Closing bracket; appends go before it
+        key = None
+        value_pos = pos
+        if self.mode == 'keyed':
+            match = KEY_PREFIX.match(text, pos)
+            if not match:
+                if length - pos < 256 and not eof:
+                    return None, pos, False
+                return self._resync(text, pos)
+            key = json.loads(f'"{match.group(1)}"')
+            value_pos = match.end()
+        try:
+            value, end = _decoder.raw_decode(text, value_pos)
+        except json.JSONDecodeError as e:
+            if not eof and _incomplete(e, text) and length - pos < self.max_record:
+                return None, pos, False
+            if eof and _incomplete(e, text):
+                return None, pos, True   # Record still being written; next refresh()
+            return self._resync(text, pos)
+        return (value_pos, key, value), end, False
+
+    def _resync(self, text, pos):
+        """Skip a malformed record: jump to the next line that opens a record"""
+        self.errors += 1
+        opener = RESYNC_KEYED if self.mode == 'keyed' else RESYNC_VALUE
+        match = opener.search(text, pos + 1)
+        return None, match.start() + 1 if match else len(text), False
+
+    # -- random access -------------------------------------------------
+
+    def read(self, index):
+        """Decode record `index` straight from its offset (no full re-read)"""
+        start = self.offsets[index]
+        end = self.offsets[index + 1] if index + 1 < len(self.offsets) else self.resume
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            text = f.read(end - start).decode('utf-8', 'surrogateescape')
+        return _decoder.raw_decode(text)[0]
+
+    def latest(self):
+        self.refresh()
+        if not self.offsets:
+            return None
+        return self.records[-1] if self.keep else self.read(len(self.offsets) - 1)
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """Yield (key, record) for every record without keeping them in memory"""
+    reader = RecordFile(path, chunk_size=chunk_size, keep=False)
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return
+    with f:
+        for _, key, value in reader._parse(f):
+            yield key, value
+
+
+_open_files = {}
+
+
+def open_records(path):
+    """Shared, refreshed RecordFile for path (long-lived processes re-read only the tail)"""
+    path = str(path)
+    reader = _open_files.get(path)
+    if reader is None:
+        reader = _open_files[path] = RecordFile(path)
+    reader.refresh()
+    return reader
+
+
+def load_records(path):
+    """Every record in path, duplicates included"""
+    return list(open_records(path).records)
+
+
+def latest_record(path):
+    """The last complete record in path, or None"""
+    return open_records(path).latest()
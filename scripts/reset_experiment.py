@@ -4,9 +4,11 @@ Reset TRT Experiment Data
 Deletes all JSON data files from GitHub /data/ directory
 """
 
-import requests
 import sys
 from config import GITHUB_TOKEN
+from raw_store import RawStore, PHASE_NAMES
+from github_client import get_client, GitHubError
+from github_batch import BatchPublisher
 
 GITHUB_USER = 'nentrapper-g-rod'
 GITHUB_REPO = 'Time-Resolution-Theory-Live-Proof'
@@ -33,41 +35,56 @@ DATA_FILES = [
     'latest.json'
 ]
 
-def delete_file(filename):
-    """Delete a file from GitHub"""
-    api_url = f'https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/data/{filename}'
-    headers = {
-        'Authorization': f'Bearer {GITHUB_TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
-
-    # Get file SHA
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 404:
+def delete_file(client, publisher, filename):
+    """Stage a file for deletion in the reset commit"""
+    path = f'data/{filename}'
+    try:
+        sha = client.get_sha(path)
+    except GitHubError as e:
+        print(f"  {filename} - error getting file: {e.status_code}")
+        return False
+    if sha is None:
         print(f"  {filename} - doesn't exist (skipping)")
         return True
-    elif response.status_code != 200:
-        print(f"  {filename} - error getting file: {response.status_code}")
-        return False
 
-    sha = response.json().get('sha')
-    if not sha:
-        print(f"  {filename} - couldn't get SHA")
-        return False
+    publisher.delete(path, f'Reset experiment: delete {filename}', sha)
+    print(f"  {filename} - queued")
+    return True
 
-    # Delete file
-    payload = {
-        'message': f'Reset experiment: delete {filename}',
-        'sha': sha
-    }
+def reset(client):
+    """Delete every data file and raw segment in one commit; files processed, None on failure"""
+    publisher = BatchPublisher(client)
+    success_count = 0
+    for filename in DATA_FILES:
+        if delete_file(client, publisher, filename):
+            success_count += 1
 
-    response = requests.delete(api_url, headers=headers, json=payload)
-    if response.status_code in [200, 204]:
-        print(f"  {filename} - deleted ✓")
-        return True
+    print()
+    print("Deleting append-only raw segments...")
+    print()
+    store = RawStore(publisher)
+    for name in PHASE_NAMES.values():
+        count = len(store.segments(name))
+        if count == 0:
+            print(f"  raw/{name} - no segments (skipping)")
+            continue
+        store.delete_phase(name, 'Reset experiment')
+        print(f"  raw/{name} - {count} segments queued")
+
+    # Everything above goes out as a single commit
+    print()
+    staged = len(publisher.pending)
+    try:
+        commit = publisher.publish(f'Reset experiment: delete {staged} files')
+    except GitHubError as e:
+        print(f"Reset commit failed: {e}")
+        return None
+    if commit:
+        print(f"Deleted {publisher.files_published} files in commit {commit[:7]} ✓")
     else:
-        print(f"  {filename} - delete failed: {response.status_code}")
-        return False
+        print("Nothing to delete")
+
+    return success_count
 
 def main():
     print("=" * 60)
@@ -87,10 +104,10 @@ def main():
     print("Deleting data files from GitHub...")
     print()
 
-    success_count = 0
-    for filename in DATA_FILES:
-        if delete_file(filename):
-            success_count += 1
+    client = get_client(f'{GITHUB_USER}/{GITHUB_REPO}', GITHUB_TOKEN)
+    success_count = reset(client)
+    if success_count is None:
+        return 1
 
     print()
     print("=" * 60)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Bulk serial ingest for the Arduino sample stream.
+
+Drains everything waiting in the serial buffer at once, carries partial lines
+over to the next read, and converts whole chunks of CSV into NumPy arrays in
+one pass. Both stream formats are accepted:
+
+    time_s,voltage               (original firmware)
+    time_s,voltage,cycle,phase   (cycle-aware firmware)
+
+Lines in the 2-field format get cycle/phase = -1 (MISSING).
+
+Firmware built with TRT_BINARY_SERIAL sends 9-byte frames instead:
+
+    0xA5 0x5A | uint32 millis (LE) | uint16 ADC code (LE) | CRC-8
+
+The CRC is CRC-8 (poly 0x07, init 0x00) over the 6 payload bytes. SerialIngest
+detects which framing the board is using and falls back to CSV on its own.
+"""
+
+import numpy as np
+
+MISSING = -1
+MAX_READ = 65536  # Upper bound on bytes pulled per read()
+
+# Binary framing
+SYNC = b"\xa5\x5a"
+FRAME_LEN = 9
+PAYLOAD = slice(2, 8)
+ADC_VREF = 3.3
+ADC_MAX = 4095.0     # GIGA R1 12-bit ADC
+DETECT_BYTES = 256   # Bytes inspected before choosing a framing
+MIN_FRAMES = 4       # Valid frames needed to call the stream binary
+
+# Sample lines start with a number; "# header" and "[DEBUG]" lines do not
+_NUMERIC_START = frozenset(b"0123456789-+.")
+_PAD_2_FIELDS = b"," + str(MISSING).encode() + b"," + str(MISSING).encode()
+
+
+class SampleBatch:
+    """Column arrays for a chunk of parsed samples"""
+
+    __slots__ = ("t_ms", "voltage", "cycle", "phase")
+
+    def __init__(self, t_ms, voltage, cycle, phase):
+        self.t_ms = t_ms
+        self.voltage = voltage
+        self.cycle = cycle
+        self.phase = phase
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, np.int64), np.empty(0, np.float64),
+                   np.empty(0, np.int32), np.empty(0, np.int32))
+
+    def __len__(self):
+        return len(self.t_ms)
+
+    def segments(self):
+        """(start, stop) index ranges over which cycle and phase are constant"""
+        n = len(self)
+        if n == 0:
+            return []
+        change = np.flatnonzero((np.diff(self.cycle) != 0) | (np.diff(self.phase) != 0)) + 1
+        bounds = np.concatenate(([0], change, [n]))
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _is_sample_line(line):
+    return line[:1] != b"" and line[0] in _NUMERIC_START and line.count(b",") in (1, 3)
+
+
+def _normalise(line):
+    return line if line.count(b",") == 3 else line + _PAD_2_FIELDS
+
+
+def parse_lines(lines):
+    """Parse complete CSV lines (bytes, no newline) into a SampleBatch"""
+    rows = [_normalise(line) for line in (l.strip() for l in lines) if _is_sample_line(line)]
+    if not rows:
+        return SampleBatch.empty(), len(lines)
+    try:
+        table = np.array(b",".join(rows).split(b","), dtype=np.float64).reshape(-1, 4)
+        rejected = len(lines) - len(rows)
+    except ValueError:
+        # A corrupted field somewhere in the chunk: fall back to row by row
+        good = []
+        for row in rows:
+            try:
+                good.append([float(x) for x in row.split(b",")])
+            except ValueError:
+                pass
+        rejected = len(lines) - len(good)
+        if not good:
+            return SampleBatch.empty(), rejected
+        table = np.array(good, dtype=np.float64)
+    return SampleBatch(
+        (table[:, 0] * 1000).astype(np.int64),
+        table[:, 1].copy(),
+        table[:, 2].astype(np.int32),
+        table[:, 3].astype(np.int32),
+    ), rejected
+
+
+def parse_line(line):
+    """Single-line convenience wrapper: (t_ms, voltage, cycle, phase) or None"""
+    if isinstance(line, str):
+        line = line.encode("utf-8", errors="ignore")
+    batch, _ = parse_lines([line])
+    if not len(batch):
+        return None
+    cycle = int(batch.cycle[0])
+    phase = int(batch.phase[0])
+    return (int(batch.t_ms[0]), float(batch.voltage[0]),
+            None if cycle == MISSING else cycle,
+            None if phase == MISSING else phase)
+
+
+def _crc8_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    """CRC-8/ATM of a bytes object (matches the firmware's trtCrc8)"""
+    crc = 0
+    for b in data:
+        crc = int(CRC8_TABLE[crc ^ b])
+    return crc
+
+
+def encode_frame(ms, adc):
+    """Build one binary frame (host-side mirror of the firmware encoder)"""
+    payload = int(ms & 0xFFFFFFFF).to_bytes(4, "little") + int(adc & 0xFFFF).to_bytes(2, "little")
+    return SYNC + payload + bytes([crc8(payload)])
+
+
+class FrameDecoder:
+    """Vectorised decoder for the binary sample framing"""
+
+    def __init__(self):
+        self._buffer = b""
+        self.frames = 0
+        self.dropped = 0       # Sync word found but CRC failed
+        self.resyncs = 0       # Times bytes had to be discarded to regain sync
+        self.bytes_skipped = 0
+
+    def scan(self, buf):
+        """Return (frame starts, end of consumed bytes, crc failures) for buf"""
+        b = np.frombuffer(buf, dtype=np.uint8)
+        n = len(b)
+        if n < FRAME_LEN:
+            return np.empty(0, np.int64), 0, 0
+        cand = np.flatnonzero((b[:-1] == SYNC[0]) & (b[1:] == SYNC[1]))
+        cand = cand[cand + FRAME_LEN <= n]
+        if cand.size == 0:
+            return cand, 0, 0
+        crc = np.zeros(cand.size, dtype=np.uint8)
+        for k in range(PAYLOAD.start, PAYLOAD.stop):
+            crc = CRC8_TABLE[crc ^ b[cand + k]]
+        ok = crc == b[cand + FRAME_LEN - 1]
+        starts = cand[ok]
+        # A sync pattern can occur inside a payload; keep non-overlapping frames
+        if starts.size > 1 and np.any(np.diff(starts) < FRAME_LEN):
+            kept, last_end = [], -1
+            for s in starts.tolist():
+                if s >= last_end:
+                    kept.append(s)
+                    last_end = s + FRAME_LEN
+            starts = np.array(kept, dtype=np.int64)
+        end = int(starts[-1]) + FRAME_LEN if starts.size else 0
+        covered = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(covered, starts, 1)
+        np.add.at(covered, starts + FRAME_LEN, -1)
+        inside = np.cumsum(covered)[cand[~ok]] > 0
+        return starts, end, int(np.count_nonzero(~inside))
+
+    def feed(self, data):
+        buf = self._buffer + data
+        starts, end, bad = self.scan(buf)
+        self.dropped += bad
+        # Bytes before each frame that are not the previous frame's tail were lost
+        prev_end = np.concatenate(([0], starts[:-1] + FRAME_LEN)) if starts.size else starts
+        gaps = starts - prev_end
+        self.resyncs += int(np.count_nonzero(gaps))
+        self.bytes_skipped += int(gaps.sum())
+        keep_from = max(end, len(buf) - (FRAME_LEN - 1))
+        if keep_from > end:
+            self.bytes_skipped += keep_from - end
+            self.resyncs += 1
+        self._buffer = buf[keep_from:]
+        self.frames += int(starts.size)
+        if not starts.size:
+            return SampleBatch.empty()
+        b = np.frombuffer(buf, dtype=np.uint8)
+        idx = starts[:, None] + np.arange(PAYLOAD.start, PAYLOAD.stop)
+        payload = np.ascontiguousarray(b[idx])
+        ms = payload[:, :4].copy().view("<u4").ravel().astype(np.int64)
+        adc = payload[:, 4:6].copy().view("<u2").ravel()
+        count = len(ms)
+        return SampleBatch(ms, adc * (ADC_VREF / ADC_MAX),
+                           np.full(count, MISSING, np.int32),
+                           np.full(count, MISSING, np.int32))
+
+
+class SerialIngest:
+    """Reads a pyserial port in bulk and yields SampleBatch chunks
+
+    mode is "auto" (detect binary vs CSV), "csv" or "binary". In auto mode a
+    binary stream that stops producing frames while newlines keep arriving
+    (e.g. the board was reflashed with CSV firmware) drops back to detection.
+    """
+
+    def __init__(self, ser, max_read=MAX_READ, mode="auto"):
+        self.ser = ser
+        self.max_read = max_read
+        self.auto = mode == "auto"
+        self.mode = None if self.auto else mode
+        self._last_mode = self.mode
+        self._partial = b""
+        self._pending = b""
+        self._idle_bytes = 0
+        self.decoder = FrameDecoder()
+        self.lines = 0
+        self.rejected = 0
+        self.bytes_read = 0
+        self.mode_switches = 0
+
+    @property
+    def stats(self):
+        """Counters for logging: framing, parse rejects, resyncs and drops"""
+        return {
+            "mode": self.mode or "detecting",
+            "bytes_read": self.bytes_read,
+            "lines": self.lines,
+            "rejected": self.rejected,
+            "frames": self.decoder.frames,
+            "resyncs": self.decoder.resyncs,
+            "dropped": self.decoder.dropped,
+            "bytes_skipped": self.decoder.bytes_skipped,
+            "mode_switches": self.mode_switches,
+        }
+
+    @staticmethod
+    def detect(buf):
+        """Guess the framing of a buffer: "binary", "csv" or None (undecided)"""
+        starts, _, _ = FrameDecoder().scan(buf)
+        if len(starts) >= MIN_FRAMES and len(starts) * FRAME_LEN * 2 >= len(buf):
+            return "binary"
+        if b"\n" in buf:
+            batch, _ = parse_lines(buf.split(b"\n")[:-1])
+            if len(batch):
+                return "csv"
+        return None
+
+    def _switch(self, mode):
+        if self._last_mode is not None and mode != self._last_mode:
+            self.mode_switches += 1
+        self.mode = self._last_mode = mode
+        self._partial = b""
+        self.decoder._buffer = b""
+        self._idle_bytes = 0
+
+    def feed(self, data):
+        """Parse raw bytes, keeping any trailing partial line/frame for later"""
+        if not data:
+            return SampleBatch.empty()
+        self.bytes_read += len(data)
+        if self.mode is None:
+            self._pending += data
+            if len(self._pending) < DETECT_BYTES:
+                return SampleBatch.empty()
+            mode = self.detect(self._pending)
+            if mode is None:
+                # Keep only the most recent window while undecided
+                self._pending = self._pending[-DETECT_BYTES:]
+                return SampleBatch.empty()
+            data, self._pending = self._pending, b""
+            self._switch(mode)
+        if self.mode == "binary":
+            batch = self.decoder.feed(data)
+            if self.auto:
+                self._idle_bytes = 0 if len(batch) else self._idle_bytes + len(data)
+                if self._idle_bytes >= DETECT_BYTES and b"\n" in data:
+                    self.mode = None
+                    self._pending = data[-DETECT_BYTES:]
+            return batch
+        return self._feed_csv(data)
+
+    def _feed_csv(self, data):
+        chunk = self._partial + data
+        lines = chunk.split(b"\n")
+        self._partial = lines.pop()
+        self.lines += len(lines)
+        batch, rejected = parse_lines(lines)
+        self.rejected += rejected
+        if self.auto:
+            self._idle_bytes = 0 if len(batch) else self._idle_bytes + len(data)
+            if self._idle_bytes >= DETECT_BYTES and SYNC in data:
+                self.mode = None
+                self._pending = data[-DETECT_BYTES:]
+        return batch
+
+    def read(self):
+        """Drain the port; blocks up to the port timeout when nothing is waiting"""
+        waiting = self.ser.in_waiting
+        if waiting:
+            data = self.ser.read(min(waiting, self.max_read))
+        else:
+            data = self.ser.read(1)
+            if data and self.ser.in_waiting:
+                data += self.ser.read(min(self.ser.in_waiting, self.max_read))
+        return self.feed(data)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Δt resolution ladder: Gaussian-blurred mean/variance for many scales at once.
+
+The TRT statistics only need the mean and variance of each blurred series,
+not the series itself. With the window mirrored (scipy's "reflect" edges) the
+blur is a circular convolution, so by Parseval
+
+    variance(Δt) = Σ_k |X_k|² |H_Δt(k)|² / M²     (k ≠ 0)
+
+One FFT gives |X_k|² for every scale. Each scale then only sums over its own
+Gaussian passband, which shrinks as 1/σ, so a log-spaced ladder costs one
+O(N log N) FFT plus O(N) in total rather than one convolution per scale.
+H is the sampled Gaussian's exact (periodised) response; the only difference
+from gaussian_filter1d is its 4σ kernel truncation: about 1e-4 relative for
+broadband signals, up to ~2e-3 when most of the power sits near a scale's
+passband edge, and more when the blurred variance is close to zero.
+"""
+
+import re
+import numpy as np
+
+FWHM_TO_SIGMA = 2.355
+SAMPLE_RATE_HZ = 1000
+DEFAULT_RESOLUTIONS_MS = [100, 10, 1]
+# |H|² below this is treated as zero when trimming a scale's passband
+PASSBAND_FLOOR = 1e-16
+
+_KEY_RE = re.compile(r"^delta_t_([0-9.]+)ms$")
+
+
+def label_for(dt_ms):
+    """Δt label as used in the JSON keys: 100 → "100ms", 3.162 → "3.162ms\""""
+    # Fixed point (never 1e+06) so that _KEY_RE reads every label back
+    return np.format_float_positional(float(dt_ms), precision=6, fractional=False, trim='-') + "ms"
+
+
+def delta_t_key(dt_ms):
+    return f"delta_t_{label_for(dt_ms)}"
+
+
+def resolution_keys(record):
+    """[(dt_ms, key), ...] for every delta_t_* entry in a record, coarsest first"""
+    found = []
+    for key in record:
+        match = _KEY_RE.match(key)
+        if match:
+            found.append((float(match.group(1)), key))
+    return sorted(found, reverse=True)
+
+
+def log_spaced(min_ms, max_ms, count):
+    """count log-spaced Δt values (ms) from max_ms down to min_ms, 4 s.f."""
+    values = np.geomspace(max_ms, min_ms, int(count))
+    return [float(f"{v:.4g}") for v in values]
+
+
+def parse_resolutions(spec):
+    """Δt set from config: a list of ms, or {"min_ms", "max_ms", "count"}"""
+    if spec is None:
+        return list(DEFAULT_RESOLUTIONS_MS)
+    if isinstance(spec, dict):
+        return log_spaced(spec["min_ms"], spec["max_ms"], spec["count"])
+    return sorted((float(v) for v in spec), reverse=True)
+
+
+def sigma_samples(dt_ms, sample_rate_hz=SAMPLE_RATE_HZ):
+    return dt_ms * sample_rate_hz / 1000.0 / FWHM_TO_SIGMA
+
+
+def gaussian_power_response(sigma, freqs):
+    """|H(f)|² of a unit-sum sampled Gaussian at f cycles/sample"""
+    # Aliased copies only matter while the kernel is a few samples wide
+    images = range(-3, 4) if sigma < 2 else (0,)
+    h = sum(np.exp(-2.0 * (np.pi * sigma * (freqs - m)) ** 2) for m in images)
+    h0 = sum(np.exp(-2.0 * (np.pi * sigma * m) ** 2) for m in images)
+    return (h / h0) ** 2
+
+
+def ladder_stats(samples, resolutions_ms=None, sample_rate_hz=SAMPLE_RATE_HZ):
+    """Mean/variance of the blurred samples for every Δt in one pass
+
+    Returns {"dt_ms": [...], "mean": [...], "variance": [...]} with one entry
+    per Δt, coarsest first.
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    dts = parse_resolutions(resolutions_ms)
+    n = len(x)
+    if n == 0:
+        return {"dt_ms": dts, "mean": [0.0] * len(dts), "variance": [0.0] * len(dts)}
+    mean = float(x.mean())
+    # Half-sample symmetric extension == scipy "reflect" boundary
+    spectrum = np.fft.rfft(np.concatenate((x - mean, x[::-1] - mean)))
+    m = 2 * n
+    power = np.abs(spectrum) ** 2
+    power[1:] *= 2.0                 # negative frequencies
+    if m % 2 == 0:
+        power[-1] /= 2.0             # Nyquist bin is not mirrored
+    freqs = np.arange(len(power)) / m
+    variances = []
+    for dt in dts:
+        sigma = sigma_samples(dt, sample_rate_hz)
+        # Beyond f_cut the Gaussian's power response is below PASSBAND_FLOOR
+        f_cut = np.sqrt(-np.log(PASSBAND_FLOOR) / 2.0) / (np.pi * sigma)
+        stop = min(len(power), int(f_cut * m) + 2)
+        weight = gaussian_power_response(sigma, freqs[1:stop])
+        variances.append(float(np.dot(power[1:stop], weight)) / (m * m))
+    return {"dt_ms": dts, "mean": [mean] * len(dts), "variance": variances}
+
+
+def ladder_to_keys(ladder, digits=6):
+    """Flatten ladder_stats() output into delta_t_<label> entries"""
+    result = {}
+    for dt, mean, var in zip(ladder["dt_ms"], ladder["mean"], ladder["variance"]):
+        result[delta_t_key(dt)] = {
+            "mean": round(mean, digits),
+            "variance": round(var, digits)
+        }
+    return result
+
+
+class LadderWindow:
+    """Fixed-size ring of the most recent samples for periodic ladder_stats()"""
+
+    def __init__(self, size, resolutions_ms=None, sample_rate_hz=SAMPLE_RATE_HZ):
+        self.resolutions_ms = parse_resolutions(resolutions_ms)
+        self.sample_rate_hz = sample_rate_hz
+        self._ring = np.zeros(int(size))
+        self._pos = 0
+        self._filled = 0
+
+    def extend(self, xs):
+        xs = np.asarray(xs, dtype=np.float64)[-len(self._ring):]
+        size = len(self._ring)
+        first = min(len(xs), size - self._pos)
+        self._ring[self._pos:self._pos + first] = xs[:first]
+        self._ring[:len(xs) - first] = xs[first:]
+        self._pos = (self._pos + len(xs)) % size
+        self._filled = min(size, self._filled + len(xs))
+
+    def values(self):
+        if self._filled < len(self._ring):
+            return self._ring[:self._filled].copy()
+        return np.roll(self._ring, -self._pos)
+
+    def stats(self):
+        return ladder_stats(self.values(), self.resolutions_ms, self.sample_rate_hz)
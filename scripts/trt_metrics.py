@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Stage timing spans and rolling latency histograms, shared across processes.
+
+    with span("fetch", device="rig2"):
+        ...
+
+Each process keeps one Metrics registry (registry()). A span records its
+duration under (stage, labels) in a StageHistogram: cumulative counts over
+fixed BUCKETS since the process started (a Prometheus histogram), plus the
+last LATENCY_WINDOW durations for rolling p50/p99/max (LatencyStats). A
+span that raises, or whose body sets `outcome.ok = False` on what it
+yields, is also counted as an error. Counters that are not timings (e.g.
+auto_update's payloads per device and verdict) are set with set_counter().
+
+auto_update, make_graphs and the serial uploaders are separate processes,
+so each one flushes a JSON snapshot to METRICS_DIR/<process>.json
+(atomically, at most every FLUSH_INTERVAL seconds); make_graphs running
+inside auto_update's resident renderer records into auto_update's
+registry. The dashboard reads the snapshots back: load_snapshots() for its
+summary table and prometheus_text() for /metrics.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from trt_pipeline import LatencyStats
+
+METRICS_DIR = Path(os.environ.get("TRT_METRICS_DIR", Path(__file__).resolve().parent / "metrics"))
+FLUSH_INTERVAL = 5.0       # Seconds between snapshot writes
+STALE_AFTER = 600.0        # A snapshot older than this is from a process that stopped
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StageHistogram(LatencyStats):
+    """LatencyStats plus cumulative bucket counts and an error count"""
+
+    def __init__(self):
+        super().__init__()
+        self.buckets = [0] * len(BUCKETS)      # Non-cumulative; the +Inf bucket is count
+        self.errors = 0
+
+    def add(self, seconds):
+        super().add(seconds)
+        index = bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.buckets[index] += 1
+
+    def snapshot(self):
+        return {"count": self.count, "sum": round(self.total, 6), "errors": self.errors,
+                "buckets": list(self.buckets), **self.summary()}
+
+
+class Outcome:
+    """What a span yields: set ok = False for a failure that does not raise"""
+
+    __slots__ = ("ok",)
+
+    def __init__(self):
+        self.ok = True
+
+
+class Metrics:
+    """One process's stage histograms (see module docstring)"""
+
+    def __init__(self, process, directory=METRICS_DIR, flush_interval=FLUSH_INTERVAL):
+        self.process = process
+        self.path = Path(directory) / f"{process}.json"
+        self.flush_interval = flush_interval
+        self.stages = {}                       # (stage, ((label, value), ...)) → StageHistogram
+        self.counters = {}                     # (name, ((label, value), ...)) → int
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_flush = 0.0
+
+    def observe(self, stage, seconds, ok=True, **labels):
+        """Record one run of stage (seconds=None: a failure with no duration to report)"""
+        key = (stage, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            histogram = self.stages.get(key)
+            if histogram is None:
+                histogram = self.stages[key] = StageHistogram()
+            if seconds is not None:
+                histogram.add(seconds)
+            if not ok:
+                histogram.errors += 1
+
+    def set_counter(self, name, value, **labels):
+        """Publish a monotonic count kept elsewhere (exported as trt_<name>_total)"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            self.counters[key] = value
+
+    @contextmanager
+    def span(self, stage, **labels):
+        outcome = Outcome()
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome.ok = False
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, outcome.ok, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            stages = [{"stage": stage, "labels": dict(labels), **histogram.snapshot()}
+                      for (stage, labels), histogram in sorted(self.stages.items())]
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return {"process": self.process, "pid": os.getpid(), "started": self.started,
+                "updated": time.time(), "buckets": list(BUCKETS), "stages": stages,
+                "counters": counters}
+
+    def flush(self, force=False):
+        """Write the snapshot if FLUSH_INTERVAL has passed (or force); never raises"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < self.flush_interval:
+            return
+        self.last_flush = now
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            with open(tmp, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write metrics to {self.path}: {e}")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def registry(process=None):
+    """This process's Metrics, named by the first caller (else after the script)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = Metrics(process or Path(sys.argv[0] or "python").stem)
+        return _registry
+
+
+def span(stage, **labels):
+    return registry().span(stage, **labels)
+
+
+def load_snapshots(directory=METRICS_DIR):
+    """Every process's last snapshot, each marked stale if it stopped updating"""
+    snapshots = []
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snapshot["age_s"] = round(time.time() - snapshot.get("updated", 0), 1)
+        snapshot["stale"] = snapshot["age_s"] > STALE_AFTER
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(snapshots):
+    """Prometheus text exposition (format 0.0.4) of load_snapshots()"""
+    lines = [
+        "# HELP trt_stage_seconds Duration of pipeline stages since the process started.",
+        "# TYPE trt_stage_seconds histogram",
+    ]
+    recent, errors, updated, counters = [], [], [], {}
+    for snapshot in snapshots:
+        process = snapshot["process"]
+        for entry in snapshot["stages"]:
+            labels = {"process": process, "stage": entry["stage"], **entry["labels"]}
+            cumulative = 0
+            for bound, n in zip(snapshot["buckets"], entry["buckets"]):
+                cumulative += n
+                lines.append(f"trt_stage_seconds_bucket{_labels(**labels, le=f'{bound:g}')} {cumulative}")
+            lines.append(f"trt_stage_seconds_bucket{_labels(**labels, le='+Inf')} {entry['count']}")
+            lines.append(f"trt_stage_seconds_sum{_labels(**labels)} {entry['sum']}")
+            lines.append(f"trt_stage_seconds_count{_labels(**labels)} {entry['count']}")
+            for quantile, key in (("0.5", "p50_ms"), ("0.99", "p99_ms")):
+                if entry.get(key) is not None:
+                    recent.append(f"trt_stage_recent_seconds{_labels(**labels, quantile=quantile)} "
+                                  f"{entry[key] / 1000:g}")
+            errors.append(f"trt_stage_errors_total{_labels(**labels)} {entry['errors']}")
+        for entry in snapshot.get("counters", []):
+            counters.setdefault(entry["name"], []).append(
+                f"trt_{entry['name']}_total{_labels(process=process, **entry['labels'])} {entry['value']}")
+        updated.append(f"trt_metrics_updated_timestamp_seconds{_labels(process=process)} "
+                       f"{snapshot.get('updated', 0):.3f}")
+    lines += ["# HELP trt_stage_recent_seconds Stage duration quantiles over the recent window.",
+              "# TYPE trt_stage_recent_seconds gauge", *recent,
+              "# HELP trt_stage_errors_total Stages that raised.",
+              "# TYPE trt_stage_errors_total counter", *errors,
+              "# HELP trt_metrics_updated_timestamp_seconds When each process last wrote its metrics.",
+              "# TYPE trt_metrics_updated_timestamp_seconds gauge", *updated]
+    for name, samples in sorted(counters.items()):
+        lines += [f"# TYPE trt_{name}_total counter", *samples]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Acquisition / upload pipeline for the serial loggers.
+
+    serial ──► AcquisitionThread ──► SampleRing ──► consumer (stats, batching)
+                                                        │
+                                                        ▼
+                                                   UploadWorker ──► GitHub
+
+The acquisition thread only reads the port and copies samples into a
+single-producer/single-consumer ring, so a slow network can never stall
+sampling. Each index of the ring is written by exactly one thread, so no lock
+is taken on the sample path. Uploads run on their own worker thread behind a
+bounded queue; when it is full the oldest pending job is discarded rather
+than blocking the caller.
+
+AcquisitionThread and UploadWorker optionally take a trt_metrics.Metrics
+and record each serial read ("serial_read") and upload job ("upload") in
+its stage histograms.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from serial_ingest import SampleBatch
+
+RING_CAPACITY = 1 << 18   # ~4 minutes at 1 kHz
+UPLOAD_QUEUE_SIZE = 8
+LATENCY_WINDOW = 256      # Upload latencies kept for percentiles
+
+
+class SampleRing:
+    """Lock-free SPSC ring of samples stored as NumPy columns
+
+    write() is only called by the producer and moves `head`; read() is only
+    called by the consumer and moves `tail`. Samples that do not fit are
+    dropped (and counted) instead of overwriting unread data.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = int(capacity)
+        self.t_ms = np.zeros(self.capacity, np.int64)
+        self.voltage = np.zeros(self.capacity, np.float64)
+        self.cycle = np.zeros(self.capacity, np.int32)
+        self.phase = np.zeros(self.capacity, np.int32)
+        self.head = 0        # total samples written (producer only)
+        self.tail = 0        # total samples read (consumer only)
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def _columns(self):
+        return (self.t_ms, self.voltage, self.cycle, self.phase)
+
+    def write(self, batch):
+        n = len(batch)
+        if n == 0:
+            return 0
+        free = self.capacity - (self.head - self.tail)
+        if n > free:
+            self.dropped += n - free
+            n = free
+        if n == 0:
+            return 0
+        start = self.head % self.capacity
+        first = min(n, self.capacity - start)
+        for dst, src in zip(self._columns(), (batch.t_ms, batch.voltage, batch.cycle, batch.phase)):
+            dst[start:start + first] = src[:first]
+            dst[:n - first] = src[first:n]
+        self.head += n   # Publish only after the data is in place
+        self.high_water = max(self.high_water, self.head - self.tail)
+        return n
+
+    def read(self, max_samples=None):
+        available = self.head - self.tail
+        n = available if max_samples is None else min(available, max_samples)
+        if n == 0:
+            return SampleBatch.empty()
+        start = self.tail % self.capacity
+        idx = (start + np.arange(n)) % self.capacity
+        batch = SampleBatch(*(col[idx] for col in self._columns()))
+        self.tail += n
+        return batch
+
+
+class AcquisitionThread(threading.Thread):
+    """Drains a SerialIngest into a SampleRing as fast as the port delivers"""
+
+    def __init__(self, ingest, ring, metrics=None):
+        super().__init__(name="trt-acquisition", daemon=True)
+        self.ingest = ingest
+        self.ring = ring
+        self.metrics = metrics
+        self.stop_event = threading.Event()
+        self.samples_read = 0
+        self.errors = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                batch = self.ingest.read()
+            except Exception as e:
+                self.errors += 1
+                if self.metrics:
+                    self.metrics.observe("serial_read", time.perf_counter() - start, ok=False)
+                print(f"Acquisition error: {e}")
+                time.sleep(1)
+                continue
+            if self.metrics:
+                self.metrics.observe("serial_read", time.perf_counter() - start)
+            self.samples_read += len(batch)
+            self.ring.write(batch)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class LatencyStats:
+    """Rolling window of durations (seconds) with percentile summary"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count, "p50_ms": None, "p99_ms": None, "max_ms": None}
+        values = np.array(self.samples) * 1000.0
+        return {
+            "count": self.count,
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p99_ms": round(float(np.percentile(values, 99)), 1),
+            "max_ms": round(float(values.max()), 1),
+        }
+
+
+class UploadWorker(threading.Thread):
+    """Runs upload callables off the acquisition path
+
+    submit() never blocks: with the queue full, the oldest pending job is
+    discarded in favour of the new one and counted in jobs_dropped.
+    """
+
+    def __init__(self, max_pending=UPLOAD_QUEUE_SIZE, metrics=None):
+        super().__init__(name="trt-upload", daemon=True)
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.latency = LatencyStats()
+        self.metrics = metrics
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.jobs_dropped = 0
+
+    def submit(self, fn, *args, **kwargs):
+        job = (fn, args, kwargs)
+        while True:
+            try:
+                self.jobs.put_nowait(job)
+                return
+            except queue.Full:
+                try:
+                    self.jobs.get_nowait()
+                    self.jobs.task_done()
+                    self.jobs_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            fn, args, kwargs = job
+            start = time.monotonic()
+            ok = False
+            try:
+                if fn(*args, **kwargs) is False:
+                    self.jobs_failed += 1
+                else:
+                    self.jobs_done += 1
+                    ok = True
+            except Exception as e:
+                self.jobs_failed += 1
+                print(f"Upload error: {e}")
+            finally:
+                seconds = time.monotonic() - start
+                self.latency.add(seconds)
+                if self.metrics:
+                    self.metrics.observe("upload", seconds, ok)
+                self.jobs.task_done()
+
+    def drain(self, timeout=None):
+        """Wait for pending uploads (e.g. on shutdown), then stop the worker"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.jobs.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.jobs.put(None)
+
+
+def pipeline_stats(ring, acquisition, worker, samples_evicted=0):
+    """Counters showing whether sampling ever waited on the network
+
+    samples_evicted counts samples the consumer read but discarded itself
+    (e.g. a bounded upload batch), so every lost sample shows up somewhere.
+    """
+    return {
+        "queue_depth": len(ring),
+        "queue_high_water": ring.high_water,
+        "samples_read": acquisition.samples_read,
+        "samples_dropped": ring.dropped,
+        "samples_evicted": samples_evicted,
+        "uploads_pending": worker.jobs.qsize(),
+        "uploads_done": worker.jobs_done,
+        "uploads_failed": worker.jobs_failed,
+        "uploads_dropped": worker.jobs_dropped,
+        "upload_latency": worker.latency.summary(),
+    }
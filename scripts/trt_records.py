@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+One decoder for every TRT record shape, so consumers stop re-implementing
+extraction with chains of .get(..., {}).get(..., 0).
+
+Shapes understood:
+
+    phase files      {"timestamp_iso", "timestamp_ms", "sample_count",
+                      "delta_t_100ms": {"mean", "variance"}, ...}
+    cycle_history    {"cycle", "phase", "timestamp_iso", "timestamp_ms",
+                      "statistics": {"delta_t_100ms": {...}, ...}}
+    live_trt.json    {"timestamp", "timestamp_ms", "samples",
+                      "mean100", "var100", "mean10", "var10", "mean1", ...}
+    history rollups  {"timestamp_iso", "bucket_ms", "delta_t_*": {"count", "mean", "variance", ...}}
+    legacy wrappers  {"cycle_0": {...}}  (a phase file read with json.load)
+
+normalize() turns one of these into a Record (__slots__: wall-clock time,
+device uptime, label, cycle, phase, sample count and {delta_t key: (mean,
+variance)}). RecordBatch.from_records() decodes a whole list in one pass
+into NumPy columns: one row per record, one column per Δt key (coarsest
+first), NaN where a record lacks a value. Graphs, the history store and the
+dashboard all read this batch.
+"""
+
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from trt_ladder import resolution_keys
+
+CYCLE_KEY = re.compile(r'cycle_-?\d+$')
+FLAT_MEAN = re.compile(r'mean([0-9.]+)$')            # live_trt.json: mean100 → delta_t_100ms
+STANDARD_KEYS = [("delta_t_100ms", 100.0), ("delta_t_10ms", 10.0), ("delta_t_1ms", 1.0)]
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_time_ms(value):
+    """Epoch ms from an ISO-8601 string or epoch seconds, else None"""
+    if isinstance(value, str):
+        try:
+            stamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if stamp.tzinfo is None:
+            stamp = stamp.replace(tzinfo=timezone.utc)
+        return int(stamp.timestamp() * 1000)
+    if _number(value):
+        return int(value * 1000)
+    return None
+
+
+class Record:
+    """One decoded record; stats maps delta_t key → (mean, variance)"""
+
+    __slots__ = ("time_ms", "device_ms", "label", "cycle", "phase", "samples", "stats")
+
+    def __init__(self, time_ms=None, device_ms=None, label=None, cycle=None, phase=None,
+                 samples=None, stats=None):
+        self.time_ms = time_ms        # Wall clock, epoch ms (None if the record has none)
+        self.device_ms = device_ms    # Device uptime (timestamp_ms)
+        self.label = label            # Newest-data label as the record states it
+        self.cycle = cycle
+        self.phase = phase
+        self.samples = samples
+        self.stats = stats if stats is not None else {}
+
+    def __repr__(self):
+        return (f"Record(time_ms={self.time_ms}, device_ms={self.device_ms}, cycle={self.cycle}, "
+                f"phase={self.phase}, stats={self.stats})")
+
+
+def normalize(raw):
+    """Decode any supported record shape into a Record"""
+    if len(raw) == 1:
+        (key, value), = raw.items()
+        if CYCLE_KEY.match(key) and isinstance(value, dict):
+            raw = value
+
+    stats = {}
+    nested = raw.get("statistics") if isinstance(raw.get("statistics"), dict) else raw
+    for _, key in resolution_keys(nested):
+        value = nested[key]
+        if isinstance(value, dict) and _number(value.get("mean")):
+            variance = value.get("variance")
+            stats[key] = (float(value["mean"]), float(variance) if _number(variance) else 0.0)
+    for key, value in raw.items():
+        match = FLAT_MEAN.match(key)
+        if match and _number(value):
+            variance = raw.get(f"var{match.group(1)}")
+            stats.setdefault(f"delta_t_{match.group(1)}ms",
+                             (float(value), float(variance) if _number(variance) else 0.0))
+
+    time_ms = label = None
+    for key in ("timestamp_iso", "timestamp"):
+        value = raw.get(key)
+        if value is None or value == "":
+            continue
+        if label is None:
+            if _number(value):
+                label = datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+            else:
+                label = str(value)
+        if time_ms is None:
+            time_ms = parse_time_ms(value)
+
+    samples = raw.get("sample_count", raw.get("samples"))
+    device_ms = raw.get("timestamp_ms")
+    return Record(time_ms=time_ms,
+                  device_ms=device_ms if _number(device_ms) else None,
+                  label=label,
+                  cycle=raw.get("cycle") if _number(raw.get("cycle")) else None,
+                  phase=raw.get("phase") if _number(raw.get("phase")) else None,
+                  samples=samples if _number(samples) else None,
+                  stats=stats)
+
+
+class RecordBatch:
+    """Column-oriented view of many records (see module docstring)"""
+
+    __slots__ = ("keys", "time_ms", "device_ms", "labels", "cycle", "phase", "samples",
+                 "mean", "variance")
+
+    def __init__(self, keys, time_ms, device_ms, labels, cycle, phase, samples, mean, variance):
+        self.keys = keys              # [(delta_t key, dt_ms)], coarsest first
+        self.time_ms = time_ms        # float64[n], NaN if unknown
+        self.device_ms = device_ms    # float64[n], NaN if unknown
+        self.labels = labels          # list[str | None]
+        self.cycle = cycle            # float64[n], NaN if unknown
+        self.phase = phase
+        self.samples = samples
+        self.mean = mean              # float64[n, len(keys)]
+        self.variance = variance
+
+    @classmethod
+    def from_records(cls, records):
+        rows = [r if isinstance(r, Record) else normalize(r) for r in records]
+        found = {}
+        for row in rows:
+            for key in row.stats:
+                if key not in found:
+                    found[key] = float(key[len("delta_t_"):-len("ms")])
+        keys = sorted(found.items(), key=lambda item: -item[1])
+        column = {key: j for j, (key, _) in enumerate(keys)}
+        mean = np.full((len(rows), len(keys)), np.nan)
+        variance = np.full((len(rows), len(keys)), np.nan)
+        for i, row in enumerate(rows):
+            for key, (m, v) in row.stats.items():
+                mean[i, column[key]] = m
+                variance[i, column[key]] = v
+
+        def col(name):
+            return np.array([np.nan if getattr(r, name) is None else getattr(r, name) for r in rows],
+                            dtype=np.float64)
+
+        return cls(keys, col("time_ms"), col("device_ms"), [r.label for r in rows],
+                   col("cycle"), col("phase"), col("samples"), mean, variance)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def plot_keys(self):
+        """Keys to draw: the batch's own, or the standard three if it has none"""
+        return self.keys or list(STANDARD_KEYS)
+
+    def means(self, key, fill=0.0):
+        return self._column(self.mean, key, fill)
+
+    def variances(self, key, fill=0.0):
+        return self._column(self.variance, key, fill)
+
+    def _column(self, values, key, fill):
+        for j, (name, _) in enumerate(self.keys):
+            if name == key:
+                out = values[:, j].copy()
+                if fill is not None:
+                    out[np.isnan(out)] = fill
+                return out
+        return np.full(len(self), np.nan if fill is None else fill)
+
+    def device_seconds(self):
+        """Device uptime in seconds; a record without one counts as its index (s)"""
+        index = np.arange(len(self), dtype=np.float64)
+        return np.where(np.isnan(self.device_ms), index * 1000, self.device_ms) / 1000.0
+
+    def as_of(self):
+        return self.labels[-1] if len(self) else None
+
+    def latest(self):
+        """The newest record as plain JSON-able values (dashboard / API)"""
+        if not len(self):
+            return None
+
+        def value(array):
+            return None if np.isnan(array[-1]) else array[-1].item()
+
+        def count(array):
+            return None if np.isnan(array[-1]) else int(array[-1])
+
+        return {
+            "as_of": self.as_of(),
+            "cycle": count(self.cycle),
+            "phase": count(self.phase),
+            "samples": count(self.samples),
+            "stats": {key: {"dt_ms": dt_ms, "mean": value(self.mean[:, j]),
+                            "variance": value(self.variance[:, j])}
+                      for j, (key, dt_ms) in enumerate(self.keys) if not np.isnan(self.mean[-1, j])},
+        }
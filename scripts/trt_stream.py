@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Streaming multi-resolution Gaussian filter for TRT samples.
+
+Each Δt resolution keeps a fixed-size tail of raw samples (the Gaussian
+kernel support) plus running mean/variance accumulators, so memory does not
+grow with the recording window. The kernel is built exactly like
+scipy.ndimage.gaussian_filter1d (truncate=4.0), which means the blurred
+values match the batch filter away from the window edges.
+"""
+
+import numpy as np
+
+from trt_ladder import FWHM_TO_SIGMA, delta_t_key, parse_resolutions
+
+TRUNCATE = 4.0      # Kernel half-width in sigmas, scipy's default
+
+
+def gaussian_kernel(sigma, truncate=TRUNCATE):
+    """Normalised Gaussian taps, identical to scipy's gaussian_filter1d"""
+    radius = int(truncate * float(sigma) + 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 / (sigma * sigma) * x * x)
+    return kernel / kernel.sum()
+
+
+class RunningStats:
+    """Welford/Chan accumulator for count, mean and population variance"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def add_many(self, values):
+        """Merge a whole block of values in one vectorised step"""
+        n = len(values)
+        if n == 0:
+            return
+        block_mean = float(np.mean(values))
+        block_m2 = float(np.sum((values - block_mean) ** 2))
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.m2 += block_m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+
+class StreamingGaussian:
+    """One Δt resolution: FIR Gaussian over a fixed ring of recent samples"""
+
+    def __init__(self, dt_ms, label=None, sigma=None):
+        self.dt_ms = dt_ms
+        self.label = label or delta_t_key(dt_ms)
+        self.sigma = sigma if sigma is not None else dt_ms / FWHM_TO_SIGMA
+        self.kernel = gaussian_kernel(self.sigma)
+        self.radius = len(self.kernel) // 2
+        # Doubled ring: every sample is written at _pos and _pos + size, so the
+        # last `size` samples are always the contiguous slice [_pos, _pos + size)
+        self._ring = np.zeros(2 * len(self.kernel))
+        self._filled = 0
+        self._pos = 0
+        self.stats = RunningStats()
+        self.last_value = None
+
+    @property
+    def delay(self):
+        """Samples between an input and the blurred value centred on it"""
+        return self.radius
+
+    def push(self, x):
+        """Feed one sample; returns the blurred value once the kernel is full"""
+        size = len(self.kernel)
+        self._ring[self._pos] = self._ring[self._pos + size] = x
+        self._pos = (self._pos + 1) % size
+        if self._filled < size:
+            self._filled += 1
+            if self._filled < size:
+                return None
+        # Oldest sample sits at _pos, newest at _pos + size - 1: no copy needed
+        y = float(np.dot(self.kernel, self._ring[self._pos:self._pos + size]))
+        self.stats.add(y)
+        self.last_value = y
+        return y
+
+    def extend(self, xs):
+        """Feed a block of samples; returns the newly completed blurred values"""
+        xs = np.asarray(xs, dtype=np.float64)
+        if xs.size == 0:
+            return xs
+        size = len(self.kernel)
+        end = self._pos + size
+        tail = self._ring[end - self._filled:end]
+        # Only size-1 samples of history are needed to continue the convolution
+        joined = np.concatenate((tail[-(size - 1):] if size > 1 else tail[:0], xs))
+        if len(joined) >= size:
+            blurred = np.correlate(joined, self.kernel, mode="valid")
+        else:
+            blurred = joined[:0]
+        keep = joined[-size:]
+        self._ring[:len(keep)] = keep
+        self._ring[size:size + len(keep)] = keep
+        self._filled = len(keep)
+        self._pos = len(keep) % size
+        if blurred.size:
+            self.stats.add_many(blurred)
+            self.last_value = float(blurred[-1])
+        return blurred
+
+
+class StreamingTRT:
+    """All Δt resolutions fed from the same sample stream"""
+
+    def __init__(self, resolutions_ms=None):
+        self.filters = [StreamingGaussian(dt_ms)
+                        for dt_ms in parse_resolutions(resolutions_ms)]
+        self.samples_seen = 0
+
+    def push(self, x):
+        self.samples_seen += 1
+        for f in self.filters:
+            f.push(x)
+
+    def extend(self, xs):
+        xs = np.asarray(xs, dtype=np.float64)
+        self.samples_seen += int(xs.size)
+        for f in self.filters:
+            f.extend(xs)
+
+    def snapshot(self, reset=False):
+        """Rolling statistics keyed delta_t_<label>, as in the phase files"""
+        result = {}
+        for f in self.filters:
+            result[f.label] = {
+                "mean": round(float(f.stats.mean), 6),
+                "variance": round(float(f.stats.variance), 6)
+            }
+            if reset:
+                f.stats.reset()
+        return result
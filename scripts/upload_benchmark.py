@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Upload throughput benchmark against the local fake GitHub API.
+
+Starts fake_github.FakeGitHub in-process, points the shared GitHub client at
+it and drives each upload path the way the scripts do:
+
+    post_to_github         live data + boot log, one contents PUT each
+    post_to_github_batch   the same two files as one Git Data API commit
+    raw_uploader           RawDataUploader.upload_to_github, 500-sample segments
+    run_experiment         build_result() + push_result() per publish
+    reset_experiment       reset() of everything the runs above wrote
+
+For each it reports requests, commits, requests/s, bytes/s (sent + received)
+and p50/p99 request latency as seen by the client. No token or network is
+needed; config.example.py stands in for config.py with a dummy token.
+
+    python3 scripts/upload_benchmark.py --iterations 50 --latency-ms 40 --conflict-rate 0.05
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(REPO_DIR))
+
+from fake_github import FakeGitHub
+
+BENCH_TOKEN = "benchmark-token"
+SEGMENT_SAMPLES = 500
+LATENCY_WINDOW = 100000
+
+
+def install_config():
+    """The uploaders import config.py; use the example values and a dummy token"""
+    spec = importlib.util.spec_from_file_location("config", SCRIPTS_DIR / "config.example.py")
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    config.GITHUB_TOKEN = BENCH_TOKEN
+    sys.modules["config"] = config
+    return config
+
+
+def synthetic_samples(n, t0=0, seed=0):
+    rng = np.random.default_rng(seed)
+    t_ms = t0 + np.arange(n, dtype=np.int64)
+    voltage = np.where((t_ms // 50) % 2 == 0, 1.65, 0.0) + rng.normal(0, 0.01, n)
+    return t_ms, np.clip(voltage, 0, 3.3)
+
+
+# -- scenarios: each takes (client, iterations) ------------------------
+
+def bench_post_to_github(client, iterations):
+    import post_to_github as poster
+    for i in range(iterations):
+        poster.post_to_github({"samples": i * 1000, "runtime": i, "timestamp": f"t{i}"})
+        poster.post_boot_log_to_github({"boot_timestamp": f"b{i}", "cycle": i})
+
+
+def bench_post_to_github_batch(client, iterations):
+    import post_to_github as poster
+    from github_batch import BatchPublisher
+    publisher = BatchPublisher(client)
+    for i in range(iterations):
+        poster.post_to_github({"samples": i * 1000, "runtime": i, "timestamp": f"b{i}"}, publisher)
+        poster.post_boot_log_to_github({"boot_timestamp": f"c{i}", "cycle": i}, publisher)
+        publisher.publish()
+
+
+def bench_raw_uploader(client, iterations):
+    from github_batch import get_publisher
+    from raw_store import RawStore
+    from upload_raw_from_serial import RawDataUploader, RAW_FORMAT
+    uploader = RawDataUploader(store=RawStore(get_publisher(client), fmt=RAW_FORMAT))
+    for i in range(iterations):
+        t_ms, voltage = synthetic_samples(SEGMENT_SAMPLES, t0=i * SEGMENT_SAMPLES, seed=i)
+        samples = list(zip(t_ms.tolist(), voltage.tolist()))
+        uploader.upload_to_github(samples, cycle=i // 7, phase=i % 7)
+
+
+def bench_run_experiment(client, iterations):
+    import run_experiment
+    from trt_stream import StreamingTRT
+    from trt_ladder import LadderWindow
+    engine = StreamingTRT(run_experiment.RESOLUTIONS_MS)
+    ladder = LadderWindow(8192, run_experiment.LADDER_MS)
+    for i in range(iterations):
+        _, voltage = synthetic_samples(2000, seed=i)
+        engine.extend(voltage)
+        ladder.extend(voltage)
+        run_experiment.push_result(run_experiment.build_result(engine, ladder), client)
+
+
+def bench_reset_experiment(client, iterations):
+    import reset_experiment
+    reset_experiment.reset(client)
+
+
+SCENARIOS = {
+    "post_to_github": bench_post_to_github,
+    "post_to_github_batch": bench_post_to_github_batch,
+    "raw_uploader": bench_raw_uploader,
+    "run_experiment": bench_run_experiment,
+    "reset_experiment": bench_reset_experiment,
+}
+
+
+def run_scenario(name, fn, client, server, iterations, verbose=False):
+    from trt_pipeline import LatencyStats
+    client.latency = LatencyStats(LATENCY_WINDOW)
+    before = (client.requests_made, client.bytes_sent + client.bytes_received,
+              sum(len(r.commits) for r in server.repos.values()))
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else out):
+        fn(client, iterations)
+    elapsed = time.perf_counter() - start
+    requests = client.requests_made - before[0]
+    moved = client.bytes_sent + client.bytes_received - before[1]
+    commits = sum(len(r.commits) for r in server.repos.values()) - before[2]
+    latency = client.latency.summary()
+    return {
+        "scenario": name,
+        "seconds": round(elapsed, 3),
+        "requests": requests,
+        "commits": commits,
+        "req_per_s": round(requests / elapsed, 1) if elapsed else None,
+        "bytes_per_s": round(moved / elapsed) if elapsed else None,
+        "p50_ms": latency["p50_ms"],
+        "p99_ms": latency["p99_ms"],
+    }
+
+
+def print_table(results):
+    columns = ["scenario", "requests", "commits", "req_per_s", "bytes_per_s", "p50_ms", "p99_ms"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the uploaders against a fake GitHub API")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only these (repeatable); default all, in order")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--conflict-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per window")
+    parser.add_argument("--rate-window", type=float, default=1.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the uploaders' output")
+    args = parser.parse_args()
+
+    server = FakeGitHub(latency_s=args.latency_ms / 1000, jitter_s=args.jitter_ms / 1000,
+                        conflict_rate=args.conflict_rate, error_rate=args.error_rate,
+                        rate_limit=args.rate_limit, rate_window_s=args.rate_window,
+                        seed=args.seed).start()
+    # Must be set before github_client is imported (module-level defaults)
+    os.environ["GITHUB_API_URL"] = server.url
+    os.environ["GITHUB_SHA_CACHE"] = ""
+    config = install_config()
+
+    from github_client import get_client
+    client = get_client(config.GITHUB_REPO, config.GITHUB_TOKEN)
+    server.repo(config.GITHUB_REPO)   # So its initial commit is not counted
+
+    results = []
+    try:
+        for name in args.scenario or SCENARIOS:
+            results.append(run_scenario(name, SCENARIOS[name], client, server,
+                                        args.iterations, args.verbose))
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps({"server": {"statuses": dict(server.statuses),
+                                     "bytes_in": server.bytes_in, "bytes_out": server.bytes_out},
+                          "results": results}, indent=2))
+    else:
+        print_table(results)
+        print(f"\nServer statuses: {dict(sorted(server.statuses.items()))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
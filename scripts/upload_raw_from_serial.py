@@ -7,12 +7,20 @@ raw data files that the Arduino itself cannot upload due to memory constraints.
 
 import serial
 import time
-import json
-import base64
-import requests
+import numpy as np
 from collections import deque
 from datetime import datetime
 from config import GITHUB_TOKEN
+try:
+    from config import ADC_VREF, ADC_MAX
+except ImportError:
+    from raw_archive import ADC_VREF, ADC_MAX
+from serial_ingest import SerialIngest, parse_line, MISSING
+from raw_store import RawStore, PHASE_NAMES
+from github_client import get_client
+from github_batch import get_publisher
+from trt_pipeline import SampleRing, AcquisitionThread, UploadWorker, pipeline_stats
+from trt_metrics import registry, span
 
 # Configuration
 SERIAL_PORT = '/dev/ttyACM0'  # Current port
@@ -21,21 +29,22 @@ GITHUB_USER = 'nentrapper-g-rod'
 GITHUB_REPO = 'Time-Resolution-Theory-Live-Proof'
 SAMPLES_PER_UPLOAD = 500
 UPLOAD_INTERVAL = 60  # 1 minute (as per user requirement)
-
-# Phase mapping
-PHASE_NAMES = {
-    0: 'control_off',
-    1: 'control_on',
-    2: 'sweep_100hz',
-    3: 'sweep_1khz',
-    4: 'sweep_10khz',
-    5: 'sweep_20khz',
-    6: 'live_trt'
-}
+STATS_INTERVAL = 60   # Seconds between pipeline counter printouts
+MAX_PENDING_UPLOADS = 64  # Each job is raw data, so queue deep rather than drop
+RAW_FORMAT = 'trtr'       # 'trtr' compact binary archive, or 'json'
 
 class RawDataUploader:
-    def __init__(self):
+    def __init__(self, worker=None, store=None):
+        self.worker = worker  # UploadWorker; None uploads inline
+        if store is None:
+            # Segment + manifest go out together as one commit per upload
+            client = get_client(f'{GITHUB_USER}/{GITHUB_REPO}', GITHUB_TOKEN)
+            store = RawStore(get_publisher(client), fmt=RAW_FORMAT, vref=ADC_VREF, adc_max=ADC_MAX)
+        self.store = store
+        # Each upload carries the newest SAMPLES_PER_UPLOAD samples; older ones
+        # in the same window are evicted (and counted) rather than uploaded
         self.samples = deque(maxlen=SAMPLES_PER_UPLOAD)
+        self.samples_evicted = 0
         self.current_phase = 0
         self.current_cycle = 0
         self.last_upload_time = time.time()
@@ -43,119 +52,89 @@ class RawDataUploader:
 
     def parse_serial_line(self, line):
         """Parse CSV line: timestamp,voltage,cycle,phase"""
+        return parse_line(line)
+
+    def upload_to_github(self, samples=None, cycle=None, phase=None):
+        """Upload collected samples as a new append-only segment"""
+        samples = self.samples if samples is None else samples
+        cycle = self.current_cycle if cycle is None else cycle
+        phase = self.current_phase if phase is None else phase
+        if len(samples) == 0:
+            print("No samples to upload")
+            return True
+
+        t_ms = np.fromiter((s[0] for s in samples), dtype=np.int64, count=len(samples))
+        voltage = np.fromiter((s[1] for s in samples), dtype=np.float64, count=len(samples))
+        print(f"Uploading cycle {cycle} phase {phase} ({PHASE_NAMES.get(phase, 'unknown')}): "
+              f"{len(samples)} new samples")
         try:
-            parts = line.strip().split(',')
-            if len(parts) == 4:
-                timestamp_s = float(parts[0])
-                voltage = float(parts[1])
-                cycle = int(parts[2])
-                phase = int(parts[3])
-                return int(timestamp_s * 1000), voltage, cycle, phase
-            elif len(parts) == 2:
-                # Fallback for old format (backward compatibility)
-                timestamp_s = float(parts[0])
-                voltage = float(parts[1])
-                return int(timestamp_s * 1000), voltage, None, None
-        except:
-            pass
-        return None
-
-    def upload_to_github(self):
-        """Upload collected samples to GitHub with cycle-based appending"""
+            with span("archive"):
+                path = self.store.append(cycle, phase, t_ms, voltage)
+            with span("publish"):
+                self.store.publish(f'Cycle {cycle} raw data for {PHASE_NAMES.get(phase, "unknown")}')
+        except IOError as e:
+            print(f"✗ Upload failed: {e}")
+            return False
+        print(f"✓ Successfully uploaded {path}")
+        return True
+
+    def flush(self):
+        """Hand the buffered samples to the upload worker and start a new batch"""
         if len(self.samples) == 0:
-            print("No samples to upload")
             return
-
-        phase_name = PHASE_NAMES.get(self.current_phase, 'unknown')
-        file_path = f'data/raw_{phase_name}.json'
-
-        # Build cycle data entry
-        cycle_samples = [{'t_ms': t, 'v': v} for t, v, _, _ in self.samples]
-
-        # Get current file content (if exists)
-        api_url = f'https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{file_path}'
-        headers = {
-            'Authorization': f'Bearer {GITHUB_TOKEN}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-
-        sha = None
-        existing_data = {}
-
-        response = requests.get(api_url, headers=headers)
-        if response.status_code == 200:
-            file_info = response.json()
-            sha = file_info.get('sha')
-            print(f"Found existing file SHA: {sha[:8]}...")
-
-            # Decode existing content
-            content_b64 = file_info.get('content', '')
-            if content_b64:
-                try:
-                    content = base64.b64decode(content_b64).decode('utf-8')
-                    existing_data = json.loads(content)
-                except:
-                    print("Could not parse existing file, will overwrite")
-                    existing_data = {}
-
-        # Add new cycle data (append to existing samples if cycle already exists)
-        cycle_key = f'cycle_{self.current_cycle}'
-        if cycle_key in existing_data:
-            # Append to existing cycle samples
-            existing_data[cycle_key].extend(cycle_samples)
-            print(f"Appending {len(cycle_samples)} samples to existing {cycle_key}")
-        else:
-            # Create new cycle entry
-            existing_data[cycle_key] = cycle_samples
-            print(f"Creating new {cycle_key} with {len(cycle_samples)} samples")
-
-        json_str = json.dumps(existing_data, indent=2)
-        print(f"Uploading cycle {self.current_cycle} phase {self.current_phase} ({phase_name})")
-        print(f"Total JSON size: {len(json_str)} bytes")
-
-        # Upload file
-        content_b64 = base64.b64encode(json_str.encode()).decode()
-        payload = {
-            'message': f'Cycle {self.current_cycle} raw data for {phase_name}',
-            'content': content_b64
-        }
-        if sha:
-            payload['sha'] = sha
-
-        response = requests.put(api_url, headers=headers, json=payload)
-        if response.status_code in [200, 201]:
-            print(f"✓ Successfully uploaded to {file_path}")
+        snapshot = list(self.samples)
+        self.samples.clear()
+        if self.worker:
+            self.worker.submit(self.upload_to_github, snapshot, self.current_cycle, self.current_phase)
         else:
-            print(f"✗ Upload failed: {response.status_code}")
-            print(response.text)
+            self.upload_to_github(snapshot, self.current_cycle, self.current_phase)
+
+    def _update_position(self, cycle, phase):
+        """Track cycle/phase from Serial data, uploading on phase change"""
+        if phase != self.current_phase:
+            print(f"Phase changed: {self.current_phase} → {phase}")
+            # Upload current phase data before switching
+            self.flush()
+            self.current_phase = phase
+            self.last_upload_time = time.time()
+
+        if cycle != self.current_cycle:
+            print(f"Cycle changed: {self.current_cycle} → {cycle}")
+            self.current_cycle = cycle
+
+    def _upload_if_due(self):
+        """Upload periodically (every minute as per user's requirement)"""
+        if time.time() - self.last_upload_time >= UPLOAD_INTERVAL:
+            self.flush()
+            self.last_upload_time = time.time()
 
     def process_sample(self, timestamp_ms, voltage, cycle=None, phase=None):
         """Process a sample and upload if needed"""
+        if cycle is not None and phase is not None:
+            self._update_position(cycle, phase)
+        if len(self.samples) == self.samples.maxlen:
+            self.samples_evicted += 1
         self.samples.append((timestamp_ms, voltage, cycle, phase))
         self.total_samples += 1
-
-        # Update cycle and phase from Serial data (if provided)
-        if cycle is not None and phase is not None:
-            # Check for phase change
-            if phase != self.current_phase:
-                print(f"Phase changed: {self.current_phase} → {phase}")
-                # Upload current phase data before switching
-                if len(self.samples) > 0:
-                    self.upload_to_github()
-                    self.samples.clear()
-                self.current_phase = phase
-                self.last_upload_time = time.time()
-
-            # Check for cycle change
-            if cycle != self.current_cycle:
-                print(f"Cycle changed: {self.current_cycle} → {cycle}")
-                self.current_cycle = cycle
-
-        # Upload periodically (every minute as per user's requirement)
-        if time.time() - self.last_upload_time >= UPLOAD_INTERVAL:
-            self.upload_to_github()
-            self.samples.clear()
-            self.last_upload_time = time.time()
+        self._upload_if_due()
+
+    def process_batch(self, batch):
+        """Process a SampleBatch, one cycle/phase segment at a time"""
+        for start, stop in batch.segments():
+            cycle = int(batch.cycle[start])
+            phase = int(batch.phase[start])
+            if cycle == MISSING or phase == MISSING:
+                cycle = phase = None
+            else:
+                self._update_position(cycle, phase)
+            self.samples_evicted += max(0, len(self.samples) + (stop - start) - self.samples.maxlen)
+            self.samples.extend(zip(batch.t_ms[start:stop].tolist(),
+                                    batch.voltage[start:stop].tolist(),
+                                    [cycle] * (stop - start),
+                                    [phase] * (stop - start)))
+            self.total_samples += stop - start
+        if len(batch):
+            self._upload_if_due()
 
 def main():
     print("TRT Raw Data Uploader")
@@ -166,31 +145,44 @@ def main():
         time.sleep(2)  # Wait for connection
         print("Connected!")
 
-        uploader = RawDataUploader()
+        # Stage timings for the dashboard (scripts/metrics/upload_raw_from_serial.json)
+        metrics = registry("upload_raw_from_serial")
+        ring = SampleRing()
+        acquisition = AcquisitionThread(SerialIngest(ser), ring, metrics)
+        worker = UploadWorker(MAX_PENDING_UPLOADS, metrics)
+        uploader = RawDataUploader(worker)
+        worker.start()
+        acquisition.start()
+        last_stats = time.time()
 
         while True:
             try:
-                line = ser.readline().decode('utf-8', errors='ignore')
-                parsed = uploader.parse_serial_line(line)
-
-                if parsed:
-                    if len(parsed) == 4:
-                        timestamp_ms, voltage, cycle, phase = parsed
-                        uploader.process_sample(timestamp_ms, voltage, cycle, phase)
-                    elif len(parsed) == 2:
-                        # Old format fallback
-                        timestamp_ms, voltage = parsed
-                        uploader.process_sample(timestamp_ms, voltage)
-
-                    # Print status every 1000 samples
-                    if uploader.total_samples % 1000 == 0:
-                        print(f"Collected {uploader.total_samples} samples, cycle {uploader.current_cycle}, phase {uploader.current_phase}")
+                batch = ring.read()
+                if not len(batch):
+                    time.sleep(0.01)
+                    continue
+                before = uploader.total_samples
+                with span("process"):
+                    uploader.process_batch(batch)
+                metrics.flush()
+
+                # Print status every 1000 samples
+                if before // 1000 != uploader.total_samples // 1000:
+                    print(f"Collected {uploader.total_samples} samples, cycle {uploader.current_cycle}, phase {uploader.current_phase}")
+
+                if time.time() - last_stats >= STATS_INTERVAL:
+                    print(f"Pipeline: {pipeline_stats(ring, acquisition, worker, uploader.samples_evicted)}")
+                    last_stats = time.time()
 
             except KeyboardInterrupt:
                 print("\nStopping...")
+                acquisition.stop()
                 # Upload any remaining samples
-                if len(uploader.samples) > 0:
-                    uploader.upload_to_github()
+                uploader.process_batch(ring.read())
+                uploader.flush()
+                worker.drain(timeout=30)
+                print(f"Pipeline: {pipeline_stats(ring, acquisition, worker, uploader.samples_evicted)}")
+                metrics.flush(force=True)
                 break
             except Exception as e:
                 print(f"Error: {e}")
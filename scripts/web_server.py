@@ -4,12 +4,16 @@ TRT GitHub Posting Web Server
 Shows logs, posted files, and allows config editing
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify
 import json
 from pathlib import Path
 from datetime import datetime
 import os
 
+from trt_metrics import load_snapshots, prometheus_text
+from dashboard_feed import Broadcaster, DashboardFeed, measurement
+import threading
+
 app = Flask(__name__)
 
 # Paths
@@ -40,14 +44,38 @@ def load_activity_log():
     except:
         return {"pushes": [], "stats": {"total_pushes": 0, "total_files": 0}}
 
+def read_log_tail(lines=100):
+    """Recent log entries and the byte offset they end at (where the live feed takes over)"""
+    try:
+        with open(LOG_FILE, 'rb') as f:
+            content = f.read()
+    except OSError:
+        return "No logs available", 0
+    content = content[:content.rfind(b'\n') + 1]     # A partial last line arrives via the feed
+    text = content.decode('utf-8', 'replace')
+    return ''.join(text.splitlines(keepends=True)[-lines:]), len(content)
+
 def get_recent_logs(lines=100):
     """Get recent log entries"""
-    try:
-        with open(LOG_FILE) as f:
-            all_lines = f.readlines()
-            return ''.join(all_lines[-lines:])
-    except:
-        return "No logs available"
+    return read_log_tail(lines)[0]
+
+def load_measurements(config):
+    """Newest decoded record of every data file, whatever its shape"""
+    data_dir = REPO_DIR / config.get('data_dir', 'data')
+    return [m for m in (measurement(path) for path in sorted(data_dir.glob('*.json'))) if m]
+
+# Live feed: one producer thread for every connected page, started with the first one
+feed = Broadcaster()
+_producer = None
+_producer_lock = threading.Lock()
+
+def start_feed():
+    global _producer
+    with _producer_lock:
+        if _producer is None:
+            _producer = DashboardFeed(feed, ACTIVITY_LOG, CONFIG_FILE, LOG_FILE,
+                                      REPO_DIR / load_config().get('data_dir', 'data'))
+            _producer.start()
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -177,6 +205,28 @@ HTML_TEMPLATE = '''
         .refresh-btn:hover {
             background: #00f;
         }
+        .measure-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 13px;
+        }
+        .measure-table th, .measure-table td {
+            border-bottom: 1px solid #036;
+            padding: 6px;
+            text-align: left;
+        }
+        .measure-table th {
+            color: #ff0;
+        }
+        .measure-table td.value {
+            color: #0f0;
+        }
+        .measure-table td.stale {
+            color: #888;
+        }
+        .measure-table td.errors {
+            color: #f00;
+        }
         .status-running {
             color: #0f0;
         }
@@ -189,6 +239,141 @@ HTML_TEMPLATE = '''
             location.reload();
         }
 
+        // Live updates: patch what changed, never reload
+        function byId(id) {
+            return document.getElementById(id);
+        }
+
+        function setText(el, value) {
+            if (el && el.textContent !== value) {
+                el.textContent = value;
+            }
+        }
+
+        function cell(row, text, className) {
+            const td = document.createElement('td');
+            if (className) td.className = className;
+            td.textContent = text;
+            row.appendChild(td);
+            return td;
+        }
+
+        function dash(value) {
+            return value === null || value === undefined ? '—' : String(value);
+        }
+
+        const live = {
+            activity(d) {
+                const s = d.stats || {};
+                setText(byId('stat-total-pushes'), dash(s.total_pushes));
+                setText(byId('stat-total-files'), dash(s.total_files));
+                setText(byId('stat-commits-per-push'), s.total_commits && s.total_pushes
+                    ? (s.total_commits / s.total_pushes).toFixed(1) : '—');
+                const list = byId('push-list');
+                const signature = JSON.stringify(d.recent.map(p => p.timestamp));
+                if (list.dataset.signature === signature) return;
+                list.dataset.signature = signature;
+                list.replaceChildren(...d.recent.map(push => {
+                    const entry = document.createElement('div');
+                    entry.className = 'push-entry';
+                    const time = document.createElement('div');
+                    time.className = 'push-time';
+                    time.textContent = push.timestamp;
+                    const files = document.createElement('div');
+                    files.className = 'push-files';
+                    for (const file of push.files) {
+                        const line = document.createElement('div');
+                        line.textContent = '✓ ' + file;
+                        files.appendChild(line);
+                    }
+                    entry.append(time, files);
+                    return entry;
+                }));
+            },
+            config(d) {
+                setText(byId('stat-update-interval'), dash(d.update_interval) + 's');
+            },
+            measurement(m) {
+                const body = byId('measure-body');
+                let row = body.querySelector(`tr[data-file="${CSS.escape(m.file)}"]`);
+                if (!row) {
+                    row = document.createElement('tr');
+                    row.dataset.file = m.file;
+                    cell(row, m.file);
+                    cell(row, '', 'm-records');
+                    cell(row, '', 'm-as-of');
+                    cell(row, '', 'm-cycle-phase');
+                    cell(row, '', 'value m-stats');
+                    body.appendChild(row);
+                    byId('measure-empty')?.remove();
+                }
+                setText(row.querySelector('.m-records'), String(m.records));
+                setText(row.querySelector('.m-as-of'), m.as_of || '—');
+                setText(row.querySelector('.m-cycle-phase'), dash(m.cycle) + ' / ' + dash(m.phase));
+                const stats = row.querySelector('.m-stats');
+                const lines = Object.values(m.stats).map(s =>
+                    `${s.dt_ms / 1000}s: ${s.mean.toFixed(6)} (${s.variance.toFixed(6)})`);
+                if (stats.dataset.lines !== lines.join('\\n')) {
+                    stats.dataset.lines = lines.join('\\n');
+                    stats.replaceChildren(...lines.map(text => {
+                        const div = document.createElement('div');
+                        div.textContent = text;
+                        return div;
+                    }));
+                }
+            },
+            metrics(snapshots) {
+                const ms = v => v === null || v === undefined ? '—' : v.toFixed(1) + ' ms';
+                const rows = [];
+                for (const p of snapshots) {
+                    for (const s of p.stages) {
+                        const row = document.createElement('tr');
+                        cell(row, p.process + (p.stale ? ' (stopped)' : ''), p.stale ? 'stale' : '');
+                        cell(row, [s.stage, ...Object.entries(s.labels).map(([k, v]) => `${k}=${v}`)].join(' '));
+                        cell(row, String(s.count));
+                        cell(row, ms(s.p50_ms), 'value');
+                        cell(row, ms(s.p99_ms), 'value');
+                        cell(row, ms(s.max_ms));
+                        cell(row, String(s.errors), s.errors ? 'errors' : '');
+                        rows.push(row);
+                    }
+                }
+                byId('metrics-body').replaceChildren(...rows);
+                byId('metrics-counters').replaceChildren(...snapshots.flatMap(p => (p.counters || []).map(c => {
+                    const div = document.createElement('div');
+                    div.className = 'push-files';
+                    div.textContent = [p.process, c.name, ...Object.entries(c.labels).map(([k, v]) => `${k}=${v}`)]
+                        .join(' ') + ': ' + c.value;
+                    return div;
+                })));
+                if (rows.length) byId('metrics-empty')?.remove();
+            },
+            log(d) {
+                const box = byId('log-box');
+                let offset = d.truncated ? -1 : Number(box.dataset.offset);
+                const fresh = d.lines.filter(([end]) => end > offset);
+                if (!fresh.length) return;
+                box.dataset.offset = fresh[fresh.length - 1][0];
+                const follow = box.scrollTop + box.clientHeight >= box.scrollHeight - 5;
+                const text = box.textContent + fresh.map(([, line]) => line + '\\n').join('');
+                const kept = text.split('\\n');
+                box.textContent = kept.slice(Math.max(0, kept.length - 101)).join('\\n');
+                if (follow) box.scrollTop = box.scrollHeight;
+            },
+        };
+
+        function connect() {
+            const source = new EventSource('/api/stream');
+            source.onopen = () => setText(byId('live-status'), '● Live');
+            source.onerror = () => setText(byId('live-status'), '○ Reconnecting…');
+            for (const [event, handler] of Object.entries(live)) {
+                source.addEventListener(event, e => {
+                    handler(JSON.parse(e.data));
+                    setText(byId('last-updated'), new Date().toLocaleString());
+                });
+            }
+        }
+
         function saveConfig() {
             const config = {
                 arduino_ip: document.getElementById('arduino_ip').value,
@@ -196,7 +381,9 @@ HTML_TEMPLATE = '''
                 repo_dir: document.getElementById('repo_dir').value,
                 data_dir: document.getElementById('data_dir').value,
                 github_enabled: document.getElementById('github_enabled').checked,
-                max_history_points: parseInt(document.getElementById('max_history_points').value),
+                history_raw_hours: parseFloat(document.getElementById('history_raw_hours').value),
+                push_interval: parseInt(document.getElementById('push_interval').value),
+                push_max_commits: parseInt(document.getElementById('push_max_commits').value),
                 web_server_port: parseInt(document.getElementById('web_server_port').value),
                 web_server_host: document.getElementById('web_server_host').value
             };
@@ -212,8 +399,7 @@ HTML_TEMPLATE = '''
             });
         }
 
-        // Auto-refresh every 30 seconds
-        setTimeout(refreshLogs, 30000);
+        window.addEventListener('load', connect);
     </script>
 </head>
 <body>
@@ -225,25 +411,87 @@ HTML_TEMPLATE = '''
             <h2>📊 Statistics</h2>
             <div class="stats">
                 <div class="stat-box">
-                    <div class="stat-value">{{ stats.total_pushes }}</div>
+                    <div class="stat-value" id="stat-total-pushes">{{ stats.total_pushes }}</div>
                     <div class="stat-label">Total Pushes</div>
                 </div>
                 <div class="stat-box">
-                    <div class="stat-value">{{ stats.total_files }}</div>
+                    <div class="stat-value" id="stat-total-files">{{ stats.total_files }}</div>
                     <div class="stat-label">Files Posted</div>
                 </div>
                 <div class="stat-box">
-                    <div class="stat-value">{{ config.update_interval }}s</div>
+                    <div class="stat-value" id="stat-commits-per-push">{{ '%.1f' % (stats.total_commits / stats.total_pushes) if stats.total_commits and stats.total_pushes else '—' }}</div>
+                    <div class="stat-label">Commits / Push</div>
+                </div>
+                <div class="stat-box">
+                    <div class="stat-value" id="stat-update-interval">{{ config.update_interval }}s</div>
                     <div class="stat-label">Update Interval</div>
                 </div>
             </div>
         </div>
 
+        <!-- Latest Measurements -->
+        <div class="card">
+            <h2>🔬 Latest Measurements</h2>
+            <table class="measure-table">
+                <thead><tr><th>File</th><th>Records</th><th>As of</th><th>Cycle / Phase</th><th>Δt: mean (variance)</th></tr></thead>
+                <tbody id="measure-body">
+                {% for m in measurements %}
+                <tr data-file="{{ m.file }}">
+                    <td>{{ m.file }}</td>
+                    <td class="m-records">{{ m.records }}</td>
+                    <td class="m-as-of">{{ m.as_of or '—' }}</td>
+                    <td class="m-cycle-phase">{{ m.cycle if m.cycle is not none else '—' }} / {{ m.phase if m.phase is not none else '—' }}</td>
+                    <td class="value m-stats">
+                        {% for key, s in m.stats.items() %}
+                        <div>{{ '%g' % (s.dt_ms / 1000) }}s: {{ '%.6f' % s.mean }} ({{ '%.6f' % s.variance }})</div>
+                        {% endfor %}
+                    </td>
+                </tr>
+                {% endfor %}
+                </tbody>
+            </table>
+            {% if not measurements %}
+            <p style="color: #888;" id="measure-empty">No measurements found in the data directory.</p>
+            {% endif %}
+        </div>
+
+        <!-- Stage Latency -->
+        <div class="card">
+            <h2>⏱ Stage Latency</h2>
+            <table class="measure-table">
+                <thead><tr><th>Process</th><th>Stage</th><th>Runs</th><th>p50</th><th>p99</th><th>Max</th><th>Errors</th></tr></thead>
+                <tbody id="metrics-body">
+                {% for p in metrics %}
+                {% for s in p.stages %}
+                <tr>
+                    <td class="{{ 'stale' if p.stale else '' }}">{{ p.process }}{% if p.stale %} (stopped {{ '%.0f' % (p.age_s / 60) }} min ago){% endif %}</td>
+                    <td>{{ s.stage }}{% for k, v in s.labels.items() %} <span style="color: #888;">{{ k }}={{ v }}</span>{% endfor %}</td>
+                    <td>{{ s.count }}</td>
+                    <td class="value">{{ '%.1f ms' % s.p50_ms if s.p50_ms is not none else '—' }}</td>
+                    <td class="value">{{ '%.1f ms' % s.p99_ms if s.p99_ms is not none else '—' }}</td>
+                    <td>{{ '%.1f ms' % s.max_ms if s.max_ms is not none else '—' }}</td>
+                    <td class="{{ 'errors' if s.errors else '' }}">{{ s.errors }}</td>
+                </tr>
+                {% endfor %}
+                {% endfor %}
+                </tbody>
+            </table>
+            <div id="metrics-counters" style="margin-top: 10px;">
+                {% for p in metrics %}{% for c in p.counters %}
+                <div class="push-files">{{ p.process }} {{ c.name }}{% for k, v in c.labels.items() %} {{ k }}={{ v }}{% endfor %}: {{ c.value }}</div>
+                {% endfor %}{% endfor %}
+            </div>
+            {% if not metrics %}
+            <p style="color: #888;" id="metrics-empty">No stage timings yet (scripts/metrics/ is written by the running services).</p>
+            {% endif %}
+            <p style="color: #888;">Prometheus: <a href="/metrics" style="color: #0ff;">/metrics</a></p>
+        </div>
+
         <!-- Recent Activity -->
         <div class="card">
             <h2>📝 Recent Push Activity</h2>
             <button class="refresh-btn" onclick="refreshLogs()">🔄 Refresh</button>
-            <div style="margin-top: 15px;">
+            <div style="margin-top: 15px;" id="push-list">
                 {% for push in recent_pushes %}
                 <div class="push-entry">
                     <div class="push-time">{{ push.timestamp }}</div>
@@ -263,7 +511,7 @@ HTML_TEMPLATE = '''
         <!-- Live Logs -->
         <div class="card">
             <h2>📋 Live Logs</h2>
-            <div class="log-box">{{ logs }}</div>
+            <div class="log-box" id="log-box" data-offset="{{ log_offset }}">{{ logs }}</div>
         </div>
 
         <!-- Configuration -->
@@ -287,8 +535,16 @@ HTML_TEMPLATE = '''
                     <input type="text" id="data_dir" value="{{ config.data_dir }}">
                 </div>
                 <div class="config-field">
-                    <label>Max History Points:</label>
-                    <input type="number" id="max_history_points" value="{{ config.max_history_points }}">
+                    <label>Raw History (hours, then rollups):</label>
+                    <input type="number" id="history_raw_hours" value="{{ config.history_raw_hours }}">
+                </div>
+                <div class="config-field">
+                    <label>Push Interval (seconds, commits batch up in between):</label>
+                    <input type="number" id="push_interval" value="{{ config.push_interval }}">
+                </div>
+                <div class="config-field">
+                    <label>Push After N Commits:</label>
+                    <input type="number" id="push_max_commits" value="{{ config.push_max_commits }}">
                 </div>
                 <div class="config-field">
                     <label>Web Server Port:</label>
@@ -309,7 +565,7 @@ HTML_TEMPLATE = '''
         </div>
 
         <div style="text-align: center; color: #888; margin-top: 30px; padding: 20px;">
-            Auto-refreshes every 30 seconds | Last updated: {{ current_time }}
+            <span id="live-status">○ Connecting…</span> | Last updated: <span id="last-updated">{{ current_time }}</span>
         </div>
     </div>
 </body>
@@ -321,7 +577,7 @@ def index():
     """Main dashboard"""
     config = load_config()
     activity = load_activity_log()
-    logs = get_recent_logs(100)
+    logs, log_offset = read_log_tail(100)
 
     return render_template_string(
         HTML_TEMPLATE,
@@ -329,6 +585,9 @@ def index():
         stats=activity.get('stats', {'total_pushes': 0, 'total_files': 0}),
         recent_pushes=activity.get('pushes', [])[-10:][::-1],  # Last 10, reversed
         logs=logs,
+        log_offset=log_offset,
+        measurements=load_measurements(config),
+        metrics=load_snapshots(),
         current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     )
 
@@ -336,7 +595,8 @@ def index():
 def api_config():
     """Config API endpoint"""
     if request.method == 'POST':
-        config = request.json
+        # Merge so settings without a form field (e.g. resident_renderer) survive
+        config = {**load_config(), **request.json}
         save_config(config)
         return jsonify({'success': True})
     else:
@@ -347,6 +607,28 @@ def api_activity():
     """Activity API endpoint"""
     return jsonify(load_activity_log())
 
+@app.route('/api/latest')
+def api_latest():
+    """Latest measurements API endpoint"""
+    return jsonify(load_measurements(load_config()))
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Stage latency snapshots API endpoint"""
+    return jsonify(load_snapshots())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(prometheus_text(load_snapshots()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: live activity, config, measurements, metrics and log lines"""
+    start_feed()
+    return Response(feed.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/logs')
 def api_logs():
     """Logs API endpoint"""
@@ -365,4 +647,5 @@ if __name__ == '__main__':
     print(f"Network: http://{host}:{port}")
     print("=" * 60)
 
-    app.run(host=host, port=port, debug=False)
+    # threaded: every open page holds one connection on /api/stream
+    app.run(host=host, port=port, debug=False, threaded=True)